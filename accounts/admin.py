@@ -3,7 +3,8 @@ Configuración del panel de administración de Django
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, UserRole, LoginHistory, ActiveSession
+from django.utils import timezone
+from .models import CustomUser, UserRole, LoginHistory, ActiveSession, OutboxEmail
 
 
 @admin.register(UserRole)
@@ -117,7 +118,10 @@ class ActiveSessionAdmin(admin.ModelAdmin):
     list_display = ['user', 'device_info', 'browser_info', 'ip_address', 'last_activity', 'is_current']
     list_filter = ['is_current', 'created_at', 'last_activity']
     search_fields = ['user__username', 'user__email', 'ip_address', 'device_info']
-    readonly_fields = ['user', 'session_key', 'ip_address', 'user_agent', 'device_info', 'browser_info', 'created_at', 'last_activity']
+    readonly_fields = [
+        'user', 'session_key', 'ip_address', 'user_agent', 'device_info', 'browser_info',
+        'device_icon', 'browser_name', 'os_name', 'created_at', 'last_activity'
+    ]
     
     fieldsets = (
         ('Información de Usuario', {
@@ -127,10 +131,50 @@ class ActiveSessionAdmin(admin.ModelAdmin):
             'fields': ('session_key', 'created_at', 'last_activity')
         }),
         ('Información del Dispositivo', {
-            'fields': ('ip_address', 'device_info', 'browser_info', 'user_agent', 'location')
+            'fields': ('ip_address', 'device_info', 'browser_info', 'os_name', 'user_agent', 'location')
         }),
     )
     
     def has_add_permission(self, request):
         """Desactivar la adición manual de registros"""
         return False
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """
+    Administración de la bandeja de salida de emails
+    """
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject', 'recipients']
+    readonly_fields = [
+        'subject', 'plain_message', 'html_message', 'from_email', 'recipients', 'status', 'attempts',
+        'next_attempt_at', 'claimed_at', 'last_error', 'created_at', 'sent_at'
+    ]
+    actions = ['retry_emails']
+    
+    fieldsets = (
+        ('Email', {
+            'fields': ('subject', 'from_email', 'recipients', 'plain_message', 'html_message')
+        }),
+        ('Estado del Envío', {
+            'fields': ('status', 'attempts', 'next_attempt_at', 'claimed_at', 'last_error', 'created_at', 'sent_at')
+        }),
+    )
+    
+    def has_add_permission(self, request):
+        """Desactivar la adición manual de registros"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Desactivar la edición de registros"""
+        return False
+    
+    def retry_emails(self, request, queryset):
+        """Vuelve a encolar los emails fallidos seleccionados"""
+        updated = queryset.filter(status='failed').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} email(s) vuelto(s) a encolar.')
+    retry_emails.short_description = 'Reintentar el envío de los emails fallidos'
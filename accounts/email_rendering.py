@@ -0,0 +1,105 @@
+"""
+Renderizado de emails (HTML + texto plano)
+
+Antes cada envío renderizaba el HTML y luego lo convertía a texto plano
+aplicando una decena de expresiones regulares sobre el HTML completo
+(estilos incluidos). Ahora la conversión se hace una sola vez por plantilla:
+se aplica al código fuente de la plantilla HTML y el resultado se compila
+como una plantilla de texto plano (el esqueleto) que se guarda en memoria
+junto con la fecha de modificación del archivo. Cada email solo renderiza
+ese esqueleto con las variables del usuario y normaliza los espacios.
+
+Las variables del usuario pasan por filtros y condiciones de la plantilla
+(fechas, enlaces), por eso se renderizan en el esqueleto en lugar de
+reemplazarse por texto en un resultado ya convertido.
+"""
+import os
+import re
+import threading
+
+from django.template import engines
+from django.template.loader import get_template, render_to_string
+from django.utils.html import strip_tags
+
+# Expresiones regulares precompiladas de la conversión HTML -> texto plano
+SCRIPT_RE = re.compile(r'<script[^>]*>.*?</script>', re.DOTALL)
+STYLE_RE = re.compile(r'<style[^>]*>.*?</style>', re.DOTALL)
+BR_RE = re.compile(r'<br\s*/?>')
+P_CLOSE_RE = re.compile(r'</p>')
+P_OPEN_RE = re.compile(r'<p[^>]*>')
+LI_OPEN_RE = re.compile(r'<li[^>]*>')
+LI_CLOSE_RE = re.compile(r'</li>')
+SPACES_RE = re.compile(r' +')
+BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+
+_skeletons = {}
+_skeletons_lock = threading.Lock()
+
+
+def _strip_html(html_content):
+    """Pasos de la conversión que dependen del HTML: quita estilos, scripts y etiquetas"""
+    text = SCRIPT_RE.sub('', html_content)
+    text = STYLE_RE.sub('', text)
+
+    # Reemplazar <br> y <p> con saltos de línea
+    text = BR_RE.sub('\n', text)
+    text = P_CLOSE_RE.sub('\n\n', text)
+    text = P_OPEN_RE.sub('', text)
+
+    # Reemplazar <li> con bullets
+    text = LI_OPEN_RE.sub('  • ', text)
+    text = LI_CLOSE_RE.sub('\n', text)
+
+    # Eliminar todos los tags HTML restantes
+    return strip_tags(text)
+
+
+def _normalize_whitespace(text):
+    """Pasos de la conversión que dependen del texto final: limpia espacios y líneas vacías"""
+    text = SPACES_RE.sub(' ', text)
+    text = BLANK_LINES_RE.sub('\n\n', text)
+    text = '\n'.join(line.strip() for line in text.split('\n'))
+    # Las líneas de etiquetas de plantilla dejan más líneas vacías seguidas
+    return BLANK_LINES_RE.sub('\n\n', text).strip()
+
+
+def html_to_plain_text(html_content):
+    """
+    Convierte contenido HTML a texto plano para emails
+    Elimina tags HTML y formatea el texto de manera legible
+    """
+    return _normalize_whitespace(_strip_html(html_content))
+
+
+def _template_version(template):
+    """Fecha de modificación del archivo de la plantilla (None si no viene de un archivo)"""
+    try:
+        return os.path.getmtime(template.origin.name)
+    except (OSError, TypeError):
+        return None
+
+
+def get_plain_skeleton(template_name):
+    """
+    Retorna la plantilla de texto plano derivada de la plantilla HTML.
+    Se recompila solo si el archivo de la plantilla cambió.
+    """
+    template = get_template(template_name)
+    version = _template_version(template)
+    cached = _skeletons.get(template_name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    source = _strip_html(template.template.source)
+    # El texto plano no se escapa como HTML (un "&" debe llegar como "&")
+    skeleton = engines['django'].from_string('{% autoescape off %}' + source + '{% endautoescape %}')
+    with _skeletons_lock:
+        _skeletons[template_name] = (version, skeleton)
+    return skeleton
+
+
+def render_email(template_name, context):
+    """Renderiza un email; retorna (html_message, plain_message)"""
+    html_message = render_to_string(template_name, context)
+    plain_message = _normalize_whitespace(get_plain_skeleton(template_name).render(context))
+    return html_message, plain_message
@@ -0,0 +1,43 @@
+"""
+Envío de emails con versión HTML y texto plano.
+Se usa desde las vistas de accounts, los comandos y otras apps (p. ej. las
+alertas de stock bajo de productos) sin importar accounts.views.
+"""
+from django.core.mail import send_mail, EmailMultiAlternatives
+
+from .outbox import enqueue_email, is_outbox_enabled
+
+
+def send_html_email(subject, plain_message, html_message, from_email, recipient_list, fail_silently=False):
+    """
+    Envía un email con versión HTML y texto plano.
+    Con EMAIL_OUTBOX_ENABLED: lo guarda en la bandeja de salida y el comando
+    process_email_outbox lo envía en segundo plano (la petición no espera al SMTP)
+    En desarrollo (consola): solo muestra texto plano
+    En producción (SMTP): envía ambas versiones (multipart)
+    """
+    from kitty_glow.local_settings import IS_DEPLOYED
+    
+    if is_outbox_enabled():
+        enqueue_email(subject, plain_message, html_message, from_email, recipient_list)
+        return
+    
+    if IS_DEPLOYED:
+        # Producción: Enviar email multipart (HTML + texto plano)
+        msg = EmailMultiAlternatives(
+            subject=subject,
+            body=plain_message,
+            from_email=from_email,
+            to=recipient_list
+        )
+        msg.attach_alternative(html_message, "text/html")
+        msg.send(fail_silently=fail_silently)
+    else:
+        # Desarrollo: Solo enviar texto plano a la consola
+        send_mail(
+            subject=subject,
+            message=plain_message,
+            from_email=from_email,
+            recipient_list=recipient_list,
+            fail_silently=fail_silently
+        )
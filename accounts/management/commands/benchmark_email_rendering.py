@@ -0,0 +1,68 @@
+"""
+Comando para medir el costo de renderizar un email
+Compara el renderizado anterior (HTML completo + conversión a texto plano
+con expresiones regulares) con render_email, que reutiliza el esqueleto de
+texto plano de la plantilla. No envía ningún email ni usa la base de datos.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+from accounts.email_rendering import get_plain_skeleton, html_to_plain_text, render_email
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo por email del renderizado HTML + texto plano antes y después del esqueleto en caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=500,
+            help='Número de emails renderizados por medición (por defecto: 500)'
+        )
+        parser.add_argument(
+            '--template',
+            default='accounts/emails/login_notification.html',
+            help='Plantilla a medir (por defecto: la notificación de inicio de sesión)'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        template_name = options['template']
+        user = CustomUser(username='benchmark', email='benchmark@example.com', first_name='Kitty', last_name='Glow')
+
+        def context(i):
+            return {
+                'user': user,
+                'login_time': timezone.now(),
+                'ip_address': f'10.0.{i // 256 % 256}.{i % 256}',
+                'user_agent': f'Mozilla/5.0 (Benchmark {i})',
+                'current_year': timezone.now().year,
+            }
+
+        def before(i):
+            html_message = render_to_string(template_name, context(i))
+            return html_message, html_to_plain_text(html_message)
+
+        def after(i):
+            return render_email(template_name, context(i))
+
+        # Calentar el cargador de plantillas y compilar el esqueleto fuera de la medición
+        get_plain_skeleton(template_name)
+        before(0)
+
+        results = {}
+        for label, render in (('Antes (HTML + conversión)', before), ('Después (esqueleto en caché)', after)):
+            started = time.perf_counter()
+            for i in range(iterations):
+                render(i)
+            results[label] = (time.perf_counter() - started) / iterations * 1000
+
+        self.stdout.write(self.style.SUCCESS(f'Plantilla: {template_name} ({iterations} email(s) por medición)'))
+        for label, per_email in results.items():
+            self.stdout.write(self.style.SUCCESS(f'  - {label}: {per_email:.3f} ms por email'))
+        antes, despues = results.values()
+        self.stdout.write(self.style.SUCCESS(f'✓ Mejora: {antes / despues if despues else 0:.1f}x'))
@@ -1,50 +1,98 @@
 """
 Comando para eliminar cuentas que han excedido el período de gracia
 Este comando debe ejecutarse diariamente mediante un cron job
+
+Con --batch las cuentas se procesan por lotes: los datos dependientes
+(historial, sesiones, reseñas, notificaciones, carritos...) se eliminan con
+borrados directos por rangos de clave primaria, cada uno en una transacción
+corta, en lugar de que user.delete() los cargue y los borre objeto por
+objeto dentro de una sola transacción larga. Los emails de aviso del lote
+se envían por una sola conexión SMTP (o se encolan en la bandeja de salida).
 """
-from django.core.management.base import BaseCommand
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
 from django.utils import timezone
-from accounts.models import CustomUser
+from accounts.email_rendering import render_email
+from accounts.models import CustomUser, OutboxEmail
+from accounts.outbox import is_outbox_enabled
 from accounts.views import send_account_deletion_notification
+from productos.detail_cache import bump_producto_version
+from productos.models import CartItem, Review
+from productos.stock import release_stock
 
 
 class Command(BaseCommand):
     help = 'Elimina cuentas de usuarios que han excedido el período de gracia de 30 días'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Elimina las cuentas por lotes con borrados directos y una sola conexión SMTP'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Número de cuentas por lote en modo --batch (por defecto: 100)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Número de filas dependientes por borrado en modo --batch (por defecto: 1000)'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Segundos de espera entre borrados en modo --batch (por defecto: 0)'
+        )
+
     def handle(self, *args, **options):
         now = timezone.now()
-        
+
         # Buscar cuentas pendientes de eliminación cuya fecha programada ya pasó
         accounts_to_delete = CustomUser.objects.filter(
             is_pending_deletion=True,
             scheduled_deletion_date__lte=now
         )
-        
+
+        if options['batch']:
+            self.chunk_size = options['chunk_size']
+            self.pause = options['pause']
+            self.handle_batch(accounts_to_delete, options['batch_size'])
+            return
+
         deleted_count = 0
-        
+
         for user in accounts_to_delete:
             username = user.username
             email = user.email
-            
+
             self.stdout.write(
                 self.style.WARNING(
                     f'Eliminando cuenta: {username} ({email})'
                 )
             )
-            
+
             # Enviar email de notificación
             send_account_deletion_notification(email, username)
-            
+
             # Eliminar el usuario
             user.delete()
             deleted_count += 1
-            
+
             self.stdout.write(
                 self.style.SUCCESS(
                     f'✓ Cuenta eliminada: {username}'
                 )
             )
-        
+
         if deleted_count == 0:
             self.stdout.write(
                 self.style.SUCCESS(
@@ -59,3 +107,179 @@ class Command(BaseCommand):
                     f'{"="*50}'
                 )
             )
+
+    def handle_batch(self, accounts_to_delete, batch_size):
+        """Elimina las cuentas por lotes de pk y reporta filas por segundo"""
+        # Antes de borrar nada: una relación no soportada a mitad del borrado
+        # dejaría cuentas eliminadas solo en parte
+        self.check_relations(CustomUser)
+
+        started = time.monotonic()
+        deleted_count = 0
+        total_rows = 0
+        last_id = 0
+        while True:
+            batch = list(
+                accounts_to_delete.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', 'username', 'email')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            rows = self.delete_accounts([pk for pk, _, _ in batch])
+            self.notify_deleted([(username, email) for _, username, email in batch])
+
+            deleted_count += len(batch)
+            total_rows += rows
+            self.stdout.write(f'  Lote hasta la cuenta #{last_id}: {len(batch)} cuenta(s), {rows} fila(s)')
+
+        if deleted_count == 0:
+            self.stdout.write(self.style.SUCCESS('No hay cuentas pendientes de eliminación.'))
+            return
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {deleted_count} cuenta(s) eliminada(s), {total_rows} fila(s) en {elapsed:.2f} s '
+            f'({total_rows / elapsed if elapsed else 0:.0f} filas por segundo)'
+        ))
+
+    def delete_accounts(self, user_ids):
+        """
+        Elimina un lote de cuentas con sus datos dependientes.
+        Los borrados directos no envían señales: aquí se hace a mano lo que
+        harían (devolver las reservas del carrito e invalidar el detalle de
+        los productos reseñados). Retorna el número de filas eliminadas.
+        """
+        with transaction.atomic():
+            items = CartItem.objects.select_for_update().filter(cart__user_id__in=user_ids, reserved_quantity__gt=0)
+            reserved = {}
+            for producto_id, quantity in items.values_list('producto_id', 'reserved_quantity'):
+                reserved[producto_id] = reserved.get(producto_id, 0) + quantity
+            for producto_id in sorted(reserved):
+                release_stock(producto_id, reserved[producto_id])
+            # Si el borrado se interrumpe, la reserva no debe devolverse dos veces
+            items.update(reserved_quantity=0)
+
+        reviewed = set(Review.objects.filter(user_id__in=user_ids).values_list('producto_id', flat=True))
+
+        rows = self.purge_related(CustomUser, user_ids)
+        with transaction.atomic():
+            # Solo quedan las relaciones muchos a muchos (grupos y permisos)
+            rows += CustomUser.objects.filter(pk__in=user_ids).delete()[0]
+
+        bump_producto_version(*reviewed)
+        return rows
+
+    def check_relations(self, model, checked=None):
+        """
+        Recorre el árbol de relaciones que purge_related seguirá desde model y
+        lanza CommandError si alguna no es CASCADE ni SET_NULL.
+        """
+        checked = set() if checked is None else checked
+        checked.add(model)
+        for relation in model._meta.related_objects:
+            related = relation.related_model
+            if relation.on_delete is models.SET_NULL:
+                continue
+            if relation.on_delete is not models.CASCADE:
+                raise CommandError(
+                    f'{related.__name__}.{relation.field.name} usa {relation.on_delete.__name__}: '
+                    'elimina las cuentas sin --batch'
+                )
+            if related not in checked:
+                self.check_relations(related, checked)
+
+    def purge_related(self, model, pks):
+        """
+        Elimina por lotes de pk (o desvincula, con SET_NULL) las filas que
+        dependen de las filas pks de model, empezando por las más profundas.
+        Retorna el número de filas eliminadas.
+        """
+        rows = 0
+        for relation in model._meta.related_objects:
+            related = relation.related_model
+            dependents = related._base_manager.filter(**{f'{relation.field.name}__in': pks})
+
+            if relation.on_delete is models.SET_NULL:
+                while ids := list(dependents.order_by('pk').values_list('pk', flat=True)[:self.chunk_size]):
+                    related._base_manager.filter(pk__in=ids).update(**{relation.field.name: None})
+                continue
+
+            # Aquí solo llegan relaciones CASCADE: check_relations rechaza las demás
+            while ids := list(dependents.order_by('pk').values_list('pk', flat=True)[:self.chunk_size]):
+                rows += self.purge_related(related, ids)
+                rows += self.delete_rows(related, ids)
+                if self.pause:
+                    time.sleep(self.pause)
+        return rows
+
+    def delete_rows(self, model, ids):
+        """
+        Borra las filas ids de model con un DELETE directo en SQL, sin cargarlas
+        ni enviar señales (QuerySet.delete() haría ambas cosas fila por fila).
+        Sus dependientes ya se eliminaron en purge_related.
+        Retorna el número de filas eliminadas.
+        """
+        quote_name = connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote_name(model._meta.db_table)} '
+                f'WHERE {quote_name(model._meta.pk.column)} IN ({placeholders})',
+                [model._meta.pk.get_db_prep_value(pk, connection) for pk in ids],
+            )
+            return cursor.rowcount
+
+    def notify_deleted(self, accounts):
+        """Envía (o encola) el aviso de eliminación de un lote de cuentas por una sola conexión"""
+        emails = []
+        for username, email in accounts:
+            if not email:
+                continue
+            html_message, plain_message = render_email('accounts/emails/account_deleted_notification.html', {
+                'username': username,
+                'deletion_time': timezone.now(),
+                'current_year': timezone.now().year,
+            })
+            emails.append((email, plain_message, html_message))
+
+        subject = 'Tu cuenta ha sido eliminada - Kitty Glow'
+        if is_outbox_enabled():
+            OutboxEmail.objects.bulk_create([
+                OutboxEmail(
+                    subject=subject, plain_message=plain_message, html_message=html_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL, recipients=[email],
+                )
+                for email, plain_message, html_message in emails
+            ])
+            return
+
+        # Las cuentas ya se eliminaron: un aviso que no se pudo enviar se informa
+        # en stderr para reenviarlo a mano en lugar de perderse en silencio
+        failed = []
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            failed = [(email, e) for email, _, _ in emails]
+        else:
+            try:
+                for email, plain_message, html_message in emails:
+                    message = EmailMultiAlternatives(
+                        subject=subject,
+                        body=plain_message,
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        to=[email],
+                        connection=connection,
+                    )
+                    message.attach_alternative(html_message, 'text/html')
+                    try:
+                        message.send()
+                    except Exception as e:
+                        failed.append((email, e))
+            finally:
+                connection.close()
+
+        for email, error in failed:
+            self.stderr.write(self.style.ERROR(f'✗ No se pudo enviar el aviso de eliminación a {email}: {error}'))
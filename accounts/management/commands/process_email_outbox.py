@@ -0,0 +1,65 @@
+"""
+Comando worker que envía los emails de la bandeja de salida (OutboxEmail)
+Por defecto envía los emails pendientes y termina, para ejecutarlo con un
+cron job; con --continuous queda esperando nuevos emails
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.outbox import claim_emails, deliver_emails, requeue_stale_emails
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails pendientes de la bandeja de salida con reintentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Número de emails enviados por conexión SMTP (por defecto: 50)'
+        )
+        parser.add_argument(
+            '--continuous',
+            action='store_true',
+            help='Sigue esperando emails nuevos en lugar de terminar'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Segundos entre consultas en modo continuo (por defecto: 2)'
+        )
+
+    def handle(self, *args, **options):
+        timeout = getattr(settings, 'EMAIL_OUTBOX_TIMEOUT_MINUTES', 10)
+
+        while True:
+            requeued = requeue_stale_emails(timeout)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'○ {requeued} email(s) atascado(s) reencolado(s)'))
+
+            total_sent = 0
+            total_failed = 0
+            started = time.monotonic()
+            while emails := claim_emails(options['batch_size']):
+                sent, failed = deliver_emails(emails)
+                total_sent += sent
+                total_failed += failed
+
+            if total_sent or total_failed:
+                elapsed = time.monotonic() - started
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {total_sent} email(s) enviado(s) en {elapsed:.2f} s '
+                    f'({total_sent / elapsed if elapsed else 0:.0f} por segundo)'
+                ))
+                if total_failed:
+                    self.stdout.write(self.style.WARNING(f'○ {total_failed} envío(s) con error (se reintentan hasta EMAIL_OUTBOX_MAX_ATTEMPTS)'))
+
+            if not options['continuous']:
+                if not (total_sent or total_failed):
+                    self.stdout.write(self.style.SUCCESS('No hay emails pendientes.'))
+                return
+
+            time.sleep(options['interval'])
@@ -1,13 +1,22 @@
 """
 Middleware para rastrear sesiones activas de usuarios
 """
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from .models import ActiveSession
+from .user_agents import classify_user_agent
+
+ACTIVE_SESSION_KEY = 'active_session:{session_key}'
 
 
 class ActiveSessionMiddleware:
     """
     Middleware que rastrea y actualiza sesiones activas
+    Para no escribir en la base de datos en cada petición, guarda en caché
+    (usuario, IP) de la última escritura de cada sesión durante
+    ACTIVE_SESSION_UPDATE_INTERVAL segundos; mientras no cambien, la
+    petición no consulta ni actualiza ActiveSession.
     """
     
     def __init__(self, get_response):
@@ -24,29 +33,40 @@ class ActiveSessionMiddleware:
             if session_key:
                 # Obtener información del cliente
                 ip_address = self.get_client_ip(request)
-                user_agent = request.META.get('HTTP_USER_AGENT', '')
-                
-                # Actualizar o crear sesión activa
-                session, created = ActiveSession.objects.get_or_create(
-                    session_key=session_key,
-                    defaults={
-                        'user': request.user,
-                        'ip_address': ip_address,
-                        'user_agent': user_agent,
-                        'device_info': self.extract_device_info(user_agent),
-                        'browser_info': self.extract_browser_info(user_agent),
-                    }
-                )
                 
-                # Si no se creó, actualizar última actividad
-                if not created:
-                    session.last_activity = timezone.now()
-                    session.user = request.user  # Asegurar que el usuario sea correcto
-                    session.ip_address = ip_address
-                    session.save(update_fields=['last_activity', 'user', 'ip_address'])
+                cache_key = ACTIVE_SESSION_KEY.format(session_key=session_key)
+                if cache.get(cache_key) != (request.user.pk, ip_address):
+                    self.touch_session(request, session_key, ip_address)
+                    cache.set(
+                        cache_key,
+                        (request.user.pk, ip_address),
+                        getattr(settings, 'ACTIVE_SESSION_UPDATE_INTERVAL', 300)
+                    )
         
         return response
     
+    def touch_session(self, request, session_key, ip_address):
+        """Actualiza la última actividad de la sesión o la crea si no existe"""
+        updated = ActiveSession.objects.filter(session_key=session_key).update(
+            last_activity=timezone.now(),
+            user=request.user,  # Asegurar que el usuario sea correcto
+            ip_address=ip_address,
+        )
+        if updated:
+            return
+        
+        user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
+        info = classify_user_agent(user_agent)
+        ActiveSession.objects.get_or_create(
+            session_key=session_key,
+            defaults={
+                'user': request.user,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                **info._asdict(),
+            }
+        )
+    
     @staticmethod
     def get_client_ip(request):
         """Obtiene la dirección IP del cliente"""
@@ -56,44 +76,3 @@ class ActiveSessionMiddleware:
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
-    
-    @staticmethod
-    def extract_device_info(user_agent):
-        """Extrae información básica del dispositivo"""
-        user_agent_lower = user_agent.lower()
-        
-        if 'iphone' in user_agent_lower:
-            return 'iPhone'
-        elif 'ipad' in user_agent_lower:
-            return 'iPad'
-        elif 'android' in user_agent_lower:
-            if 'mobile' in user_agent_lower:
-                return 'Android Phone'
-            else:
-                return 'Android Tablet'
-        elif 'windows' in user_agent_lower:
-            return 'Windows PC'
-        elif 'mac os' in user_agent_lower or 'macos' in user_agent_lower:
-            return 'Mac'
-        elif 'linux' in user_agent_lower:
-            return 'Linux PC'
-        else:
-            return 'Dispositivo Desconocido'
-    
-    @staticmethod
-    def extract_browser_info(user_agent):
-        """Extrae información del navegador"""
-        user_agent_lower = user_agent.lower()
-        
-        if 'edge' in user_agent_lower or 'edg/' in user_agent_lower:
-            return 'Microsoft Edge'
-        elif 'chrome' in user_agent_lower and 'edg' not in user_agent_lower:
-            return 'Google Chrome'
-        elif 'firefox' in user_agent_lower:
-            return 'Mozilla Firefox'
-        elif 'safari' in user_agent_lower and 'chrome' not in user_agent_lower:
-            return 'Safari'
-        elif 'opera' in user_agent_lower or 'opr/' in user_agent_lower:
-            return 'Opera'
-        else:
-            return 'Navegador Desconocido'
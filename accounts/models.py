@@ -4,6 +4,8 @@ Modelos para la gestión de usuarios y roles
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
+from django.utils import timezone
+from .user_agents import classify_user_agent
 
 
 class UserRole(models.Model):
@@ -255,6 +257,22 @@ class ActiveSession(models.Model):
         blank=True,
         verbose_name='Información del Navegador'
     )
+    # Clasificación del user agent guardada al crear la sesión (ver accounts/user_agents.py)
+    device_icon = models.CharField(
+        max_length=30,
+        blank=True,
+        verbose_name='Ícono del Dispositivo'
+    )
+    browser_name = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Navegador'
+    )
+    os_name = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Sistema Operativo'
+    )
     location = models.CharField(
         max_length=200,
         blank=True,
@@ -289,45 +307,91 @@ class ActiveSession(models.Model):
     
     def get_device_icon(self):
         """Retorna el ícono apropiado según el dispositivo"""
-        user_agent_lower = self.user_agent.lower()
-        
-        if 'mobile' in user_agent_lower or 'android' in user_agent_lower or 'iphone' in user_agent_lower:
-            return 'fa-mobile-alt'
-        elif 'tablet' in user_agent_lower or 'ipad' in user_agent_lower:
-            return 'fa-tablet-alt'
-        else:
-            return 'fa-desktop'
+        return self.device_icon or classify_user_agent(self.user_agent).device_icon
     
     def get_browser_name(self):
-        """Extrae el nombre del navegador del user agent"""
-        user_agent_lower = self.user_agent.lower()
-        
-        if 'edge' in user_agent_lower or 'edg/' in user_agent_lower:
-            return 'Edge'
-        elif 'chrome' in user_agent_lower and 'edg' not in user_agent_lower:
-            return 'Chrome'
-        elif 'firefox' in user_agent_lower:
-            return 'Firefox'
-        elif 'safari' in user_agent_lower and 'chrome' not in user_agent_lower:
-            return 'Safari'
-        elif 'opera' in user_agent_lower or 'opr/' in user_agent_lower:
-            return 'Opera'
-        else:
-            return 'Desconocido'
+        """Retorna el nombre del navegador del user agent"""
+        return self.browser_name or classify_user_agent(self.user_agent).browser_name
     
     def get_os_name(self):
-        """Extrae el nombre del sistema operativo del user agent"""
-        user_agent_lower = self.user_agent.lower()
-        
-        if 'windows' in user_agent_lower:
-            return 'Windows'
-        elif 'mac os' in user_agent_lower or 'macos' in user_agent_lower:
-            return 'macOS'
-        elif 'linux' in user_agent_lower:
-            return 'Linux'
-        elif 'android' in user_agent_lower:
-            return 'Android'
-        elif 'iphone' in user_agent_lower or 'ipad' in user_agent_lower:
-            return 'iOS'
-        else:
-            return 'Desconocido'
+        """Retorna el nombre del sistema operativo del user agent"""
+        return self.os_name or classify_user_agent(self.user_agent).os_name
+
+
+class OutboxEmail(models.Model):
+    """
+    Email pendiente de envío (bandeja de salida).
+    Las vistas solo guardan la fila; el comando process_email_outbox lo
+    envía en segundo plano con reintentos (ver accounts/outbox.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ]
+
+    subject = models.CharField(
+        max_length=255,
+        verbose_name='Asunto'
+    )
+    plain_message = models.TextField(
+        verbose_name='Mensaje en Texto Plano'
+    )
+    html_message = models.TextField(
+        blank=True,
+        verbose_name='Mensaje HTML'
+    )
+    from_email = models.CharField(
+        max_length=254,
+        verbose_name='Remitente'
+    )
+    recipients = models.JSONField(
+        default=list,
+        verbose_name='Destinatarios'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='Estado'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Tomado por el Worker'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Último Error'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Envío'
+    )
+
+    class Meta:
+        verbose_name = 'Email en Bandeja de Salida'
+        verbose_name_plural = 'Bandeja de Salida'
+        ordering = ['-created_at']
+        db_table = 'email_outbox'
+        # Pendientes listos para enviar, en orden de próximo intento
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} - {', '.join(self.recipients)} ({self.get_status_display()})"
@@ -0,0 +1,144 @@
+"""
+Bandeja de salida de emails (modelo OutboxEmail)
+
+Con EMAIL_OUTBOX_ENABLED, send_html_email no habla con el servidor SMTP:
+guarda el email en la tabla email_outbox y la petición responde de
+inmediato. El comando process_email_outbox los envía en segundo plano
+reutilizando una sola conexión SMTP por lote. Un envío fallido se
+reintenta con espera exponencial (EMAIL_OUTBOX_RETRY_SECONDS, el doble en
+cada intento) hasta EMAIL_OUTBOX_MAX_ATTEMPTS intentos.
+
+En desarrollo (EMAIL_OUTBOX_ENABLED en False) los emails se siguen
+enviando de forma síncrona, como antes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# Espera máxima entre reintentos
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def is_outbox_enabled():
+    """Indica si los emails se encolan en lugar de enviarse en la petición"""
+    return getattr(settings, 'EMAIL_OUTBOX_ENABLED', False)
+
+
+def enqueue_email(subject, plain_message, html_message, from_email, recipient_list):
+    """Guarda el email en la bandeja de salida; retorna el OutboxEmail creado"""
+    return OutboxEmail.objects.create(
+        subject=subject,
+        plain_message=plain_message,
+        html_message=html_message or '',
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def build_message(email, connection):
+    """Arma el mensaje multipart (texto plano + HTML) de un OutboxEmail"""
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.plain_message,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection,
+    )
+    if email.html_message:
+        message.attach_alternative(email.html_message, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    """Espera antes del siguiente intento: RETRY_SECONDS * 2^(intentos - 1), con tope"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_SECONDS', 60)
+    return min(timedelta(seconds=base * 2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+
+def requeue_stale_emails(minutes):
+    """Devuelve a 'pending' los emails que llevan demasiado tiempo en 'sending' (worker caído)"""
+    return OutboxEmail.objects.filter(
+        status='sending', claimed_at__lt=timezone.now() - timedelta(minutes=minutes)
+    ).update(status='pending', claimed_at=None)
+
+
+def claim_emails(limit):
+    """
+    Toma hasta `limit` emails listos para enviar marcándolos como 'sending'.
+    La actualización condicional evita que dos workers tomen el mismo email.
+    """
+    now = timezone.now()
+    candidates = list(
+        OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk')[:limit]
+    )
+    claimed = []
+    for email in candidates:
+        if OutboxEmail.objects.filter(pk=email.pk, status='pending').update(status='sending', claimed_at=now):
+            email.status = 'sending'
+            email.claimed_at = now
+            claimed.append(email)
+    return claimed
+
+
+def mark_sent(email):
+    email.status = 'sent'
+    email.attempts += 1
+    email.sent_at = timezone.now()
+    email.last_error = ''
+    email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+
+
+def mark_failed(email, error):
+    """Programa el siguiente intento o, si se agotaron, marca el email como fallido"""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.claimed_at = None
+    email.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'claimed_at'])
+
+
+def deliver_emails(emails):
+    """
+    Envía los emails por una sola conexión. Retorna (enviados, fallidos).
+    Si un envío falla se reabre la conexión para los siguientes; si no se
+    puede abrir, el resto del lote se reprograma con el mismo error.
+    """
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            mark_failed(email, e)
+        return 0, len(emails)
+
+    try:
+        for index, email in enumerate(emails):
+            try:
+                connection.send_messages([build_message(email, connection)])
+            except Exception as e:
+                mark_failed(email, e)
+                failed += 1
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as e:
+                    for pending in emails[index + 1:]:
+                        mark_failed(pending, e)
+                    failed += len(emails) - index - 1
+                    break
+            else:
+                mark_sent(email)
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
@@ -1,9 +1,19 @@
 """
 Tests para la aplicación de autenticación y usuarios
 """
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
-from .models import UserRole, LoginHistory
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.utils import timezone
+from .email_rendering import get_plain_skeleton, html_to_plain_text, render_email
+from .user_agents import classify_user_agent
+from .models import UserRole, LoginHistory, OutboxEmail, ActiveSession
 
 User = get_user_model()
 
@@ -101,3 +111,157 @@ class AuthViewsTest(TestCase):
         """Test de que el dashboard requiere login"""
         response = self.client.get('/accounts/dashboard/')
         self.assertEqual(response.status_code, 302)  # Redirección a login
+
+
+@override_settings(EMAIL_OUTBOX_ENABLED=True)
+class EmailOutboxTest(TestCase):
+    """Tests para la bandeja de salida de emails"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+    
+    def test_login_queues_notification_and_worker_sends_it(self):
+        """Test de que el login no envía el email y el worker lo entrega después"""
+        self.client.post('/accounts/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.recipients, ['test@example.com'])
+        
+        call_command('process_email_outbox', stdout=StringIO())
+        
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(mail.outbox[0].alternatives), 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+    
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1', EMAIL_PORT=1, EMAIL_TIMEOUT=1, EMAIL_OUTBOX_MAX_ATTEMPTS=2
+    )
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        """Test de que un envío fallido se reprograma y se marca como fallido al agotar los intentos"""
+        OutboxEmail.objects.create(
+            subject='Asunto', plain_message='Mensaje', from_email='noreply@example.com',
+            recipients=['test@example.com']
+        )
+        
+        call_command('process_email_outbox', stdout=StringIO())
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, email.created_at)
+        
+        OutboxEmail.objects.update(next_attempt_at=email.created_at)
+        call_command('process_email_outbox', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+
+class EmailRenderingTest(TestCase):
+    """Tests para el renderizado de emails con esqueleto de texto plano"""
+    
+    def test_plain_text_matches_html_conversion(self):
+        """Test de que el texto plano del esqueleto coincide con la conversión del HTML"""
+        user = User(username='testuser', email='test@example.com', first_name='Ana')
+        context = {'user': user, 'reset_link': 'https://example.com/reset/?a=1&b=2', 'current_year': 2025}
+        
+        html_message, plain_message = render_email('accounts/emails/password_reset_email.html', context)
+        
+        self.assertIn('&amp;b=2', html_message)
+        # El enlace llega sin escapar al texto plano; el resto es idéntico a la conversión del HTML
+        self.assertEqual(plain_message, html_to_plain_text(html_message).replace('&amp;', '&'))
+        self.assertIs(
+            get_plain_skeleton('accounts/emails/password_reset_email.html'),
+            get_plain_skeleton('accounts/emails/password_reset_email.html')
+        )
+
+
+class DeleteExpiredAccountsBatchTest(TestCase):
+    """Tests para el modo por lotes de delete_expired_accounts"""
+    
+    def test_batch_mode_deletes_dependents_and_releases_stock(self):
+        """Test de que el modo por lotes elimina los datos dependientes y devuelve las reservas"""
+        from productos.models import Cart, Notification, NotificationCounter, Producto, Review
+        from productos.stock import set_item_quantity
+        
+        producto = Producto.objects.create(nombre='Labial', descripcion='Descripción', precio=10, stock=5)
+        expired = User.objects.create_user(
+            username='expired', email='expired@example.com', password='testpass123',
+            is_pending_deletion=True, is_active=False,
+            scheduled_deletion_date=timezone.now() - timedelta(days=1)
+        )
+        active = User.objects.create_user(username='active', email='active@example.com', password='testpass123')
+        for user in (expired, active):
+            LoginHistory.objects.create(user=user, ip_address='127.0.0.1')
+            Notification.objects.create(user=user, notification_type='system', title='Aviso', message='Mensaje')
+            Review.objects.create(producto=producto, user=user, rating=5, title='Bueno', comment='Muy bueno')
+        set_item_quantity(Cart.objects.create(user=expired), producto.pk, 2)
+        
+        out = StringIO()
+        call_command('delete_expired_accounts', batch=True, chunk_size=1, stdout=out)
+        
+        self.assertIn('1 cuenta(s) eliminada(s)', out.getvalue())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['active'])
+        self.assertEqual(LoginHistory.objects.count(), 1)
+        self.assertEqual(list(Review.objects.values_list('user_id', flat=True)), [active.pk])
+        self.assertEqual(list(NotificationCounter.objects.values_list('user_id', flat=True)), [active.pk])
+        self.assertFalse(Cart.objects.exists())
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 5)
+        self.assertEqual([m.to for m in mail.outbox], [['expired@example.com']])
+    
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1', EMAIL_PORT=1)
+    def test_batch_mode_reports_failed_notices(self):
+        """Test de que un aviso que no se pudo enviar se informa en lugar de descartarse"""
+        User.objects.create_user(
+            username='expired', email='expired@example.com', password='testpass123',
+            is_pending_deletion=True, is_active=False,
+            scheduled_deletion_date=timezone.now() - timedelta(days=1)
+        )
+        
+        err = StringIO()
+        call_command('delete_expired_accounts', batch=True, stdout=StringIO(), stderr=err)
+        
+        self.assertFalse(User.objects.exists())
+        self.assertIn('No se pudo enviar el aviso de eliminación a expired@example.com', err.getvalue())
+
+
+class ActiveSessionMiddlewareTest(TestCase):
+    """Tests para el rastreo de sesiones activas"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+    
+    def session_queries(self, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/accounts/login/', **extra)
+        return [q['sql'] for q in ctx.captured_queries if 'active_sessions' in q['sql']]
+    
+    def test_writes_are_throttled_until_ip_changes(self):
+        """Test de que solo se escribe la primera vez y cuando cambia la IP"""
+        self.assertTrue(self.session_queries())
+        self.assertEqual(self.session_queries(), [])
+        self.assertTrue(self.session_queries(REMOTE_ADDR='10.0.0.2'))
+        
+        session = ActiveSession.objects.get()
+        self.assertEqual((session.user, session.ip_address), (self.user, '10.0.0.2'))
+    
+    def test_user_agent_classification_is_stored(self):
+        """Test de que la clasificación del user agent se guarda al crear la sesión"""
+        iphone = (
+            'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 '
+            '(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
+        )
+        self.session_queries(HTTP_USER_AGENT=iphone)
+        
+        session = ActiveSession.objects.get()
+        self.assertEqual(
+            (session.device_info, session.browser_info, session.device_icon, session.browser_name, session.os_name),
+            ('iPhone', 'Safari', 'fa-mobile-alt', 'Safari', 'iOS')
+        )
+        self.assertIs(classify_user_agent(iphone), classify_user_agent(iphone))
@@ -0,0 +1,88 @@
+"""
+Clasificación del user agent de las sesiones activas
+
+Un solo recorrido del user agent obtiene el dispositivo, el navegador, el
+ícono y el sistema operativo. El resultado se memoriza por user agent
+(lru_cache): los navegadores de los usuarios se repiten mucho, así que la
+mayoría de las sesiones nuevas no vuelven a analizar el texto. El
+middleware guarda el resultado en ActiveSession al crear la sesión y la
+lista de sesiones solo lee esos campos.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+# User agents distintos que se recuerdan
+USER_AGENT_CACHE_SIZE = 2048
+
+
+class UserAgentInfo(NamedTuple):
+    device_info: str
+    browser_info: str
+    device_icon: str
+    browser_name: str
+    os_name: str
+
+
+def _device(ua):
+    """Retorna (device_info, device_icon)"""
+    if 'iphone' in ua:
+        return 'iPhone', 'fa-mobile-alt'
+    if 'ipad' in ua:
+        return 'iPad', 'fa-tablet-alt'
+    if 'android' in ua:
+        if 'mobile' in ua:
+            return 'Android Phone', 'fa-mobile-alt'
+        return 'Android Tablet', 'fa-tablet-alt'
+    if 'mobile' in ua:
+        icon = 'fa-mobile-alt'
+    elif 'tablet' in ua:
+        icon = 'fa-tablet-alt'
+    else:
+        icon = 'fa-desktop'
+    if 'windows' in ua:
+        return 'Windows PC', icon
+    if 'mac os' in ua or 'macos' in ua:
+        return 'Mac', icon
+    if 'linux' in ua:
+        return 'Linux PC', icon
+    return 'Dispositivo Desconocido', icon
+
+
+def _browser(ua):
+    """Retorna (browser_info, browser_name)"""
+    if 'edge' in ua or 'edg/' in ua:
+        return 'Microsoft Edge', 'Edge'
+    # Opera también anuncia "chrome": se revisa antes
+    if 'opera' in ua or 'opr/' in ua:
+        return 'Opera', 'Opera'
+    if 'chrome' in ua:
+        return 'Google Chrome', 'Chrome'
+    if 'firefox' in ua:
+        return 'Mozilla Firefox', 'Firefox'
+    if 'safari' in ua:
+        return 'Safari', 'Safari'
+    return 'Navegador Desconocido', 'Desconocido'
+
+
+def _os(ua):
+    # Android anuncia "linux" e iOS "like mac os x": se revisan antes
+    if 'android' in ua:
+        return 'Android'
+    if 'iphone' in ua or 'ipad' in ua:
+        return 'iOS'
+    if 'windows' in ua:
+        return 'Windows'
+    if 'mac os' in ua or 'macos' in ua:
+        return 'macOS'
+    if 'linux' in ua:
+        return 'Linux'
+    return 'Desconocido'
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def classify_user_agent(user_agent):
+    """Clasifica un user agent; retorna un UserAgentInfo"""
+    ua = (user_agent or '').lower()
+    device_info, device_icon = _device(ua)
+    browser_info, browser_name = _browser(ua)
+    return UserAgentInfo(device_info, browser_info, device_icon, browser_name, _os(ua))
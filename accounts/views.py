@@ -8,19 +8,17 @@ from django.contrib import messages
 from django.views.decorators.csrf import csrf_protect
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.template.loader import render_to_string
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.utils.html import strip_tags
 from datetime import timedelta
 import json
-import re
 from .models import CustomUser, UserRole, LoginHistory
 from .forms import UserRegistrationForm, UserLoginForm, UserProfileForm, ChangePasswordForm
+from .email_rendering import render_email
+from .mail import send_html_email
 
 
 def get_client_ip(request):
@@ -33,68 +31,6 @@ def get_client_ip(request):
     return ip
 
 
-def html_to_plain_text(html_content):
-    """
-    Convierte contenido HTML a texto plano para emails
-    Elimina tags HTML y formatea el texto de manera legible
-    """
-    # Eliminar scripts y estilos
-    text = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL)
-    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL)
-    
-    # Reemplazar <br> y <p> con saltos de línea
-    text = re.sub(r'<br\s*/?>', '\n', text)
-    text = re.sub(r'</p>', '\n\n', text)
-    text = re.sub(r'<p[^>]*>', '', text)
-    
-    # Reemplazar <li> con bullets
-    text = re.sub(r'<li[^>]*>', '  • ', text)
-    text = re.sub(r'</li>', '\n', text)
-    
-    # Eliminar todos los tags HTML restantes
-    text = strip_tags(text)
-    
-    # Limpiar espacios múltiples
-    text = re.sub(r' +', ' ', text)
-    
-    # Limpiar líneas vacías múltiples
-    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-    
-    # Limpiar espacios al inicio/final de cada línea
-    text = '\n'.join(line.strip() for line in text.split('\n'))
-    
-    return text.strip()
-
-
-def send_html_email(subject, plain_message, html_message, from_email, recipient_list, fail_silently=False):
-    """
-    Envía un email con versión HTML y texto plano.
-    En desarrollo (consola): solo muestra texto plano
-    En producción (SMTP): envía ambas versiones (multipart)
-    """
-    from kitty_glow.local_settings import IS_DEPLOYED
-    
-    if IS_DEPLOYED:
-        # Producción: Enviar email multipart (HTML + texto plano)
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=plain_message,
-            from_email=from_email,
-            to=recipient_list
-        )
-        msg.attach_alternative(html_message, "text/html")
-        msg.send(fail_silently=fail_silently)
-    else:
-        # Desarrollo: Solo enviar texto plano a la consola
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=from_email,
-            recipient_list=recipient_list,
-            fail_silently=fail_silently
-        )
-
-
 @csrf_protect
 def login_view(request):
     """
@@ -287,13 +223,14 @@ def dashboard_view(request):
     
     # Importar modelos de productos
     from productos.models import Review, Favorite, ActivityLog, Cart, Notification
+    from productos.counters import get_unread_count
     
     # Obtener estadísticas del usuario
     user_stats = {
         'total_reviews': Review.objects.filter(user=request.user).count(),
         'total_favorites': Favorite.objects.filter(user=request.user).count(),
         'total_activities': ActivityLog.objects.filter(user=request.user).count(),
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
+        'unread_notifications': get_unread_count(request.user),
     }
     
     # Obtener carrito
@@ -452,7 +389,7 @@ def change_password_view(request):
             # Enviar email de notificación
             try:
                 subject = 'Tu contraseña ha sido actualizada - Kitty Glow'
-                html_message = render_to_string('accounts/emails/password_changed_notification.html', {
+                html_message, plain_message = render_email('accounts/emails/password_changed_notification.html', {
                     'user': {
                         'username': user_username,
                         'first_name': user_first_name,
@@ -466,9 +403,6 @@ def change_password_view(request):
                     'current_year': timezone.now().year,
                 })
                 
-                # Crear versión en texto plano
-                plain_message = html_to_plain_text(html_message)
-                
                 send_html_email(
                     subject=subject,
                     plain_message=plain_message,
@@ -727,15 +661,12 @@ def send_verification_email(request, user):
     
     # Enviar email
     subject = 'Verifica tu cuenta en Kitty Glow'
-    html_message = render_to_string('accounts/emails/verification_email.html', {
+    html_message, plain_message = render_email('accounts/emails/verification_email.html', {
         'user': user,
         'verification_link': verification_link,
         'current_year': timezone.now().year,
     })
     
-    # Crear versión en texto plano
-    plain_message = html_to_plain_text(html_message)
-    
     send_html_email(
         subject=subject,
         plain_message=plain_message,
@@ -751,7 +682,7 @@ def send_login_notification(request, user):
     Envía un email de notificación cuando el usuario inicia sesión
     """
     subject = 'Notificación de inicio de sesión en Kitty Glow'
-    html_message = render_to_string('accounts/emails/login_notification.html', {
+    html_message, plain_message = render_email('accounts/emails/login_notification.html', {
         'user': user,
         'login_time': timezone.now(),  # Pasar datetime, no string - el template lo formatea
         'ip_address': get_client_ip(request),
@@ -759,9 +690,6 @@ def send_login_notification(request, user):
         'current_year': timezone.now().year,
     })
     
-    # Crear versión en texto plano
-    plain_message = html_to_plain_text(html_message)
-    
     send_html_email(
         subject=subject,
         plain_message=plain_message,
@@ -777,7 +705,7 @@ def send_password_changed_notification(request, user):
     Envía un email de notificación cuando se cambia la contraseña
     """
     subject = 'Tu contraseña ha sido actualizada - Kitty Glow'
-    html_message = render_to_string('accounts/emails/password_changed_notification.html', {
+    html_message, plain_message = render_email('accounts/emails/password_changed_notification.html', {
         'user': user,
         'change_time': timezone.now(),  # Pasar datetime, no string - el template lo formatea
         'ip_address': get_client_ip(request),
@@ -785,9 +713,6 @@ def send_password_changed_notification(request, user):
         'current_year': timezone.now().year,
     })
     
-    # Crear versión en texto plano
-    plain_message = html_to_plain_text(html_message)
-    
     send_html_email(
         subject=subject,
         plain_message=plain_message,
@@ -803,15 +728,12 @@ def send_account_deletion_notification(user_email, username):
     Envía un email de notificación cuando se elimina una cuenta
     """
     subject = 'Tu cuenta ha sido eliminada - Kitty Glow'
-    html_message = render_to_string('accounts/emails/account_deleted_notification.html', {
+    html_message, plain_message = render_email('accounts/emails/account_deleted_notification.html', {
         'username': username,
         'deletion_time': timezone.now(),  # Pasar datetime, no string - el template lo formatea
         'current_year': timezone.now().year,
     })
     
-    # Crear versión en texto plano
-    plain_message = html_to_plain_text(html_message)
-    
     send_html_email(
         subject=subject,
         plain_message=plain_message,
@@ -829,16 +751,13 @@ def send_account_deactivation_notification(user):
     deletion_date = timezone.now() + timedelta(days=30)  # Pasar datetime, no string
     
     subject = 'Tu cuenta será eliminada - Kitty Glow'
-    html_message = render_to_string('accounts/emails/account_deactivation_notification.html', {
+    html_message, plain_message = render_email('accounts/emails/account_deactivation_notification.html', {
         'user': user,
         'deactivation_time': timezone.now(),  # Pasar datetime, no string - el template lo formatea
         'deletion_date': deletion_date,  # Pasar datetime, no string - el template lo formatea
         'current_year': timezone.now().year,
     })
     
-    # Crear versión en texto plano
-    plain_message = html_to_plain_text(html_message)
-    
     send_html_email(
         subject=subject,
         plain_message=plain_message,
@@ -891,15 +810,12 @@ def password_reset_request(request):
             
             # Enviar email
             subject = 'Restablece tu contraseña en Kitty Glow'
-            html_message = render_to_string('accounts/emails/password_reset_email.html', {
+            html_message, plain_message = render_email('accounts/emails/password_reset_email.html', {
                 'user': user,
                 'reset_link': reset_link,
                 'current_year': timezone.now().year,
             })
             
-            # Crear versión en texto plano
-            plain_message = html_to_plain_text(html_message)
-            
             send_html_email(
                 subject=subject,
                 plain_message=plain_message,
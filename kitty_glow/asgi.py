@@ -3,6 +3,16 @@ ASGI config for kitty_glow project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Bajo ASGI el stream de notificaciones en vivo (productos:notification_stream)
+mantiene las conexiones SSE en el event loop. Para servirlo:
+
+    uvicorn kitty_glow.asgi:application --host 0.0.0.0 --port 8080
+
+o con Gunicorn: gunicorn kitty_glow.asgi:application -k uvicorn.workers.UvicornWorker
+Las actualizaciones en vivo requieren un servidor ASGI. Bajo WSGI (kitty_glow.wsgi,
+como en el Procfile) base.html no incluye el script y el contador de notificaciones
+solo se actualiza al recargar la página.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
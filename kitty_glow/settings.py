@@ -86,6 +86,37 @@ MIDDLEWARE = [
     'accounts.middleware.ActiveSessionMiddleware',  # Rastreo de sesiones activas
 ]
 
+# Cache Configuration
+# Configuración de caché
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# En producción gunicorn corre varios procesos y los comandos de mantenimiento otros más:
+# las invalidaciones (detalle de productos, contadores del encabezado) deben llegar a
+# todos, por eso se usa una caché compartida en la base de datos. La tabla se crea con
+# "python manage.py createcachetable" (incluido en el comando de inicio del despliegue).
+# En desarrollo (un solo proceso de runserver) basta la caché en memoria.
+# Por defecto Django guarda como máximo 300 claves y, al llenarse, borra un tercio:
+# hay claves por usuario (contadores) y por producto (detalle), así que el límite se
+# ajusta al volumen esperado. CACHE_CULL_FREQUENCY=N borra 1/N de las claves al llenarse.
+CACHE_OPTIONS = {
+    'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '50000')),
+    'CULL_FREQUENCY': int(os.getenv('CACHE_CULL_FREQUENCY', '10')),
+}
+if IS_DEPLOYED:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'kitty_glow_cache',
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+
 # Session Configuration
 # Configuración de sesiones
 # https://docs.djangoproject.com/en/5.2/topics/http/sessions/
@@ -253,6 +284,12 @@ else:
 # Se define el nombre de la carpeta de archivos públicos
 PUBLIC_MEDIA = 'publico'
 
+# Archivos privados con datos personales (reportes), ver productos/storage.py
+# En producción se guardan en S3 bajo esta carpeta con ACL privada y URLs firmadas
+PRIVATE_MEDIA = 'privado'
+# En desarrollo se guardan en disco fuera de MEDIA_ROOT para que no se sirvan por /media/
+PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'private_media')
+
 # Custom User Model
 # Modelo de usuario personalizado
 # https://docs.djangoproject.com/en/5.2/topics/auth/customizing/#substituting
@@ -308,3 +345,75 @@ else:
     EMAIL_HOST_PASSWORD = ''
     DEFAULT_FROM_EMAIL = 'noreply@kitty-glow-dev.local'
 
+
+# Configuración de la tienda (app productos)
+
+# Número de fragmentos del contador de votos útiles por reseña
+# Repartir los votos entre varias filas evita que una reseña popular se convierta
+# en una fila caliente; el comando consolidar_votos_utiles los suma en Review.helpful_count
+REVIEW_HELPFUL_SHARDS = int(os.getenv('REVIEW_HELPFUL_SHARDS', '8'))
+
+# Segundos que se guardan los fragmentos de catálogo del detalle de producto
+# Las señales de productos invalidan la versión al cambiar el producto o sus reseñas
+PRODUCTO_DETAIL_CACHE_TIMEOUT = int(os.getenv('PRODUCTO_DETAIL_CACHE_TIMEOUT', '3600'))
+
+# Segundos que se guardan los contadores del encabezado (carrito y notificaciones) por usuario
+# Las señales de productos los invalidan al cambiar el carrito o las notificaciones
+HEADER_COUNTS_CACHE_TIMEOUT = int(os.getenv('HEADER_COUNTS_CACHE_TIMEOUT', '300'))
+
+# Minutos que un item del carrito mantiene reservado su stock
+# El comando liberar_reservas_vencidas devuelve al stock las reservas vencidas
+CART_RESERVATION_MINUTES = int(os.getenv('CART_RESERVATION_MINUTES', '15'))
+
+# Días sin actividad tras los cuales el comando limpiar_carritos_abandonados elimina un carrito
+CART_ABANDONED_DAYS = int(os.getenv('CART_ABANDONED_DAYS', '30'))
+
+# Minutos de margen antes de sumar un pedido a los resúmenes de ventas
+# Evita saltarse pedidos cuya transacción aún no había terminado al actualizar
+ROLLUP_LAG_MINUTES = int(os.getenv('ROLLUP_LAG_MINUTES', '5'))
+
+# Minutos tras los cuales un reporte en proceso se considera atascado y vuelve a la cola
+REPORT_JOB_TIMEOUT_MINUTES = int(os.getenv('REPORT_JOB_TIMEOUT_MINUTES', '30'))
+
+# Stock con el que el comando revisar_stock_bajo alerta a los productos sin stock mínimo propio
+LOW_STOCK_THRESHOLD = int(os.getenv('LOW_STOCK_THRESHOLD', '5'))
+
+# Minutos tras los cuales un envío de notificaciones en proceso se considera atascado y vuelve a la cola
+NOTIFICATION_JOB_TIMEOUT_MINUTES = int(os.getenv('NOTIFICATION_JOB_TIMEOUT_MINUTES', '30'))
+
+# Horas tras la creación de un producto durante las que agregarlo a una categoría lo
+# anuncia como nuevo a sus seguidores; recategorizar productos más antiguos no avisa
+NEW_PRODUCT_MAX_AGE_HOURS = int(os.getenv('NEW_PRODUCT_MAX_AGE_HOURS', '24'))
+
+# Segundos entre consultas del contador en cada conexión SSE de notificaciones
+# (y entre consultas del JavaScript en los navegadores sin EventSource)
+LIVE_NOTIFICATIONS_POLL_SECONDS = int(os.getenv('LIVE_NOTIFICATIONS_POLL_SECONDS', '15'))
+
+# Segundos que dura una conexión SSE antes de cerrarse; el navegador se reconecta solo
+LIVE_NOTIFICATIONS_MAX_SECONDS = int(os.getenv('LIVE_NOTIFICATIONS_MAX_SECONDS', '600'))
+
+# Días que el comando depurar_notificaciones conserva las notificaciones leídas
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+
+# Notificaciones que depurar_notificaciones conserva como máximo por usuario (0 = sin límite)
+# La vista de notificaciones solo muestra las 50 más recientes
+NOTIFICATION_MAX_PER_USER = int(os.getenv('NOTIFICATION_MAX_PER_USER', '200'))
+
+# Configuración de la bandeja de salida de emails (app accounts)
+# Si EMAIL_OUTBOX_ENABLED es True, los emails se guardan en la tabla email_outbox y
+# el comando process_email_outbox los envía; si es False se envían durante la petición
+# Activarlo solo si hay un worker ejecutando process_email_outbox (ver README)
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'False') == 'True'
+
+# Intentos de envío de un email antes de marcarlo como fallido
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '5'))
+
+# Segundos de espera antes del primer reintento (se duplica en cada intento)
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', '60'))
+
+# Minutos tras los cuales un email en envío se considera atascado y vuelve a la cola
+EMAIL_OUTBOX_TIMEOUT_MINUTES = int(os.getenv('EMAIL_OUTBOX_TIMEOUT_MINUTES', '10'))
+
+# Segundos entre actualizaciones de la última actividad de una sesión activa
+# Dentro del intervalo el middleware no escribe en la base de datos salvo que cambie la IP
+ACTIVE_SESSION_UPDATE_INTERVAL = int(os.getenv('ACTIVE_SESSION_UPDATE_INTERVAL', '300'))
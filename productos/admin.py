@@ -1,8 +1,12 @@
 from django.contrib import admin
 from .models import (
     Usuario, Producto, Categoria, ProductoCategoria, Pedido, DetallePedido, Reseña,
-    Review, Favorite, ActivityLog, Notification, Cart, CartItem
+    Review, ReviewVote, ReviewHelpfulShard, Favorite, ActivityLog, Notification, Cart, CartItem,
+    JobCheckpoint, ResumenVentasProducto, ResumenVentasCategoria, ReportJob, AlertaStockBajo,
+    NotificationJob, PriceAlert, CategoriaFollow
 )
+from .counters import mark_notifications_read, mark_notifications_unread
+from .forms import ProductoAdminForm
 
 
 # Configuración del modelo Usuario en el admin
@@ -18,7 +22,8 @@ class UsuarioAdmin(admin.ModelAdmin):
 # Configuración del modelo Producto en el admin
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'nombre', 'precio', 'stock', 'fecha_creacion')
+    form = ProductoAdminForm
+    list_display = ('id', 'nombre', 'precio', 'stock', 'stock_minimo', 'fecha_creacion')
     search_fields = ('nombre', 'descripcion')
     list_filter = ('fecha_creacion',)
     ordering = ('-fecha_creacion',)
@@ -53,11 +58,12 @@ class DetallePedidoInline(admin.TabularInline):
 # Configuración del modelo Pedido en el admin
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'usuario', 'fecha_pedido', 'total')
-    search_fields = ('usuario__nombre', 'usuario__email')
+    list_display = ('id', 'usuario', 'user', 'fecha_pedido', 'total')
+    list_select_related = ('usuario', 'user')
+    search_fields = ('usuario__nombre', 'usuario__email', 'user__username')
     list_filter = ('fecha_pedido',)
     ordering = ('-fecha_pedido',)
-    readonly_fields = ('fecha_pedido',)
+    readonly_fields = ('fecha_pedido', 'idempotency_key')
     inlines = [DetallePedidoInline]
 
 
@@ -86,10 +92,31 @@ class ReviewAdmin(admin.ModelAdmin):
     search_fields = ('producto__nombre', 'user__username', 'user__email', 'title', 'comment')
     list_filter = ('rating', 'is_verified_purchase', 'created_at')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at', 'helpful_count')
+    readonly_fields = ('created_at', 'updated_at', 'helpful_count', 'legacy_reseña')
     list_per_page = 20
 
 
+# Configuración del modelo ReviewVote en el admin
+@admin.register(ReviewVote)
+class ReviewVoteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'review', 'user', 'created_at')
+    search_fields = ('user__username', 'review__title', 'review__producto__nombre')
+    list_filter = ('created_at',)
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
+    list_select_related = ('review__producto', 'review__user', 'user')
+    list_per_page = 50
+
+
+# Configuración del modelo ReviewHelpfulShard en el admin
+@admin.register(ReviewHelpfulShard)
+class ReviewHelpfulShardAdmin(admin.ModelAdmin):
+    list_display = ('id', 'review', 'shard', 'count')
+    search_fields = ('review__title',)
+    ordering = ('review', 'shard')
+    list_select_related = ('review__producto', 'review__user')
+
+
 # Configuración del modelo Favorite en el admin
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -124,11 +151,11 @@ class NotificationAdmin(admin.ModelAdmin):
     actions = ['mark_as_read', 'mark_as_unread']
     
     def mark_as_read(self, request, queryset):
-        queryset.update(is_read=True)
+        mark_notifications_read(queryset)
     mark_as_read.short_description = "Marcar como leídas"
     
     def mark_as_unread(self, request, queryset):
-        queryset.update(is_read=False)
+        mark_notifications_unread(queryset)
     mark_as_unread.short_description = "Marcar como no leídas"
 
 
@@ -136,26 +163,146 @@ class NotificationAdmin(admin.ModelAdmin):
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
-    fields = ('producto', 'quantity', 'added_at')
-    readonly_fields = ('added_at',)
+    fields = ('producto', 'quantity', 'reserved_quantity', 'added_at')
+    readonly_fields = ('added_at', 'reserved_quantity')
+
+
+# Configuración del modelo PriceAlert en el admin
+@admin.register(PriceAlert)
+class PriceAlertAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'producto', 'precio_objetivo', 'is_active', 'created_at', 'triggered_at')
+    list_select_related = ('user', 'producto')
+    search_fields = ('user__username', 'producto__nombre')
+    list_filter = ('is_active', 'created_at')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'triggered_at')
+
+
+# Configuración del modelo CategoriaFollow en el admin
+@admin.register(CategoriaFollow)
+class CategoriaFollowAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'categoria', 'created_at')
+    list_select_related = ('user', 'categoria')
+    search_fields = ('user__username', 'categoria__nombre')
+    list_filter = ('categoria', 'created_at')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
 
 
 # Configuración del modelo Cart en el admin
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'total_items', 'total_price', 'created_at', 'updated_at')
+    list_display = ('id', 'user', 'cart_total_items', 'cart_total_price', 'created_at', 'updated_at')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'user__email')
     ordering = ('-updated_at',)
-    readonly_fields = ('created_at', 'updated_at', 'total_items', 'total_price')
+    readonly_fields = ('created_at', 'updated_at', 'cart_total_items', 'cart_total_price')
     inlines = [CartItemInline]
 
+    def get_queryset(self, request):
+        # Los totales se anotan en la consulta del listado en lugar de uno por fila
+        return super().get_queryset(request).with_totals()
+
+    def cart_total_items(self, obj):
+        return obj.total_items
+    cart_total_items.short_description = "Total items"
+    cart_total_items.admin_order_field = 'annotated_total_items'
+
+    def cart_total_price(self, obj):
+        return obj.total_price
+    cart_total_price.short_description = "Total"
+    cart_total_price.admin_order_field = 'annotated_total_price'
+
 
 # Configuración del modelo CartItem en el admin
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-    list_display = ('id', 'cart', 'producto', 'quantity', 'subtotal', 'added_at')
+    list_display = ('id', 'cart', 'producto', 'quantity', 'reserved_quantity', 'reserved_until', 'subtotal', 'added_at')
+    list_select_related = ('cart__user', 'producto')
     search_fields = ('cart__user__username', 'producto__nombre')
-    list_filter = ('added_at',)
+    list_filter = ('added_at', 'reserved_until')
     ordering = ('-added_at',)
-    readonly_fields = ('added_at', 'subtotal')
+    # La reserva solo la modifica productos/stock.py para no descuadrar el stock
+    readonly_fields = ('added_at', 'subtotal', 'reserved_quantity', 'reserved_until')
+
+
+# Configuración del modelo JobCheckpoint en el admin
+@admin.register(JobCheckpoint)
+class JobCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'last_id', 'updated_at')
+    search_fields = ('name',)
+    ordering = ('name',)
+    readonly_fields = ('updated_at',)
+
+
+# Configuración de los resúmenes de ventas en el admin (solo lectura)
+class ResumenVentasAdmin(admin.ModelAdmin):
+    list_filter = ('periodo', 'fecha_inicio')
+    date_hierarchy = 'fecha_inicio'
+    ordering = ('-fecha_inicio',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ResumenVentasProducto)
+class ResumenVentasProductoAdmin(ResumenVentasAdmin):
+    list_display = ('fecha_inicio', 'periodo', 'producto', 'unidades', 'ingresos', 'pedidos')
+    list_select_related = ('producto',)
+    search_fields = ('producto__nombre',)
+
+
+@admin.register(ResumenVentasCategoria)
+class ResumenVentasCategoriaAdmin(ResumenVentasAdmin):
+    list_display = ('fecha_inicio', 'periodo', 'categoria', 'unidades', 'ingresos', 'pedidos')
+    list_select_related = ('categoria',)
+    search_fields = ('categoria__nombre',)
+
+
+# Configuración del modelo ReportJob en el admin
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'formato', 'estado', 'requested_by', 'filas', 'created_at', 'finished_at')
+    list_select_related = ('requested_by',)
+    list_filter = ('estado', 'tipo', 'formato', 'created_at')
+    search_fields = ('requested_by__username',)
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'filas', 'error')
+
+
+# Configuración del modelo AlertaStockBajo en el admin (solo lectura)
+@admin.register(AlertaStockBajo)
+class AlertaStockBajoAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'stock', 'umbral', 'created_at', 'updated_at')
+    list_select_related = ('producto',)
+    search_fields = ('producto__nombre',)
+    ordering = ('stock',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Configuración del modelo NotificationJob en el admin
+@admin.register(NotificationJob)
+class NotificationJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'tipo', 'producto', 'categoria', 'estado', 'enviadas', 'notificaciones_por_segundo',
+        'created_at', 'finished_at'
+    )
+    list_select_related = ('producto', 'categoria')
+    list_filter = ('estado', 'tipo', 'created_at')
+    search_fields = ('producto__nombre', 'categoria__nombre')
+    ordering = ('-created_at',)
+    readonly_fields = (
+        'created_at', 'started_at', 'finished_at', 'enviadas', 'desde_id', 'hasta_id', 'last_subscriber_id', 'error'
+    )
 
+    def notificaciones_por_segundo(self, obj):
+        return obj.notificaciones_por_segundo
+    notificaciones_por_segundo.short_description = 'Notificaciones/s'
@@ -0,0 +1,134 @@
+"""
+Modificación del carrito por lotes (endpoint JSON cart_batch_update).
+
+Aplica una lista de operaciones add/update/remove en una transacción:
+los items y los productos se bloquean una vez, el stock se valida para
+todos los productos a la vez y se ajusta con apply_stock_deltas, y los
+items se escriben con bulk_create/bulk_update. Las operaciones que no
+pasan la validación se reportan por separado sin impedir las demás.
+"""
+from django.db import transaction
+
+from .counters import invalidate_header_counts
+from .models import Producto, CartItem
+from .stock import apply_stock_deltas, delete_released_items, get_reservation_expiry
+
+OPERATIONS = ('add', 'update', 'remove')
+
+# Máximo de operaciones aceptadas en una petición
+MAX_OPERATIONS = 100
+
+
+def parse_operations(operations):
+    """
+    Valida la forma de las operaciones recibidas.
+    Retorna (operaciones válidas como (índice, op, producto_id, cantidad), errores).
+    """
+    parsed = []
+    errors = []
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            errors.append({'index': index, 'error': 'Operación inválida.'})
+            continue
+
+        op = operation['op']
+        try:
+            producto_id = int(operation.get('producto_id'))
+            quantity = int(operation.get('quantity', 1 if op == 'add' else 0))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'Producto o cantidad inválidos.'})
+            continue
+
+        if quantity < 0 or (op == 'add' and quantity == 0):
+            errors.append({'index': index, 'producto_id': producto_id, 'error': 'Cantidad inválida.'})
+            continue
+
+        parsed.append((index, op, producto_id, quantity))
+
+    return parsed, errors
+
+
+def apply_cart_operations(cart, operations):
+    """
+    Aplica las operaciones al carrito en una sola transacción.
+    update con cantidad 0 equivale a remove.
+    Retorna la lista de errores por operación o por producto (vacía si todo se aplicó).
+    """
+    parsed, errors = parse_operations(operations)
+    if not parsed:
+        return errors
+
+    with transaction.atomic():
+        items = {
+            item.producto_id: item
+            for item in CartItem.objects.select_for_update().filter(cart=cart).order_by('producto_id')
+        }
+        productos = {
+            producto.pk: producto
+            for producto in Producto.objects.select_for_update()
+            .filter(pk__in={producto_id for _, _, producto_id, _ in parsed})
+            .order_by('pk')
+        }
+
+        # Cantidad final pedida para cada producto tras aplicar las operaciones en orden
+        desired = {}
+        for index, op, producto_id, quantity in parsed:
+            if producto_id not in productos:
+                errors.append({'index': index, 'producto_id': producto_id, 'error': 'El producto no existe.'})
+                continue
+            current = desired.get(producto_id, items[producto_id].quantity if producto_id in items else 0)
+            if op == 'add':
+                desired[producto_id] = current + quantity
+            elif op == 'update':
+                desired[producto_id] = quantity
+            else:
+                desired[producto_id] = 0
+
+        deltas = {}
+        for producto_id, quantity in desired.items():
+            item = items.get(producto_id)
+            reserved = item.reserved_quantity if item else 0
+            if item is None and quantity == 0:
+                continue
+
+            delta = quantity - reserved
+            if delta > productos[producto_id].stock:
+                errors.append({
+                    'producto_id': producto_id,
+                    'error': f'Solo hay {productos[producto_id].stock + reserved} unidades disponibles.',
+                    'available': productos[producto_id].stock + reserved,
+                })
+                continue
+            deltas[producto_id] = delta
+
+        apply_stock_deltas(deltas)
+
+        expiry = get_reservation_expiry()
+        to_create, to_update, to_delete = [], [], []
+        for producto_id in deltas:
+            quantity = desired[producto_id]
+            item = items.get(producto_id)
+            if quantity == 0:
+                to_delete.append(item.pk)
+            elif item is None:
+                to_create.append(CartItem(
+                    cart=cart, producto_id=producto_id, quantity=quantity,
+                    reserved_quantity=quantity, reserved_until=expiry,
+                ))
+            else:
+                item.quantity = item.reserved_quantity = quantity
+                item.reserved_until = expiry
+                to_update.append(item)
+
+        CartItem.objects.bulk_create(to_create)
+        CartItem.objects.bulk_update(to_update, ['quantity', 'reserved_quantity', 'reserved_until'])
+        if to_delete:
+            # El stock ya se devolvió arriba: post_delete no debe repetirlo
+            delete_released_items(CartItem.objects.filter(pk__in=to_delete))
+
+    # bulk_create/bulk_update no envían señales y delete_released_items las omite
+    if to_create or to_update or to_delete:
+        invalidate_header_counts(cart.user_id)
+
+    return errors
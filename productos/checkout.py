@@ -0,0 +1,111 @@
+"""
+Checkout: convierte el carrito de un usuario en un Pedido.
+
+Todo ocurre en una transacción: se bloquean los items del carrito y los
+productos (en orden de pk, para no provocar interbloqueos entre checkouts
+simultáneos), se descuenta el stock con un único UPDATE por lote de
+productos, se crean los DetallePedido con bulk_create guardando el precio
+vigente y se vacía el carrito. Una clave de idempotencia hace que los
+reintentos del cliente devuelvan el pedido ya creado.
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .counters import invalidate_header_counts
+from .models import Producto, Pedido, DetallePedido, CartItem, Usuario, ActivityLog
+from .stock import apply_stock_deltas, delete_released_items
+
+
+def _get_usuario(user):
+    """Usuario (modelo antiguo de pedidos) asociado a la cuenta, por email"""
+    if not user.email:
+        raise ValidationError('Agrega un email a tu perfil para realizar pedidos.')
+    usuario, _ = Usuario.objects.get_or_create(
+        email=user.email,
+        defaults={'nombre': user.get_full_name() or user.username},
+    )
+    return usuario
+
+
+def checkout_cart(user, idempotency_key=None):
+    """
+    Crea un Pedido con el contenido del carrito del usuario.
+    Retorna (pedido, created); created es False si la clave de idempotencia
+    ya correspondía a un pedido. Lanza ValidationError si no se puede comprar.
+    """
+    if idempotency_key:
+        pedido = Pedido.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if pedido:
+            return pedido, False
+
+    try:
+        with transaction.atomic():
+            pedido = _create_pedido(user, idempotency_key)
+    except IntegrityError:
+        # Otro reintento con la misma clave creó el pedido al mismo tiempo
+        pedido = Pedido.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if not idempotency_key or pedido is None:
+            raise
+        return pedido, False
+
+    return pedido, True
+
+
+def _create_pedido(user, idempotency_key):
+    items = list(
+        CartItem.objects.select_for_update()
+        .filter(cart__user=user)
+        .order_by('producto_id')
+    )
+    if not items:
+        raise ValidationError('Tu carrito está vacío.')
+
+    productos = {
+        producto.pk: producto
+        for producto in Producto.objects.select_for_update()
+        .filter(pk__in=[item.producto_id for item in items])
+        .order_by('pk')
+    }
+
+    # Las unidades reservadas ya se descontaron al agregarlas al carrito;
+    # solo falta descontar las que no tienen reserva (o cuya reserva venció)
+    faltantes = [
+        productos[item.producto_id].nombre for item in items
+        if item.quantity - item.reserved_quantity > productos[item.producto_id].stock
+    ]
+    if faltantes:
+        raise ValidationError(f'No hay stock suficiente de: {", ".join(faltantes)}.')
+
+    apply_stock_deltas({item.producto_id: item.quantity - item.reserved_quantity for item in items})
+
+    pedido = Pedido.objects.create(
+        usuario=_get_usuario(user),
+        user=user,
+        total=sum(productos[item.producto_id].precio * item.quantity for item in items),
+        idempotency_key=idempotency_key or None,
+    )
+    DetallePedido.objects.bulk_create([
+        DetallePedido(
+            pedido=pedido,
+            producto_id=item.producto_id,
+            cantidad=item.quantity,
+            precio_unitario=productos[item.producto_id].precio,
+        )
+        for item in items
+    ])
+
+    # Las reservas pasan al pedido: post_delete no debe devolver esas unidades al stock
+    delete_released_items(CartItem.objects.filter(pk__in=[item.pk for item in items]))
+    invalidate_header_counts(user.pk)
+
+    ActivityLog.objects.bulk_create([
+        ActivityLog(
+            user=user,
+            activity_type='purchase',
+            producto_id=item.producto_id,
+            description=f'Compró {item.quantity} unidad(es) de {productos[item.producto_id].nombre} (pedido #{pedido.pk})',
+        )
+        for item in items
+    ])
+
+    return pedido
@@ -2,25 +2,35 @@
 Context processors for productos app.
 Provides global template variables.
 """
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.functional import SimpleLazyObject
+
+from .counters import get_header_counts
+from .session_cart import SessionCart
+
 
 def cart_and_notifications(request):
     """
     Add cart items count and unread notifications count to all templates.
+    Counts are cached per user and evaluated lazily, so templates that never
+    print the header badges (AJAX fragments, error pages) do not query them.
+    The live notifications script is only included under ASGI, where the
+    SSE stream works (see productos/live_notifications.py).
     """
-    context = {}
-    
-    if request.user.is_authenticated:
-        # Cart items count
-        try:
-            cart = request.user.cart
-            context['cart_items_count'] = cart.items.count()
-        except Exception:
-            context['cart_items_count'] = 0
-        
-        # Unread notifications count
-        context['unread_notifications_count'] = request.user.notifications.filter(is_read=False).count()
-    else:
-        context['cart_items_count'] = 0
-        context['unread_notifications_count'] = 0
-    
-    return context
+    if not request.user.is_authenticated:
+        # Carrito de invitado: se cuenta desde la sesión, sin consultar las tablas del carrito
+        session = request.session
+        return {
+            'cart_items_count': SimpleLazyObject(lambda: len(SessionCart(session))),
+            'unread_notifications_count': 0,
+        }
+
+    user = request.user
+    counts = SimpleLazyObject(lambda: get_header_counts(user))
+    return {
+        'cart_items_count': SimpleLazyObject(lambda: counts['cart_items_count']),
+        'unread_notifications_count': SimpleLazyObject(lambda: counts['unread_notifications_count']),
+        'live_notifications_stream': isinstance(request, ASGIRequest),
+        'live_notifications_poll_seconds': getattr(settings, 'LIVE_NOTIFICATIONS_POLL_SECONDS', 15),
+    }
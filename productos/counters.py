@@ -0,0 +1,150 @@
+"""
+Contadores del encabezado (items del carrito y notificaciones sin leer).
+Se guardan por usuario en la caché compartida por todos los procesos
+(CACHES en settings.py) y se invalidan desde signals.py al cambiar
+los items del carrito o las notificaciones. Las actualizaciones masivas
+(QuerySet.update) no envían señales y deben llamar a invalidate_header_counts.
+
+Las notificaciones sin leer no se cuentan: NotificationCounter guarda el
+total por usuario. Se suma al crear notificaciones (señal post_save o
+bulk_notify) y se resta al marcarlas como leídas con mark_notifications_read,
+que solo actualiza las filas que aún no estaban leídas. Cada cambio se publica
+a las conexiones SSE abiertas del usuario (live_notifications.py).
+Las cuentas nuevas reciben su contador al crearse; las anteriores al
+contador se cuentan la primera vez que se necesita (o todas a la vez con el
+comando reconstruir_contadores_notificaciones).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .live_notifications import publish_unread_change
+from .models import CartItem, Notification, NotificationCounter
+
+HEADER_COUNTS_KEY = 'header_counts:{user_id}'
+
+
+def get_unread_count(user):
+    """Notificaciones sin leer del usuario (una lectura por clave primaria)"""
+    unread = NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first()
+    if unread is None:
+        # Cuenta anterior a NotificationCounter: se cuenta una vez y se guarda
+        unread = create_unread_counters([user.pk])[user.pk]
+    return unread
+
+
+def count_unread_by_user(user_ids):
+    """Cuenta las no leídas de los usuarios con una sola consulta; retorna {user_id: no leídas}"""
+    unread = dict.fromkeys(user_ids, 0)
+    unread.update(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .order_by().values('user_id').annotate(total=Count('pk')).values_list('user_id', 'total')
+    )
+    return unread
+
+
+def create_unread_counters(user_ids):
+    """
+    Crea el contador de los usuarios que no tienen uno, contando sus no
+    leídas actuales. Retorna {user_id: no leídas}.
+    """
+    unread = count_unread_by_user(user_ids)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=total) for user_id, total in unread.items()],
+        ignore_conflicts=True
+    )
+    return unread
+
+
+def get_header_counts(user):
+    """Retorna {'cart_items_count': int, 'unread_notifications_count': int} del usuario"""
+    key = HEADER_COUNTS_KEY.format(user_id=user.pk)
+    counts = cache.get(key)
+
+    if counts is None:
+        counts = {
+            'cart_items_count': CartItem.objects.filter(cart__user=user).count(),
+            'unread_notifications_count': get_unread_count(user),
+        }
+        cache.set(key, counts, getattr(settings, 'HEADER_COUNTS_CACHE_TIMEOUT', 300))
+
+    return counts
+
+
+def invalidate_header_counts(*user_ids):
+    """Descarta los contadores cacheados de los usuarios indicados"""
+    cache.delete_many([HEADER_COUNTS_KEY.format(user_id=user_id) for user_id in set(user_ids)])
+
+
+def adjust_unread_counts(deltas):
+    """
+    Suma (o resta, con valores negativos) a los contadores de no leídas.
+    deltas es {user_id: cantidad}; se agrupa por cantidad para usar un
+    UPDATE por valor distinto en lugar de uno por usuario.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # Solo las sumas crean contadores: una resta sin fila no tiene nada que descontar
+    # (y puede venir del borrado en cascada del propio usuario). Un contador
+    # nuevo parte de las no leídas reales, que ya incluyen este cambio
+    added = [user_id for user_id, delta in deltas.items() if delta > 0]
+    missing = set(added) - set(
+        NotificationCounter.objects.filter(user_id__in=added).values_list('user_id', flat=True)
+    )
+    if missing:
+        create_unread_counters(missing)
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if user_id not in missing:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=Greatest(F('unread') + delta, 0))
+
+    invalidate_header_counts(*deltas)
+    publish_unread_change(*deltas)
+
+
+def count_new_notifications(notifications):
+    """Suma a los contadores las notificaciones sin leer recién creadas"""
+    adjust_unread_counts(Counter(n.user_id for n in notifications if not n.is_read))
+
+
+def mark_notifications_read(queryset):
+    """
+    Marca como leídas las notificaciones del queryset que no lo estaban y
+    descuenta de los contadores solo esas filas. Retorna cuántas se marcaron.
+    """
+    with transaction.atomic():
+        unread = queryset.filter(is_read=False)
+        totals = unread.order_by().values('user_id').annotate(total=Count('pk')).values_list('user_id', 'total')
+        deltas = {user_id: -total for user_id, total in totals}
+        updated = unread.update(is_read=True)
+        adjust_unread_counts(deltas)
+    return updated
+
+
+def mark_notifications_unread(queryset):
+    """Marca como no leídas las notificaciones del queryset y las suma a los contadores"""
+    with transaction.atomic():
+        read = queryset.filter(is_read=True)
+        deltas = dict(
+            read.order_by().values('user_id').annotate(total=Count('pk')).values_list('user_id', 'total')
+        )
+        updated = read.update(is_read=False)
+        adjust_unread_counts(deltas)
+    return updated
+
+
+def rebuild_unread_count(user_id):
+    """Recalcula el contador de un usuario contando sus no leídas (usa el índice user/is_read)"""
+    unread = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    NotificationCounter.objects.update_or_create(user_id=user_id, defaults={'unread': unread})
+    invalidate_header_counts(user_id)
+    publish_unread_change(user_id)
+    return unread
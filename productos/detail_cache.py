@@ -0,0 +1,103 @@
+"""
+Caché de la página de detalle de producto.
+
+La página se arma en dos fases:
+1. Fragmentos de catálogo (descripción, categorías, calificación, reseñas y
+   productos relacionados), iguales para todos los usuarios. Se guardan ya
+   renderizados en caché bajo una versión por producto que se incrementa
+   desde signals.py cada vez que cambia algo que muestran.
+2. Datos personalizados (favorito, reseña propia, controles del carrito),
+   que la vista calcula aparte en la misma consulta del producto.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count
+from django.template.loader import render_to_string
+
+from .models import Producto, ProductoCategoria, Review
+
+VERSION_KEY = 'producto_detail:{pk}:version'
+FRAGMENTS_KEY = 'producto_detail:{pk}:v{version}'
+
+FRAGMENT_TEMPLATES = {
+    'catalogo': 'productos/fragments/producto_catalogo.html',
+    'calificacion': 'productos/fragments/producto_calificacion.html',
+    'reviews': 'productos/fragments/producto_reviews.html',
+    'relacionados': 'productos/fragments/producto_relacionados.html',
+}
+
+
+def _new_version():
+    # Una versión basada en el reloj nunca coincide con fragmentos guardados
+    # antes de que la clave de versión fuera expulsada de la caché
+    return time.time_ns()
+
+
+def get_producto_version(pk):
+    """Retorna la versión actual de los fragmentos del producto"""
+    key = VERSION_KEY.format(pk=pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_producto_version(*pks):
+    """Invalida los fragmentos cacheados de los productos indicados"""
+    for pk in set(pks):
+        key = VERSION_KEY.format(pk=pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def build_catalog_context(producto):
+    """Consulta los datos de catálogo que muestran los fragmentos"""
+    categorias = list(
+        ProductoCategoria.objects.filter(producto=producto).select_related('categoria')
+    )
+    reviews = list(Review.objects.for_producto(producto))
+    review_stats = Review.objects.filter(producto=producto).aggregate(
+        promedio=Avg('rating'),
+        total=Count('id')
+    )
+
+    productos_relacionados = []
+    if categorias:
+        productos_relacionados = list(
+            Producto.objects.filter(
+                categorias__categoria_id__in=[pc.categoria_id for pc in categorias]
+            ).exclude(pk=producto.pk).distinct()[:4]
+        )
+
+    return {
+        'producto': producto,
+        'categorias': categorias,
+        'reviews': reviews,
+        'calificacion_promedio': review_stats['promedio'],
+        'total_reviews': review_stats['total'],
+        'productos_relacionados': productos_relacionados,
+    }
+
+
+def get_producto_fragments(producto):
+    """
+    Retorna un diccionario con el HTML de cada fragmento de catálogo.
+    En un acierto de caché no se ejecuta ninguna consulta.
+    """
+    key = FRAGMENTS_KEY.format(pk=producto.pk, version=get_producto_version(producto.pk))
+    fragments = cache.get(key)
+
+    if fragments is None:
+        context = build_catalog_context(producto)
+        fragments = {
+            name: render_to_string(template_name, context)
+            for name, template_name in FRAGMENT_TEMPLATES.items()
+        }
+        cache.set(key, fragments, getattr(settings, 'PRODUCTO_DETAIL_CACHE_TIMEOUT', 3600))
+
+    return fragments
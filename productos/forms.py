@@ -1,5 +1,5 @@
 from django import forms
-from .models import Review, CartItem, Producto, Categoria, ProductoCategoria
+from .models import Review, CartItem, Producto, Categoria, ProductoCategoria, ReportJob, PriceAlert
 
 
 class ReviewForm(forms.ModelForm):
@@ -51,6 +51,25 @@ class CartItemForm(forms.ModelForm):
         }
 
 
+class PriceAlertForm(forms.ModelForm):
+    """Formulario para crear una alerta de precio"""
+
+    class Meta:
+        model = PriceAlert
+        fields = ['precio_objetivo']
+        widgets = {
+            'precio_objetivo': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'step': '0.01',
+                'min': '0.01',
+                'placeholder': '0.00'
+            })
+        }
+        labels = {
+            'precio_objetivo': 'Avisarme cuando baje de'
+        }
+
+
 class ProductSearchForm(forms.Form):
     """Formulario de búsqueda avanzada de productos"""
     
@@ -127,7 +146,38 @@ class ProductSearchForm(forms.Form):
             self.fields['categoria'].choices = choices
 
 
-class ProductoForm(forms.ModelForm):
+class ProductoStockForm(forms.ModelForm):
+    """
+    Base de los formularios que editan el stock de un Producto.
+    Guarda el stock que vio el administrador al abrir el formulario: el
+    cambio se aplica como diferencia sobre el stock actual (ver Producto.save),
+    sin pisar las reservas y ventas hechas mientras tanto.
+    """
+    
+    stock_inicial = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['stock_inicial'].initial = self.instance.stock
+    
+    def save(self, commit=True):
+        stock_inicial = self.cleaned_data.get('stock_inicial')
+        loaded = getattr(self.instance, '_loaded_values', None)
+        if loaded and stock_inicial is not None:
+            loaded['stock'] = stock_inicial
+        return super().save(commit=commit)
+
+
+class ProductoAdminForm(ProductoStockForm):
+    """Formulario del admin de productos"""
+    
+    class Meta:
+        model = Producto
+        fields = '__all__'
+
+
+class ProductoForm(ProductoStockForm):
     """Formulario para crear/editar productos"""
     
     categorias = forms.ModelMultipleChoiceField(
@@ -139,7 +189,7 @@ class ProductoForm(forms.ModelForm):
     
     class Meta:
         model = Producto
-        fields = ['nombre', 'descripcion', 'precio', 'stock']
+        fields = ['nombre', 'descripcion', 'precio', 'stock', 'stock_minimo']
         widgets = {
             'nombre': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -162,12 +212,18 @@ class ProductoForm(forms.ModelForm):
                 'min': '0',
                 'placeholder': '0'
             }),
+            'stock_minimo': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'placeholder': 'Umbral global'
+            }),
         }
         labels = {
             'nombre': 'Nombre',
             'descripcion': 'Descripción',
             'precio': 'Precio',
-            'stock': 'Stock'
+            'stock': 'Stock',
+            'stock_minimo': 'Stock mínimo'
         }
     
     def __init__(self, *args, **kwargs):
@@ -179,11 +235,16 @@ class ProductoForm(forms.ModelForm):
     def save(self, commit=True):
         producto = super().save(commit=commit)
         if commit:
-            # Eliminar categorías anteriores
-            ProductoCategoria.objects.filter(producto=producto).delete()
-            # Agregar las nuevas categorías
-            for categoria in self.cleaned_data['categorias']:
-                ProductoCategoria.objects.create(producto=producto, categoria=categoria)
+            # Aplicar solo la diferencia: recrear las filas existentes volvería
+            # a anunciar el producto a los seguidores de sus categorías
+            actuales = set(
+                ProductoCategoria.objects.filter(producto=producto).values_list('categoria_id', flat=True)
+            )
+            nuevas = {categoria.pk for categoria in self.cleaned_data['categorias']}
+            if actuales - nuevas:
+                ProductoCategoria.objects.filter(producto=producto, categoria_id__in=actuales - nuevas).delete()
+            for categoria_id in sorted(nuevas - actuales):
+                ProductoCategoria.objects.create(producto=producto, categoria_id=categoria_id)
         return producto
 
 
@@ -209,3 +270,26 @@ class CategoriaForm(forms.ModelForm):
             'nombre': 'Nombre',
             'descripcion': 'Descripción'
         }
+
+
+class ReportJobForm(forms.ModelForm):
+    """Formulario para solicitar un reporte"""
+    
+    class Meta:
+        model = ReportJob
+        fields = ['tipo', 'formato', 'fecha_desde', 'fecha_hasta']
+        widgets = {
+            'tipo': forms.Select(attrs={'class': 'form-select'}),
+            'formato': forms.Select(attrs={'class': 'form-select'}),
+            'fecha_desde': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'fecha_hasta': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        }
+        labels = {
+            'tipo': 'Tipo de reporte',
+            'formato': 'Formato',
+            'fecha_desde': 'Desde',
+            'fecha_hasta': 'Hasta'
+        }
+        help_texts = {
+            'fecha_desde': 'El reporte de inventario ignora el rango de fechas.',
+        }
@@ -0,0 +1,140 @@
+"""
+Notificaciones en vivo por Server-Sent Events (SSE).
+
+Bajo ASGI cada pestaña abierta mantiene una conexión con la vista
+notification_stream, que espera en el event loop sin ocupar un hilo ni
+consultar la base de datos mientras no pase nada. Los cambios llegan por
+un pub/sub en memoria: counters.adjust_unread_counts publica el id del
+usuario al confirmar la transacción y las conexiones de ese usuario en
+este proceso se despiertan para leer el contador y las notificaciones nuevas.
+
+Con varios procesos un cambio solo despierta a las conexiones del proceso
+que lo hizo; por eso cada conexión consulta además el contador (una lectura
+por clave primaria) cada LIVE_NOTIFICATIONS_POLL_SECONDS.
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Notification, NotificationCounter
+
+# Notificaciones nuevas enviadas como máximo por evento
+MAX_NEW_NOTIFICATIONS = 10
+
+
+class NotificationBroker:
+    """
+    Pub/sub en memoria del proceso: {user_id: {(loop, cola)}}.
+    publish() puede llamarse desde cualquier hilo (las vistas síncronas
+    corren en hilos bajo ASGI); las colas se despiertan en su event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        # maxsize=1: varios avisos seguidos se agrupan en una sola lectura
+        queue = asyncio.Queue(maxsize=1)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        return entry
+
+    def unsubscribe(self, user_id, entry):
+        with self._lock:
+            entries = self._subscribers.get(user_id)
+            if entries:
+                entries.discard(entry)
+                if not entries:
+                    del self._subscribers[user_id]
+
+    def publish(self, *user_ids):
+        with self._lock:
+            entries = [entry for user_id in set(user_ids) for entry in self._subscribers.get(user_id, ())]
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(_wake, queue)
+            except RuntimeError:
+                # El event loop de la conexión ya se cerró
+                pass
+
+
+def _wake(queue):
+    if not queue.full():
+        queue.put_nowait(True)
+
+
+broker = NotificationBroker()
+
+
+def publish_unread_change(*user_ids):
+    """Avisa a las conexiones SSE de los usuarios cuando se confirme la transacción"""
+    if user_ids:
+        transaction.on_commit(lambda: broker.publish(*user_ids))
+
+
+def format_event(event, data):
+    """Serializa un evento SSE"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _get_unread(user_id):
+    counter = await NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).afirst()
+    return counter or 0
+
+
+async def _latest_notification_id(user_id):
+    return await Notification.objects.filter(user_id=user_id).order_by('-pk').values_list('pk', flat=True).afirst() or 0
+
+
+async def _new_notifications(user_id, after_id):
+    queryset = (
+        Notification.objects.filter(user_id=user_id, pk__gt=after_id)
+        .order_by('pk')
+        .values('pk', 'notification_type', 'title', 'message', 'producto_id')[:MAX_NEW_NOTIFICATIONS]
+    )
+    return [notification async for notification in queryset]
+
+
+async def notification_events(user_id):
+    """
+    Generador asíncrono de eventos SSE de un usuario: 'unread' con el total
+    sin leer y 'notification' por cada notificación nueva. La conexión se
+    cierra tras LIVE_NOTIFICATIONS_MAX_SECONDS y el navegador se reconecta solo.
+    """
+    poll_seconds = getattr(settings, 'LIVE_NOTIFICATIONS_POLL_SECONDS', 15)
+    max_seconds = getattr(settings, 'LIVE_NOTIFICATIONS_MAX_SECONDS', 600)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+
+    entry = broker.subscribe(user_id)
+    try:
+        yield f'retry: {poll_seconds * 1000}\n\n'
+        last_id = await _latest_notification_id(user_id)
+        unread = await _get_unread(user_id)
+        yield format_event('unread', {'unread': unread})
+
+        while loop.time() < deadline:
+            try:
+                await asyncio.wait_for(entry[1].get(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+            current = await _get_unread(user_id)
+            if current == unread:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ': ping\n\n'
+                continue
+
+            if current > unread:
+                for notification in await _new_notifications(user_id, last_id):
+                    last_id = notification['pk']
+                    yield format_event('notification', notification)
+            unread = current
+            yield format_event('unread', {'unread': unread})
+    finally:
+        broker.unsubscribe(user_id, entry)
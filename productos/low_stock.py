@@ -0,0 +1,159 @@
+"""
+Monitoreo de stock bajo.
+
+Un producto tiene stock bajo cuando su stock está en o por debajo de su
+stock_minimo o, si no lo tiene, del umbral global LOW_STOCK_THRESHOLD.
+La consulta primero acota por el umbral más alto con el índice de
+Producto.stock y solo compara umbrales en las filas que quedan, así el
+costo depende de los productos con poco stock y no del tamaño del catálogo.
+
+Cada ejecución se compara con AlertaStockBajo: solo se notifican los
+productos que entran en stock bajo o que se agotan desde la revisión
+anterior, y se eliminan las alertas de los productos repuestos.
+"""
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, IntegerField, Max, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.email_rendering import render_email
+from accounts.mail import send_html_email
+
+from .models import AlertaStockBajo, Producto
+from .notifications import build_notifications, bulk_notify
+
+User = get_user_model()
+
+
+def get_low_stock_threshold():
+    """Umbral global para los productos sin stock mínimo (setting LOW_STOCK_THRESHOLD)"""
+    return max(0, getattr(settings, 'LOW_STOCK_THRESHOLD', 5))
+
+
+def low_stock_queryset():
+    """Productos con stock bajo, anotados con el umbral que les corresponde"""
+    global_threshold = get_low_stock_threshold()
+    # stock_minimo también está indexado: el máximo se resuelve sin recorrer la tabla
+    highest = Producto.objects.aggregate(highest=Max('stock_minimo'))['highest'] or 0
+
+    return (
+        Producto.objects
+        .filter(stock__lte=max(global_threshold, highest))
+        .annotate(umbral=Coalesce('stock_minimo', Value(global_threshold), output_field=IntegerField()))
+        .filter(stock__lte=F('umbral'))
+        .order_by()
+    )
+
+
+def scan_low_stock():
+    """
+    Compara el stock bajo actual con las alertas de la revisión anterior.
+    Retorna un diccionario con:
+      - nuevas: productos que entraron en stock bajo
+      - agotados: productos ya alertados que se quedaron sin stock
+      - resueltas: número de alertas eliminadas porque el producto se repuso
+      - vigentes: número total de productos con stock bajo
+    """
+    current = {
+        row['pk']: row
+        for row in low_stock_queryset().values('pk', 'nombre', 'stock', 'umbral')
+    }
+
+    with transaction.atomic():
+        alertas = {
+            alerta.producto_id: alerta
+            for alerta in AlertaStockBajo.objects.select_for_update().only('producto_id', 'stock', 'umbral')
+        }
+
+        nuevas = [row for pk, row in current.items() if pk not in alertas]
+        agotados = []
+        changed = []
+        now = timezone.now()
+        for pk, alerta in alertas.items():
+            row = current.get(pk)
+            if row is None or (alerta.stock, alerta.umbral) == (row['stock'], row['umbral']):
+                continue
+            if alerta.stock > 0 and row['stock'] <= 0:
+                agotados.append(row)
+            alerta.stock = row['stock']
+            alerta.umbral = row['umbral']
+            alerta.updated_at = now
+            changed.append(alerta)
+
+        resueltas = [pk for pk in alertas if pk not in current]
+        if resueltas:
+            AlertaStockBajo.objects.filter(producto_id__in=resueltas).delete()
+        AlertaStockBajo.objects.bulk_update(changed, ['stock', 'umbral', 'updated_at'], batch_size=500)
+        AlertaStockBajo.objects.bulk_create(
+            [
+                AlertaStockBajo(producto_id=row['pk'], stock=row['stock'], umbral=row['umbral'])
+                for row in nuevas
+            ],
+            batch_size=500,
+        )
+
+    return {
+        'nuevas': nuevas,
+        'agotados': agotados,
+        'resueltas': len(resueltas),
+        'vigentes': len(current),
+    }
+
+
+def _notification_for(row, staff_ids):
+    if row['stock'] <= 0:
+        title = f'Producto agotado: {row["nombre"]}'
+        message = f'El producto "{row["nombre"]}" se quedó sin stock.'
+    else:
+        title = f'Stock bajo: {row["nombre"]}'
+        message = f'Quedan {row["stock"]} unidad(es) de "{row["nombre"]}" (stock mínimo: {row["umbral"]}).'
+    return build_notifications(staff_ids, 'low_stock', title, message, producto_id=row['pk'])
+
+
+def get_staff():
+    """Retorna [(id, email)] del staff activo"""
+    return list(
+        User.objects.filter(is_active=True)
+        .filter(Q(is_staff=True) | Q(is_superuser=True))
+        .values_list('pk', 'email')
+    )
+
+
+def notify_staff(result, staff):
+    """
+    Crea una notificación por miembro del staff y producto nuevo o agotado.
+    Retorna el número de notificaciones creadas.
+    """
+    staff_ids = [pk for pk, _ in staff]
+    alertar = result['nuevas'] + result['agotados']
+    return bulk_notify(chain.from_iterable(_notification_for(row, staff_ids) for row in alertar))
+
+
+def send_low_stock_digest(result, staff):
+    """
+    Envía un único email de resumen a todo el staff con los productos nuevos
+    y agotados de la revisión. Retorna True si se envió.
+    """
+    alertar = result['nuevas'] + result['agotados']
+    recipients = [email for _, email in staff if email]
+    if not alertar or not recipients:
+        return False
+
+    html_message, plain_message = render_email('productos/emails/stock_bajo_resumen.html', {
+        'nuevas': sorted(result['nuevas'], key=lambda row: (row['stock'], row['nombre'])),
+        'agotados': sorted(result['agotados'], key=lambda row: row['nombre']),
+        'vigentes': result['vigentes'],
+        'current_year': timezone.now().year,
+    })
+    send_html_email(
+        subject=f'Kitty Glow: {len(alertar)} producto(s) con stock bajo',
+        plain_message=plain_message,
+        html_message=html_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=recipients,
+    )
+    return True
@@ -0,0 +1,27 @@
+"""
+Comando para actualizar los resúmenes de ventas por día y por semana
+Agrega solo los pedidos creados desde la última ejecución.
+Se recomienda ejecutarlo cada pocos minutos mediante un cron job
+"""
+from django.core.management.base import BaseCommand
+from productos.sales_rollup import update_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Agrega los pedidos nuevos a los resúmenes de ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de pedidos por transacción (por defecto: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        processed = update_sales_rollups(batch_size=options['lote'])
+
+        if processed == 0:
+            self.stdout.write(self.style.SUCCESS('No hay pedidos nuevos por resumir.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {processed} pedido(s) agregado(s) a los resúmenes'))
@@ -0,0 +1,31 @@
+"""
+Comando para consolidar los votos "¿Te resultó útil?" de las reseñas
+Suma los fragmentos de ReviewHelpfulShard en Review.helpful_count.
+Se recomienda ejecutarlo cada pocos minutos mediante un cron job
+"""
+from django.core.management.base import BaseCommand
+from productos.review_votes import consolidate_helpful_counts
+
+
+class Command(BaseCommand):
+    help = 'Consolida los votos útiles pendientes en el contador de cada reseña'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Número de reseñas por transacción (por defecto: 500)'
+        )
+
+    def handle(self, *args, **options):
+        reviews_updated, votes_moved = consolidate_helpful_counts(batch_size=options['lote'])
+
+        if reviews_updated == 0:
+            self.stdout.write(self.style.SUCCESS('No hay votos pendientes por consolidar.'))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✓ {votes_moved} voto(s) consolidado(s) en {reviews_updated} reseña(s)'
+                )
+            )
@@ -0,0 +1,179 @@
+"""
+Comando para depurar las notificaciones antiguas
+Elimina las notificaciones leídas con más de NOTIFICATION_RETENTION_DAYS días
+y, por usuario, las más antiguas que excedan NOTIFICATION_MAX_PER_USER (leídas
+o no). La tabla se recorre por rangos de clave primaria, cada lote en una
+transacción corta y con una pausa entre lotes, para no bloquear las
+notificaciones de los usuarios mientras navegan.
+Se recomienda ejecutarlo diariamente mediante un cron job
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from productos.counters import mark_notifications_read
+from productos.models import Notification
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Elimina las notificaciones leídas antiguas y el exceso de historial por usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90),
+            help='Días que se conservan las notificaciones leídas'
+        )
+        parser.add_argument(
+            '--maximo',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_MAX_PER_USER', 200),
+            help='Notificaciones que se conservan como máximo por usuario (0 = sin límite)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de notificaciones (o usuarios) por transacción (por defecto: 1000)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.2,
+            help='Segundos de espera entre lotes (por defecto: 0.2)'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo muestra cuántas notificaciones se eliminarían'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['dias'])
+
+        if options['simular']:
+            old = Notification.objects.filter(is_read=True, created_at__lt=cutoff).count()
+            self.stdout.write(self.style.WARNING(
+                f'○ Se eliminarían {old} notificación(es) leída(s) anteriores al {cutoff:%d/%m/%Y}'
+            ))
+            if options['maximo'] > 0:
+                excess = sum(
+                    total - options['maximo'] for total in self.totals_over_cap(None, options['maximo']).values()
+                )
+                self.stdout.write(self.style.WARNING(
+                    f'○ Se eliminarían hasta {excess} notificación(es) por exceder '
+                    f'{options["maximo"]} por usuario'
+                ))
+            return
+
+        expired = self.delete_expired(cutoff, options['lote'], options['pausa'])
+        trimmed = 0
+        if options['maximo'] > 0:
+            trimmed = self.trim_history(options['maximo'], options['lote'], options['pausa'])
+
+        if expired == 0 and trimmed == 0:
+            self.stdout.write(self.style.SUCCESS('No hay notificaciones para depurar.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {expired} notificación(es) leída(s) antigua(s) y {trimmed} por exceso de '
+                f'historial eliminada(s)'
+            ))
+
+    def delete_expired(self, cutoff, batch_size, pause):
+        """
+        Elimina las leídas anteriores a cutoff recorriendo la tabla por rangos de pk.
+        Las notificaciones se crean en orden de pk, así que el recorrido termina en
+        el primer rango que ya es posterior a cutoff. Las leídas no cuentan en
+        NotificationCounter, así que la señal post_delete no ajusta contadores.
+        """
+        total = 0
+        last_id = 0
+        while True:
+            window = list(
+                Notification.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', 'created_at')[:batch_size]
+            )
+            if not window or window[0][1] >= cutoff:
+                break
+            first_id, last_id = window[0][0], window[-1][0]
+
+            with transaction.atomic():
+                deleted, _ = Notification.objects.filter(
+                    pk__gte=first_id, pk__lte=last_id, is_read=True, created_at__lt=cutoff
+                ).delete()
+
+            total += deleted
+            self.stdout.write(f'  Rango #{first_id}-#{last_id}: {deleted} notificación(es) leída(s) antigua(s)')
+
+            if pause:
+                time.sleep(pause)
+        return total
+
+    def totals_over_cap(self, user_ids, cap):
+        """Retorna {user_id: total} de los usuarios (todos si user_ids es None) con más de cap notificaciones"""
+        notifications = Notification.objects.all()
+        if user_ids is not None:
+            notifications = notifications.filter(user_id__in=user_ids)
+        return dict(
+            notifications.order_by().values('user_id').annotate(total=Count('pk'))
+            .filter(total__gt=cap).values_list('user_id', 'total')
+        )
+
+    def trim_history(self, cap, batch_size, pause):
+        """
+        Recorre los usuarios por lotes de pk y, a los que exceden cap, les elimina
+        las notificaciones más antiguas en lotes de batch_size, descontando de su
+        contador las que no estaban leídas.
+        """
+        total = 0
+        last_user_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_user_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            for user_id, count in self.totals_over_cap(user_ids, cap).items():
+                # La notificación número cap (de la más nueva a la más antigua) es la última que se conserva
+                keep_from = (
+                    Notification.objects.filter(user_id=user_id).order_by('-pk')
+                    .values_list('pk', flat=True)[cap - 1]
+                )
+                deleted = self.delete_user_history(user_id, keep_from, batch_size, pause)
+                total += deleted
+                self.stdout.write(f'  Usuario #{user_id}: {deleted} de {count} notificación(es) eliminada(s)')
+        return total
+
+    def delete_user_history(self, user_id, keep_from, batch_size, pause):
+        """Elimina por lotes las notificaciones del usuario anteriores a keep_from"""
+        total = 0
+        while True:
+            with transaction.atomic():
+                # Las filas quedan bloqueadas hasta borrarlas: si el usuario las marca
+                # como leídas a la vez, su descuento y el nuestro no se suman
+                batch = list(
+                    Notification.objects.select_for_update().filter(user_id=user_id, pk__lt=keep_from)
+                    .order_by('pk').values_list('pk', flat=True)[:batch_size]
+                )
+                if not batch:
+                    break
+                chunk = Notification.objects.filter(pk__in=batch)
+                # Marcarlas como leídas descuenta las no leídas con un solo UPDATE
+                # y deja sin efecto la señal post_delete de cada fila borrada
+                mark_notifications_read(chunk)
+                deleted, _ = chunk.delete()
+
+            total += deleted
+            if pause:
+                time.sleep(pause)
+        return total
@@ -0,0 +1,41 @@
+"""
+Comando para enviar el resumen por email de las notificaciones sin leer
+Envía un único email por usuario con las notificaciones creadas desde el
+resumen anterior, por lotes y a través de una sola conexión SMTP.
+Se recomienda ejecutarlo diariamente mediante un cron job
+"""
+from django.core.management.base import BaseCommand
+from productos.notification_digest import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Envía a cada usuario un email de resumen con sus notificaciones sin leer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Antigüedad máxima de las notificaciones incluidas (por defecto: 24)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=100,
+            help='Número de emails por envío a través de la conexión (por defecto: 100)'
+        )
+
+    def handle(self, *args, **options):
+        stats = send_digests(hours=options['horas'], batch_size=options['lote'], stdout=self.stdout)
+
+        if stats['lotes'] == 0:
+            self.stdout.write(self.style.SUCCESS('No hay notificaciones nuevas para resumir.'))
+            return
+
+        segundos = stats['segundos']
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {stats["enviados"]} resumen(es) enviado(s) en {stats["lotes"]} lote(s) y {segundos:.2f} s '
+            f'({stats["enviados"] / segundos if segundos else 0:.0f} por segundo)'
+        ))
+        if stats['fallidos']:
+            self.stdout.write(self.style.WARNING(f'○ {stats["fallidos"]} resumen(es) no se pudieron enviar'))
@@ -0,0 +1,29 @@
+"""
+Comando para liberar las reservas de stock vencidas de los carritos
+Devuelve a Producto.stock las unidades de los items cuya reserva venció.
+Se recomienda ejecutarlo cada pocos minutos mediante un cron job
+"""
+from django.core.management.base import BaseCommand
+from productos.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Devuelve al stock las reservas vencidas de los carritos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Número de items por transacción (por defecto: 500)'
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['lote'])
+
+        if released == 0:
+            self.stdout.write(self.style.SUCCESS('No hay reservas vencidas.'))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {released} reserva(s) vencida(s) liberada(s)')
+            )
@@ -0,0 +1,130 @@
+"""
+Comando para eliminar los carritos abandonados
+Un carrito está abandonado si ni el carrito ni sus items tuvieron actividad
+en los últimos CART_ABANDONED_DAYS días. Se eliminan en lotes pequeños, cada
+uno en una transacción corta y con una pausa entre lotes, para no bloquear
+las tablas del carrito mientras los usuarios compran.
+Se recomienda ejecutarlo diariamente mediante un cron job
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from productos.counters import invalidate_header_counts
+from productos.models import Cart, CartItem
+from productos.stock import release_stock, delete_released_items
+
+
+class Command(BaseCommand):
+    help = 'Elimina los carritos sin actividad durante el período configurado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=getattr(settings, 'CART_ABANDONED_DAYS', 30),
+            help='Días sin actividad para considerar un carrito abandonado'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Número de carritos por transacción (por defecto: 200)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.5,
+            help='Segundos de espera entre lotes (por defecto: 0.5)'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo muestra cuántos carritos se eliminarían'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['dias'])
+
+        # added_at marca los items nuevos y reserved_until se renueva con cada cambio de cantidad
+        abandoned = (
+            Cart.objects.filter(updated_at__lt=cutoff)
+            .exclude(items__added_at__gte=cutoff)
+            .exclude(items__reserved_until__gte=cutoff)
+        )
+
+        if options['simular']:
+            self.stdout.write(self.style.WARNING(
+                f'○ Se eliminarían {abandoned.count()} carrito(s) sin actividad desde '
+                f'{cutoff:%d/%m/%Y}'
+            ))
+            return
+
+        total_carts = 0
+        total_items = 0
+        last_id = 0
+        while True:
+            batch = list(
+                abandoned.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'user_id')[:options['lote']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            deleted_carts, deleted_items = self.delete_batch([pk for pk, _ in batch], cutoff)
+            invalidate_header_counts(*[user_id for _, user_id in batch])
+
+            total_carts += deleted_carts
+            total_items += deleted_items
+            self.stdout.write(f'  Lote hasta el carrito #{last_id}: {deleted_carts} carrito(s)')
+
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        if total_carts == 0:
+            self.stdout.write(self.style.SUCCESS('No hay carritos abandonados.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {total_carts} carrito(s) abandonado(s) eliminado(s) con {total_items} item(s)'
+            ))
+
+    def delete_batch(self, cart_ids, cutoff):
+        """
+        Elimina un lote de carritos y devuelve al stock sus reservas.
+        Retorna (carritos eliminados, items eliminados).
+        """
+        with transaction.atomic():
+            # Volver a comprobar la inactividad con los carritos bloqueados: el
+            # usuario pudo usar su carrito entre la selección del lote y este punto
+            cart_ids = set(
+                Cart.objects.select_for_update()
+                .filter(pk__in=cart_ids, updated_at__lt=cutoff)
+                .values_list('pk', flat=True)
+            )
+            cart_ids -= set(
+                CartItem.objects.filter(cart_id__in=cart_ids)
+                .filter(Q(added_at__gte=cutoff) | Q(reserved_until__gte=cutoff))
+                .values_list('cart_id', flat=True)
+            )
+            if not cart_ids:
+                return 0, 0
+
+            items = CartItem.objects.select_for_update().filter(cart_id__in=cart_ids)
+            reserved = {}
+            for producto_id, quantity in items.filter(reserved_quantity__gt=0).values_list(
+                'producto_id', 'reserved_quantity'
+            ):
+                reserved[producto_id] = reserved.get(producto_id, 0) + quantity
+            for producto_id in sorted(reserved):
+                release_stock(producto_id, reserved[producto_id])
+
+            # Las reservas ya se devolvieron y los contadores se invalidan al
+            # terminar el lote: las señales de los items borrados se omiten
+            deleted_items = delete_released_items(items)
+            deleted_carts, _ = Cart.objects.filter(pk__in=cart_ids).delete()
+
+        return deleted_carts, deleted_items
@@ -0,0 +1,176 @@
+"""
+Comando para migrar las reseñas antiguas (Reseña/Usuario) al sistema de reviews (Review/CustomUser)
+Lee las reseñas en lotes con iterator(), las inserta con bulk_create y guarda un punto
+de control por lote, por lo que puede interrumpirse y reanudarse. Las reseñas ya migradas
+y las de usuarios que ya tienen una review del producto se omiten y se informan aparte
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.text import Truncator
+from productos.detail_cache import bump_producto_version
+from productos.models import Reseña, Review, JobCheckpoint
+
+User = get_user_model()
+
+CHECKPOINT_NAME = 'migrar_resenas'
+
+
+class Command(BaseCommand):
+    help = 'Migra las reseñas antiguas (Reseña) al modelo Review'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de reseñas por lote (por defecto: 1000)'
+        )
+        parser.add_argument(
+            '--crear-usuarios',
+            action='store_true',
+            help='Crea usuarios inactivos para los Usuario antiguos sin cuenta con el mismo email'
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Ignora el punto de control y procesa todas las reseñas desde el inicio'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['lote']
+        create_users = options['crear_usuarios']
+
+        last_id = 0 if options['reiniciar'] else JobCheckpoint.get_last_id(CHECKPOINT_NAME)
+        if last_id:
+            self.stdout.write(self.style.WARNING(f'○ Reanudando desde la reseña #{last_id}'))
+
+        reseñas = Reseña.objects.filter(pk__gt=last_id).order_by('pk').values(
+            'pk', 'producto_id', 'calificacion', 'comentario', 'fecha_reseña',
+            'usuario_id', 'usuario__nombre', 'usuario__email',
+        )
+
+        totals = {'leidas': 0, 'migradas': 0, 'sin_usuario': 0, 'ya_migradas': 0, 'conflictos': 0}
+        batch = []
+        for row in reseñas.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self.process_batch(batch, create_users, totals)
+                batch = []
+        if batch:
+            self.process_batch(batch, create_users, totals)
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Resumen:'))
+        self.stdout.write(self.style.SUCCESS(f'  - Reseñas leídas: {totals["leidas"]}'))
+        self.stdout.write(self.style.SUCCESS(f'  - Reviews creadas: {totals["migradas"]}'))
+        self.stdout.write(self.style.WARNING(f'  - Sin cuenta de usuario: {totals["sin_usuario"]}'))
+        self.stdout.write(self.style.WARNING(f'  - Ya migradas: {totals["ya_migradas"]}'))
+        self.stdout.write(self.style.WARNING(f'  - Usuario con review del producto: {totals["conflictos"]}'))
+        if totals['sin_usuario'] and not create_users:
+            self.stdout.write(self.style.WARNING(
+                '  Use --reiniciar --crear-usuarios para migrar también esas reseñas.'
+            ))
+
+    def process_batch(self, batch, create_users, totals):
+        """Migra un lote de reseñas en una sola transacción"""
+        with transaction.atomic():
+            users_by_email = self.map_users(batch, create_users)
+
+            # Los conflictos se buscan antes de insertar para omitirlos y contarlos:
+            # reseñas ya migradas y usuarios que ya tienen review de ese producto
+            migrated = set(
+                Review.objects.filter(legacy_reseña_id__in=[row['pk'] for row in batch])
+                .values_list('legacy_reseña_id', flat=True)
+            )
+            reviewed = set(
+                Review.objects.filter(
+                    producto_id__in={row['producto_id'] for row in batch},
+                    user_id__in=set(users_by_email.values()),
+                ).values_list('producto_id', 'user_id')
+            )
+
+            reviews = []
+            fechas = {}
+            for row in batch:
+                user_id = users_by_email.get((row['usuario__email'] or '').lower())
+                if user_id is None:
+                    totals['sin_usuario'] += 1
+                    continue
+                if row['pk'] in migrated:
+                    totals['ya_migradas'] += 1
+                    continue
+                if (row['producto_id'], user_id) in reviewed:
+                    totals['conflictos'] += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'  ○ Reseña #{row["pk"]} omitida: el usuario #{user_id} ya tiene una review '
+                        f'del producto #{row["producto_id"]}'
+                    ))
+                    continue
+                # Dos Usuario antiguos con el mismo email comparten cuenta: solo migra la primera
+                reviewed.add((row['producto_id'], user_id))
+                reviews.append(Review(
+                    producto_id=row['producto_id'],
+                    user_id=user_id,
+                    rating=row['calificacion'],
+                    title=Truncator(row['comentario']).words(8) or f'Reseña de {row["usuario__nombre"]}',
+                    comment=row['comentario'],
+                    legacy_reseña_id=row['pk'],
+                ))
+                fechas[row['pk']] = row['fecha_reseña']
+
+            Review.objects.bulk_create(reviews)
+
+            # auto_now_add sobrescribe created_at al insertar: restaurar la fecha original
+            created = list(
+                Review.objects.filter(legacy_reseña_id__in=fechas.keys()).only('pk', 'legacy_reseña_id', 'created_at')
+            )
+            for review in created:
+                review.created_at = fechas[review.legacy_reseña_id]
+            Review.objects.bulk_update(created, ['created_at'])
+
+            JobCheckpoint.advance(CHECKPOINT_NAME, batch[-1]['pk'])
+
+        # bulk_create no envía señales: invalidar a mano el detalle cacheado
+        bump_producto_version(*{review.producto_id for review in reviews})
+
+        totals['leidas'] += len(batch)
+        totals['migradas'] += len(created)
+        self.stdout.write(
+            f'  Lote hasta la reseña #{batch[-1]["pk"]}: {len(created)} review(s) creada(s)'
+        )
+
+    def map_users(self, batch, create_users):
+        """Retorna {email en minúsculas: id de CustomUser} para los autores del lote"""
+        emails = {(row['usuario__email'] or '').lower() for row in batch}
+        emails.discard('')
+
+        def lookup():
+            return dict(
+                User.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=emails)
+                .order_by('-pk')  # Si hay emails repetidos, gana la cuenta más antigua
+                .values_list('email_lower', 'pk')
+            )
+
+        users_by_email = lookup()
+        missing = emails - users_by_email.keys()
+
+        if create_users and missing:
+            nuevos = {}
+            for row in batch:
+                email = (row['usuario__email'] or '').lower()
+                if email in missing and email not in nuevos:
+                    user = User(
+                        username=f'{email.split("@")[0][:120]}_{row["usuario_id"]}',
+                        email=email,
+                        first_name=row['usuario__nombre'][:150],
+                        is_active=False,
+                    )
+                    user.set_unusable_password()
+                    nuevos[email] = user
+            User.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+            users_by_email = lookup()
+
+        return users_by_email
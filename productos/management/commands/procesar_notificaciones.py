@@ -0,0 +1,70 @@
+"""
+Comando worker que envía las notificaciones encoladas (NotificationJob)
+Por defecto procesa los envíos pendientes y termina, para ejecutarlo con un
+cron job; con --continuo queda esperando nuevos envíos
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from productos.notification_jobs import claim_next_job, process_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Envía las notificaciones encoladas a los favoritos de los productos y a los seguidores de las categorías'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de suscriptores por transacción (por defecto: 1000)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Sigue esperando envíos nuevos en lugar de terminar'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos entre consultas en modo continuo (por defecto: 5)'
+        )
+
+    def handle(self, *args, **options):
+        timeout = getattr(settings, 'NOTIFICATION_JOB_TIMEOUT_MINUTES', 30)
+
+        while True:
+            requeued = requeue_stale_jobs(timeout)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'○ {requeued} envío(s) atascado(s) reencolado(s)'))
+
+            processed = 0
+            total_sent = 0
+            started = time.monotonic()
+            while (job := claim_next_job()) is not None:
+                destino = f'producto #{job.producto_id}' if job.producto_id else f'categoría #{job.categoria_id}'
+                if process_job(job, chunk_size=options['lote']):
+                    self.stdout.write(self.style.SUCCESS(
+                        f'  ✓ Envío #{job.pk} ({job.get_tipo_display()}, {destino}): '
+                        f'{job.enviadas} notificación(es) en {job.duracion:.2f} s'
+                    ))
+                    total_sent += job.enviadas
+                else:
+                    self.stdout.write(self.style.ERROR(f'  ✗ Envío #{job.pk}: {job.error}'))
+                processed += 1
+
+            if processed:
+                elapsed = time.monotonic() - started
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {processed} envío(s), {total_sent} notificación(es) en {elapsed:.2f} s '
+                    f'({total_sent / elapsed if elapsed else 0:.0f} por segundo)'
+                ))
+
+            if not options['continuo']:
+                if processed == 0:
+                    self.stdout.write(self.style.SUCCESS('No hay envíos pendientes.'))
+                return
+
+            time.sleep(options['intervalo'])
@@ -0,0 +1,51 @@
+"""
+Comando worker que genera los reportes solicitados (ReportJob)
+Por defecto procesa los reportes pendientes y termina, para ejecutarlo con un
+cron job; con --continuo queda esperando nuevos reportes
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from productos.reports import claim_next_job, process_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Genera los reportes PDF/XLSX pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Sigue esperando reportes nuevos en lugar de terminar'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos entre consultas en modo continuo (por defecto: 5)'
+        )
+
+    def handle(self, *args, **options):
+        timeout = getattr(settings, 'REPORT_JOB_TIMEOUT_MINUTES', 30)
+
+        while True:
+            requeued = requeue_stale_jobs(timeout)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'○ {requeued} reporte(s) atascado(s) reencolado(s)'))
+
+            processed = 0
+            while (job := claim_next_job()) is not None:
+                self.stdout.write(f'  Generando reporte #{job.pk} ({job.get_tipo_display()}, {job.formato})...')
+                if process_job(job):
+                    self.stdout.write(self.style.SUCCESS(f'  ✓ Reporte #{job.pk}: {job.filas} fila(s)'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'  ✗ Reporte #{job.pk}: {job.error}'))
+                processed += 1
+
+            if not options['continuo']:
+                if processed == 0:
+                    self.stdout.write(self.style.SUCCESS('No hay reportes pendientes.'))
+                return
+
+            time.sleep(options['intervalo'])
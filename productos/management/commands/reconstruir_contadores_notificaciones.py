@@ -0,0 +1,52 @@
+"""
+Comando para reconstruir los contadores de notificaciones sin leer
+Cuenta las no leídas de cada usuario y guarda el total en NotificationCounter,
+creando los contadores que falten. Se ejecuta una vez tras desplegar el
+contador (las cuentas anteriores no tienen fila) y, si hiciera falta, para
+corregir contadores desfasados por cambios hechos directamente en la base
+de datos. Los usuarios se recorren por lotes de pk, cada uno en una
+transacción corta.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from productos.counters import count_unread_by_user, invalidate_header_counts
+from productos.models import NotificationCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el contador de notificaciones sin leer de todos los usuarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de usuarios por transacción (por defecto: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        total_users = 0
+        last_user_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_user_id).order_by('pk').values_list('pk', flat=True)[:options['lote']]
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            with transaction.atomic():
+                unread = count_unread_by_user(user_ids)
+                NotificationCounter.objects.bulk_create(
+                    [NotificationCounter(user_id=user_id, unread=total) for user_id, total in unread.items()],
+                    update_conflicts=True, unique_fields=['user'], update_fields=['unread']
+                )
+            invalidate_header_counts(*user_ids)
+
+            total_users += len(user_ids)
+            self.stdout.write(f'  Lote hasta el usuario #{last_user_id}: {len(user_ids)} contador(es)')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {total_users} contador(es) de notificaciones reconstruido(s)'))
@@ -0,0 +1,23 @@
+"""
+Comando para reconstruir desde cero los resúmenes de ventas
+Útil tras corregir pedidos ya resumidos o cambiar las categorías de productos
+"""
+from django.core.management.base import BaseCommand
+from productos.sales_rollup import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Borra y recalcula los resúmenes de ventas con todo el historial de pedidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de pedidos por transacción (por defecto: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('○ Reconstruyendo los resúmenes de ventas...'))
+        processed = rebuild_sales_rollups(batch_size=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Resúmenes reconstruidos con {processed} pedido(s)'))
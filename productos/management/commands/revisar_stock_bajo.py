@@ -0,0 +1,47 @@
+"""
+Comando para revisar los productos con stock bajo
+Compara con la revisión anterior y notifica al staff solo los productos que
+entraron en stock bajo o se agotaron, con un único email de resumen por ejecución.
+Las alertas, las notificaciones y el email se confirman juntos: si el email
+falla no se registra nada y la siguiente ejecución vuelve a alertar.
+Se recomienda ejecutarlo periódicamente mediante un cron job
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from productos.low_stock import (
+    get_low_stock_threshold, get_staff, notify_staff, scan_low_stock, send_low_stock_digest,
+)
+
+
+class Command(BaseCommand):
+    help = 'Notifica al staff los productos que entraron en stock bajo desde la última revisión'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sin-email',
+            action='store_true',
+            help='Crea las notificaciones pero no envía el email de resumen'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                result = scan_low_stock()
+                staff = get_staff()
+                notified = notify_staff(result, staff)
+
+                emailed = False
+                if not options['sin_email']:
+                    emailed = send_low_stock_digest(result, staff)
+        except Exception as e:
+            # Se revirtieron las alertas y las notificaciones: la próxima revisión las repite
+            raise CommandError(f'La revisión falló y no se registró ninguna alerta: {e}') from e
+
+        self.stdout.write(self.style.SUCCESS(f'Umbral global: {get_low_stock_threshold()} unidad(es)'))
+        self.stdout.write(self.style.SUCCESS(f'  - Productos con stock bajo: {result["vigentes"]}'))
+        self.stdout.write(self.style.SUCCESS(f'  - Nuevos desde la última revisión: {len(result["nuevas"])}'))
+        self.stdout.write(self.style.SUCCESS(f'  - Agotados desde la última revisión: {len(result["agotados"])}'))
+        self.stdout.write(self.style.SUCCESS(f'  - Repuestos: {result["resueltas"]}'))
+        self.stdout.write(self.style.SUCCESS(f'  - Notificaciones creadas: {notified}'))
+        if emailed:
+            self.stdout.write(self.style.SUCCESS('✓ Email de resumen enviado al staff'))
@@ -1,8 +1,15 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DEFERRED, F, Sum, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.functional import cached_property
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.conf import settings
 
+from .storage import private_storage
+
 # Create your models here.
 
 # Modelo Usuario
@@ -36,7 +43,15 @@ class Producto(models.Model):
         validators=[MinValueValidator(0.01, message='El precio debe ser mayor a 0')]
     )
     stock = models.IntegerField(
-        validators=[MinValueValidator(0, message='El stock no puede ser negativo')]
+        validators=[MinValueValidator(0, message='El stock no puede ser negativo')],
+        db_index=True
+    )
+    stock_minimo = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Stock mínimo',
+        help_text='Se alerta al llegar a este stock. Vacío: se usa el umbral global.'
     )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
@@ -48,6 +63,38 @@ class Producto(models.Model):
     def __str__(self):
         return self.nombre
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores leídos de la base de datos, para detectar cambios al guardar
+        # (ver productos/notification_jobs.py)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not DEFERRED
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Un guardado completo de un producto leído de la base de datos no
+        escribe el stock leído: las reservas y los checkouts lo cambian
+        mientras tanto. El cambio hecho sobre la instancia se aplica como
+        diferencia (F('stock') + delta) y el resto de campos con update_fields.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or kwargs.get('update_fields') is not None or not loaded or 'stock' not in loaded:
+            return super().save(*args, **kwargs)
+
+        delta = self.stock - loaded['stock']
+        if delta:
+            Producto.objects.filter(pk=self.pk).update(stock=Greatest(F('stock') + delta, 0))
+            self.stock = Producto.objects.filter(pk=self.pk).values_list('stock', flat=True).get()
+        kwargs['update_fields'] = [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name != 'stock'
+        ]
+        super().save(*args, **kwargs)
+        loaded['stock'] = self.stock
+
     def clean(self):
         """Validación personalizada para el modelo Producto"""
         super().clean()
@@ -64,17 +111,27 @@ class Producto(models.Model):
 # Modelo Pedido
 class Pedido(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='pedidos')
+    # Cuenta que realizó el pedido desde el checkout (vacío en pedidos creados desde el admin)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='pedidos'
+    )
     fecha_pedido = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(
         max_digits=10, 
         decimal_places=2,
         validators=[MinValueValidator(0, message='El total no puede ser negativo')]
     )
+    # Clave enviada por el cliente en el checkout: los reintentos no duplican el pedido
+    # (única por cuenta, ver Meta.constraints)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-fecha_pedido']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_pedido_idempotency_key'),
+        ]
 
     def __str__(self):
         return f'Pedido {self.id} - Usuario: {self.usuario.nombre}'
@@ -166,6 +223,15 @@ class Reseña(models.Model):
             raise ValidationError({'comentario': 'El comentario debe tener al menos 10 caracteres.'})
 
 
+class ReviewQuerySet(models.QuerySet):
+    def for_producto(self, producto):
+        """
+        Flujo único de reseñas de un producto, ordenado de la más reciente a la más antigua.
+        Incluye las reseñas antiguas (Reseña) migradas con el comando migrar_resenas.
+        """
+        return self.filter(producto=producto).select_related('user').order_by('-created_at')
+
+
 # Modelo Review (Sistema de reseñas mejorado para usuarios autenticados)
 class Review(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='reviews')
@@ -183,6 +249,16 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Última actualización')
     is_verified_purchase = models.BooleanField(default=False, verbose_name='Compra verificada')
+    legacy_reseña = models.OneToOneField(
+        Reseña,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='review',
+        verbose_name='Reseña original'
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Review'
@@ -201,6 +277,43 @@ class Review(models.Model):
             raise ValidationError({'title': 'El título debe tener al menos 5 caracteres.'})
 
 
+# Modelo ReviewVote (Voto "¿Te resultó útil?" de una reseña)
+class ReviewVote(models.Model):
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='votes')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='review_votes')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha del voto')
+
+    class Meta:
+        verbose_name = 'Voto de reseña'
+        verbose_name_plural = 'Votos de reseñas'
+        ordering = ['-created_at']
+        unique_together = ('review', 'user')  # Un voto por usuario y reseña
+
+    def __str__(self):
+        return f'{self.user.username} votó útil la review {self.review_id}'
+
+
+# Modelo ReviewHelpfulShard (Contador fragmentado de votos útiles)
+class ReviewHelpfulShard(models.Model):
+    """
+    Fragmento del contador de votos útiles de una reseña.
+    Los votos se reparten entre varias filas para que una reseña popular
+    no se convierta en una fila caliente; consolidar_votos_utiles suma los
+    fragmentos en Review.helpful_count.
+    """
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='helpful_shards')
+    shard = models.PositiveSmallIntegerField(verbose_name='Fragmento')
+    count = models.IntegerField(default=0, verbose_name='Votos pendientes')
+
+    class Meta:
+        verbose_name = 'Fragmento de votos útiles'
+        verbose_name_plural = 'Fragmentos de votos útiles'
+        unique_together = ('review', 'shard')
+
+    def __str__(self):
+        return f'Review {self.review_id} - fragmento {self.shard}: {self.count}'
+
+
 # Modelo Favorite (Lista de favoritos)
 class Favorite(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='favorites')
@@ -212,6 +325,8 @@ class Favorite(models.Model):
         verbose_name_plural = 'Favoritos'
         ordering = ['-created_at']
         unique_together = ('user', 'producto')
+        # Recorrer los favoritos de un producto por pk al enviar notificaciones
+        indexes = [models.Index(fields=['producto', 'id'])]
 
     def __str__(self):
         return f'{self.user.get_full_name() or self.user.username} - {self.producto.nombre}'
@@ -250,6 +365,7 @@ class Notification(models.Model):
         ('price_drop', 'Bajada de precio'),
         ('review_reply', 'Respuesta a reseña'),
         ('favorite_available', 'Favorito disponible'),
+        ('low_stock', 'Stock bajo'),
         ('system', 'Sistema'),
     ]
     
@@ -265,17 +381,69 @@ class Notification(models.Model):
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
         ordering = ['-created_at']
+        # Notificaciones (no leídas) de un usuario por fecha sin recorrer las leídas
+        indexes = [models.Index(fields=['user', 'is_read', 'created_at'])]
 
     def __str__(self):
         return f'{self.title} - {self.user.username}'
 
 
+# Modelo NotificationCounter (Contador de notificaciones sin leer)
+class NotificationCounter(models.Model):
+    """
+    Número de notificaciones sin leer de un usuario, mantenido al crear y
+    marcar notificaciones (ver productos/notifications.py) para que la
+    insignia del encabezado no tenga que contarlas.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter'
+    )
+    unread = models.PositiveIntegerField(default=0, verbose_name='Sin leer')
+
+    class Meta:
+        verbose_name = 'Contador de notificaciones'
+        verbose_name_plural = 'Contadores de notificaciones'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.unread} sin leer'
+
+
+def cart_totals(prefix=''):
+    """
+    Expresiones de agregado del total de unidades y del precio total de un carrito.
+    prefix permite usarlas desde Cart ('items__') o directamente sobre CartItem ('').
+    """
+    return {
+        'total_items': Coalesce(Sum(f'{prefix}quantity'), 0),
+        'total_price': Coalesce(
+            Sum(ExpressionWrapper(
+                F(f'{prefix}quantity') * F(f'{prefix}producto__precio'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )),
+            Decimal('0.00'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    }
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Anota los totales de cada carrito en la misma consulta (changelist del admin)"""
+        totals = cart_totals('items__')
+        return self.annotate(
+            annotated_total_items=totals['total_items'],
+            annotated_total_price=totals['total_price'],
+        )
+
+
 # Modelo Cart (Carrito de compras)
 class Cart(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Última actualización')
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Carrito'
         verbose_name_plural = 'Carritos'
@@ -283,15 +451,33 @@ class Cart(models.Model):
     def __str__(self):
         return f'Carrito de {self.user.get_full_name() or self.user.username}'
 
+    @cached_property
+    def summary(self):
+        """
+        Totales del carrito calculados en una sola consulta de agregado.
+        Se memoriza en la instancia, por lo que una petición consulta una sola vez;
+        si el carrito viene de with_totals() se usan los valores anotados.
+        """
+        if hasattr(self, 'annotated_total_items'):
+            return {
+                'total_items': self.annotated_total_items,
+                'total_price': self.annotated_total_price,
+            }
+        return self.items.aggregate(**cart_totals())
+
+    def refresh_summary(self):
+        """Descarta los totales memorizados tras modificar los items"""
+        self.__dict__.pop('summary', None)
+
     @property
     def total_items(self):
-        """Calcula el total de items en el carrito"""
-        return sum(item.quantity for item in self.items.all())
+        """Total de unidades en el carrito"""
+        return self.summary['total_items']
 
     @property
     def total_price(self):
-        """Calcula el precio total del carrito"""
-        return sum(item.subtotal for item in self.items.all())
+        """Precio total del carrito"""
+        return self.summary['total_price']
 
 
 # Modelo CartItem (Items del carrito)
@@ -304,6 +490,9 @@ class CartItem(models.Model):
         verbose_name='Cantidad'
     )
     added_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de agregado')
+    # Unidades descontadas de Producto.stock para este item (ver productos/stock.py)
+    reserved_quantity = models.PositiveIntegerField(default=0, verbose_name='Cantidad reservada')
+    reserved_until = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name='Reservado hasta')
 
     class Meta:
         verbose_name = 'Item del carrito'
@@ -318,10 +507,307 @@ class CartItem(models.Model):
         """Calcula el subtotal del item"""
         return self.producto.precio * self.quantity
 
+    @property
+    def max_quantity(self):
+        """Cantidad máxima del item: stock disponible más lo que ya tiene reservado"""
+        return self.producto.stock + self.reserved_quantity
+
     def clean(self):
         super().clean()
-        if self.quantity > self.producto.stock:
+        if self.quantity > self.max_quantity:
             raise ValidationError({
-                'quantity': f'Solo hay {self.producto.stock} unidades disponibles.'
+                'quantity': f'Solo hay {self.max_quantity} unidades disponibles.'
             })
-    
+
+
+# Modelo JobCheckpoint (Punto de control de procesos por lotes)
+class JobCheckpoint(models.Model):
+    """
+    Último identificador procesado por un proceso por lotes.
+    Permite reanudar los comandos de mantenimiento donde se detuvieron.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name='Proceso')
+    last_id = models.BigIntegerField(default=0, verbose_name='Último ID procesado')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Última actualización')
+
+    class Meta:
+        verbose_name = 'Punto de control'
+        verbose_name_plural = 'Puntos de control'
+        ordering = ['name']
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+    @classmethod
+    def get_last_id(cls, name):
+        """Retorna el último ID procesado por el proceso (0 si nunca se ejecutó)"""
+        checkpoint = cls.objects.filter(name=name).only('last_id').first()
+        return checkpoint.last_id if checkpoint else 0
+
+    @classmethod
+    def advance(cls, name, last_id):
+        """Guarda el último ID procesado por el proceso"""
+        cls.objects.update_or_create(name=name, defaults={'last_id': last_id})
+
+    @classmethod
+    def lock(cls, name):
+        """
+        Retorna el punto de control del proceso (lo crea si no existe)
+        bloqueado hasta el final de la transacción en curso: dos ejecuciones
+        simultáneas del proceso se esperan en lugar de procesar los mismos IDs.
+        """
+        cls.objects.get_or_create(name=name)
+        return cls.objects.select_for_update().get(name=name)
+
+
+# Modelos de resumen de ventas (tablas agregadas para reportes)
+class ResumenVentas(models.Model):
+    """
+    Ventas agregadas por período. Las actualiza de forma incremental el
+    comando actualizar_resumen_ventas (ver productos/sales_rollup.py).
+    """
+    PERIODOS = [
+        ('dia', 'Diario'),
+        ('semana', 'Semanal'),
+    ]
+
+    periodo = models.CharField(max_length=10, choices=PERIODOS, verbose_name='Período')
+    # Primer día del período (el lunes en los resúmenes semanales), en la zona horaria local
+    fecha_inicio = models.DateField(verbose_name='Inicio del período')
+    unidades = models.PositiveIntegerField(default=0, verbose_name='Unidades vendidas')
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Ingresos')
+    pedidos = models.PositiveIntegerField(default=0, verbose_name='Pedidos')
+
+    class Meta:
+        abstract = True
+        ordering = ['-fecha_inicio']
+
+
+class ResumenVentasProducto(ResumenVentas):
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='resumenes_venta')
+
+    class Meta(ResumenVentas.Meta):
+        verbose_name = 'Resumen de ventas por producto'
+        verbose_name_plural = 'Resúmenes de ventas por producto'
+        unique_together = ('periodo', 'fecha_inicio', 'producto')
+        indexes = [models.Index(fields=['periodo', 'fecha_inicio'])]
+
+    def __str__(self):
+        return f'{self.producto} - {self.get_periodo_display()} {self.fecha_inicio}'
+
+
+class ResumenVentasCategoria(ResumenVentas):
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='resumenes_venta')
+
+    class Meta(ResumenVentas.Meta):
+        verbose_name = 'Resumen de ventas por categoría'
+        verbose_name_plural = 'Resúmenes de ventas por categoría'
+        unique_together = ('periodo', 'fecha_inicio', 'categoria')
+        indexes = [models.Index(fields=['periodo', 'fecha_inicio'])]
+
+    def __str__(self):
+        return f'{self.categoria} - {self.get_periodo_display()} {self.fecha_inicio}'
+
+
+# Modelo ReportJob (Reportes generados en segundo plano)
+class ReportJob(models.Model):
+    """
+    Solicitud de un reporte PDF o XLSX. La vista solo la encola; el comando
+    procesar_reportes genera el archivo (ver productos/reports.py).
+    """
+    TIPOS = [
+        ('ventas', 'Ventas'),
+        ('inventario', 'Inventario'),
+        ('usuarios', 'Usuarios'),
+    ]
+    FORMATOS = [
+        ('xlsx', 'Excel (XLSX)'),
+        ('pdf', 'PDF'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='report_jobs', verbose_name='Solicitado por'
+    )
+    tipo = models.CharField(max_length=20, choices=TIPOS, verbose_name='Tipo')
+    formato = models.CharField(max_length=10, choices=FORMATOS, default='xlsx', verbose_name='Formato')
+    fecha_desde = models.DateField(null=True, blank=True, verbose_name='Desde')
+    fecha_hasta = models.DateField(null=True, blank=True, verbose_name='Hasta')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name='Estado')
+    archivo = models.FileField(
+        upload_to='reportes/%Y/%m/', storage=private_storage, blank=True, verbose_name='Archivo'
+    )
+    filas = models.PositiveIntegerField(default=0, verbose_name='Filas')
+    error = models.TextField(blank=True, verbose_name='Error')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de solicitud')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Inicio')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Fin')
+
+    class Meta:
+        verbose_name = 'Reporte'
+        verbose_name_plural = 'Reportes'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['estado', 'created_at'])]
+
+    def __str__(self):
+        return f'Reporte {self.get_tipo_display()} ({self.get_formato_display()}) - {self.get_estado_display()}'
+
+    def clean(self):
+        super().clean()
+        if self.fecha_desde and self.fecha_hasta and self.fecha_desde > self.fecha_hasta:
+            raise ValidationError({'fecha_hasta': 'La fecha final debe ser posterior a la inicial.'})
+
+
+# Modelo AlertaStockBajo (Productos con stock bajo ya alertados)
+class AlertaStockBajo(models.Model):
+    """
+    Producto en o por debajo de su umbral de stock que ya se notificó al staff.
+    El comando revisar_stock_bajo compara cada ejecución con estas filas para
+    alertar solo los cambios (ver productos/low_stock.py).
+    """
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, related_name='alerta_stock', verbose_name='Producto'
+    )
+    stock = models.IntegerField(verbose_name='Stock en la última revisión')
+    umbral = models.PositiveIntegerField(verbose_name='Umbral')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de alerta')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Última revisión')
+
+    class Meta:
+        verbose_name = 'Alerta de stock bajo'
+        verbose_name_plural = 'Alertas de stock bajo'
+        ordering = ['stock', 'producto__nombre']
+
+    def __str__(self):
+        return f'{self.producto.nombre}: {self.stock} (umbral {self.umbral})'
+
+    @property
+    def agotado(self):
+        return self.stock <= 0
+
+
+# Modelo NotificationJob (Envío de notificaciones en segundo plano)
+class NotificationJob(models.Model):
+    """
+    Envío pendiente de una notificación a todos los suscriptores de un
+    producto (sus favoritos) o de una categoría (sus seguidores). Se encola
+    al detectar el cambio y el comando procesar_notificaciones la reparte
+    por lotes (ver productos/notification_jobs.py).
+    """
+    TIPOS = [
+        ('price_drop', 'Bajada de precio'),
+        ('favorite_available', 'Favorito disponible'),
+        ('new_product', 'Nuevo producto'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS, verbose_name='Tipo')
+    producto = models.ForeignKey(
+        Producto, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='notification_jobs', verbose_name='Producto'
+    )
+    categoria = models.ForeignKey(
+        Categoria, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='notification_jobs', verbose_name='Categoría'
+    )
+    precio_anterior = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='Precio anterior')
+    precio_nuevo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='Precio nuevo')
+    # Rango de ProductoCategoria incluido en un envío new_product
+    desde_id = models.BigIntegerField(default=0, verbose_name='Desde producto-categoría')
+    hasta_id = models.BigIntegerField(default=0, verbose_name='Hasta producto-categoría')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name='Estado')
+    last_subscriber_id = models.BigIntegerField(default=0, verbose_name='Último suscriptor procesado')
+    enviadas = models.PositiveIntegerField(default=0, verbose_name='Notificaciones enviadas')
+    error = models.TextField(blank=True, verbose_name='Error')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Inicio')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Fin')
+
+    class Meta:
+        verbose_name = 'Envío de notificaciones'
+        verbose_name_plural = 'Envíos de notificaciones'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['estado', 'created_at'])]
+
+    def __str__(self):
+        destino = self.producto_id if self.producto_id else f'categoría {self.categoria_id}'
+        return f'{self.get_tipo_display()} - {destino} ({self.get_estado_display()})'
+
+    @property
+    def duracion(self):
+        """Segundos que tardó el envío (None si no terminó)"""
+        if self.started_at and self.finished_at:
+            return (self.finished_at - self.started_at).total_seconds()
+        return None
+
+    @property
+    def notificaciones_por_segundo(self):
+        duracion = self.duracion
+        if not duracion:
+            return None
+        return round(self.enviadas / duracion, 1)
+
+
+# Modelo PriceAlert (Aviso de precio objetivo)
+class PriceAlert(models.Model):
+    """
+    Aviso "notificarme cuando baje de $X". Al bajar el precio del producto se
+    buscan las alertas activas con precio_objetivo >= nuevo precio usando el
+    índice (producto, is_active, precio_objetivo), se notifican y se desactivan
+    (ver productos/price_alerts.py).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='price_alerts')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='price_alerts')
+    precio_objetivo = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0.01, message='El precio debe ser mayor a 0')],
+        verbose_name='Precio objetivo'
+    )
+    is_active = models.BooleanField(default=True, verbose_name='Activa')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+    triggered_at = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de aviso')
+
+    class Meta:
+        verbose_name = 'Alerta de precio'
+        verbose_name_plural = 'Alertas de precio'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['producto', 'is_active', 'precio_objetivo'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'producto'],
+                condition=models.Q(is_active=True),
+                name='unique_active_price_alert',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.producto.nombre} < ${self.precio_objetivo}'
+
+
+# Modelo CategoriaFollow (Categorías seguidas por un usuario)
+class CategoriaFollow(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='followed_categories')
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de seguimiento')
+
+    class Meta:
+        verbose_name = 'Categoría seguida'
+        verbose_name_plural = 'Categorías seguidas'
+        ordering = ['-created_at']
+        unique_together = ('user', 'categoria')
+        # Recorrer los seguidores de una categoría por pk al enviar notificaciones
+        indexes = [models.Index(fields=['categoria', 'id'])]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.categoria.nombre}'
@@ -0,0 +1,156 @@
+"""
+Resumen periódico por email de las notificaciones sin leer.
+
+Cada ejecución junta las notificaciones creadas desde el resumen anterior
+(punto de control JobCheckpoint 'notification_digest') que siguen sin leer
+y envía un único email por usuario. Los emails se envían por lotes a través
+de una sola conexión (get_connection + send_messages), en lugar de abrir
+una conexión SMTP por mensaje como send_mail.
+
+El rango de notificaciones se fija al empezar (hasta la última pk) y se
+guarda junto con el último usuario de cada lote enviado: si el envío se
+interrumpe, la siguiente ejecución retoma el mismo rango desde el lote que
+faltaba, sin repetir los emails ya enviados. Al terminar, el punto de
+control principal avanza hasta el final del rango.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import JobCheckpoint, Notification
+
+DIGEST_CHECKPOINT = 'notification_digest'
+# Ejecución en curso: final del rango y último usuario cuyo lote se envió (0 si no hay)
+DIGEST_RANGE_CHECKPOINT = 'notification_digest:hasta'
+DIGEST_USER_CHECKPOINT = 'notification_digest:usuario'
+
+# Notificaciones que se listan en cada email; el resto solo se cuenta
+DIGEST_MAX_ITEMS = 10
+
+
+def digest_range(hours):
+    """
+    Retorna (desde_id, hasta_id, desde_fecha, desde_usuario): notificaciones
+    posteriores al último resumen y, como máximo, de las últimas `hours`
+    horas. Si la ejecución anterior se interrumpió se retoma su rango a
+    partir del usuario siguiente al último lote enviado.
+    """
+    desde_id = JobCheckpoint.get_last_id(DIGEST_CHECKPOINT)
+    hasta_id = JobCheckpoint.get_last_id(DIGEST_RANGE_CHECKPOINT)
+    desde_usuario = 0
+    if hasta_id > desde_id:
+        desde_usuario = JobCheckpoint.get_last_id(DIGEST_USER_CHECKPOINT)
+    else:
+        hasta_id = Notification.objects.aggregate(hasta=Max('pk'))['hasta'] or 0
+    return desde_id, hasta_id, timezone.now() - timedelta(hours=hours), desde_usuario
+
+
+def pending_digests(desde_id, hasta_id, desde_fecha, batch_size, last_user_id=0):
+    """
+    Genera (último user_id del lote, lista de hasta batch_size tuplas
+    (usuario, total, notificaciones)) de los usuarios activos con email que
+    tienen notificaciones sin leer en el rango, a partir de last_user_id.
+    """
+    unread = Notification.objects.filter(
+        pk__gt=desde_id, pk__lte=hasta_id, created_at__gte=desde_fecha, is_read=False,
+        user__is_active=True,
+    ).exclude(user__email='')
+
+    while True:
+        totals = list(
+            unread.filter(user_id__gt=last_user_id)
+            .values('user_id').annotate(total=Count('pk'))
+            .order_by('user_id').values_list('user_id', 'total')[:batch_size]
+        )
+        if not totals:
+            return
+        last_user_id = totals[-1][0]
+
+        by_user = {}
+        for notification in (
+            unread.filter(user_id__in=[user_id for user_id, _ in totals])
+            .select_related('user').order_by('user_id', '-pk')
+            .only('title', 'message', 'created_at', 'user__username', 'user__first_name', 'user__email')
+        ):
+            items = by_user.setdefault(notification.user_id, [])
+            if len(items) < DIGEST_MAX_ITEMS:
+                items.append(notification)
+
+        yield last_user_id, [
+            (by_user[user_id][0].user, total, by_user[user_id])
+            for user_id, total in totals if user_id in by_user
+        ]
+
+
+def build_digest_message(user, total, notifications, connection):
+    """Arma el email (texto plano + HTML) del resumen de un usuario"""
+    context = {
+        'user': user,
+        'total': total,
+        'notifications': notifications,
+        'restantes': total - len(notifications),
+        'current_year': timezone.now().year,
+    }
+    message = EmailMultiAlternatives(
+        subject=f'Kitty Glow: tienes {total} notificación(es) sin leer',
+        body=render_to_string('productos/emails/resumen_notificaciones.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        connection=connection,
+    )
+    message.attach_alternative(
+        render_to_string('productos/emails/resumen_notificaciones.html', context), 'text/html'
+    )
+    return message
+
+
+def send_digests(hours=24, batch_size=100, stdout=None):
+    """
+    Envía los resúmenes pendientes y avanza los puntos de control tras cada lote.
+    Retorna {'enviados', 'fallidos', 'lotes', 'segundos'}.
+    Un lote que falla (por ejemplo, el servidor SMTP rechaza el envío) se
+    cuenta como fallido y el envío continúa con el siguiente lote; sus
+    notificaciones no vuelven a resumirse (siguen visibles en la tienda).
+    Si después no se puede reabrir la conexión, la excepción interrumpe la
+    ejecución y la siguiente retoma desde ese lote.
+    """
+    desde_id, hasta_id, desde_fecha, desde_usuario = digest_range(hours)
+    stats = {'enviados': 0, 'fallidos': 0, 'lotes': 0, 'segundos': 0.0}
+    if hasta_id <= desde_id:
+        return stats
+
+    started = time.monotonic()
+    JobCheckpoint.advance(DIGEST_RANGE_CHECKPOINT, hasta_id)
+    connection = get_connection()
+    try:
+        connection.open()
+        for last_user_id, batch in pending_digests(desde_id, hasta_id, desde_fecha, batch_size, desde_usuario):
+            messages = [build_digest_message(*digest, connection) for digest in batch]
+            try:
+                sent = connection.send_messages(messages) or 0
+            except Exception as e:
+                sent = 0
+                if stdout:
+                    stdout.write(f'  ✗ Lote de {len(messages)} email(s): {e}')
+                # La conexión puede haber quedado inutilizable: abrir una nueva
+                connection.close()
+                connection.open()
+            JobCheckpoint.advance(DIGEST_USER_CHECKPOINT, last_user_id)
+            stats['enviados'] += sent
+            stats['fallidos'] += len(messages) - sent
+            stats['lotes'] += 1
+            if stdout:
+                stdout.write(f'  Lote {stats["lotes"]}: {sent} de {len(messages)} email(s) enviado(s)')
+    finally:
+        connection.close()
+
+    JobCheckpoint.advance(DIGEST_CHECKPOINT, hasta_id)
+    JobCheckpoint.advance(DIGEST_RANGE_CHECKPOINT, 0)
+    JobCheckpoint.advance(DIGEST_USER_CHECKPOINT, 0)
+    stats['segundos'] = time.monotonic() - started
+    return stats
@@ -0,0 +1,277 @@
+"""
+Notificaciones a los suscriptores de productos y categorías.
+
+Al guardar un Producto, la señal post_save compara sus valores con los
+leídos de la base de datos (Producto.from_db) y, si el precio bajó o el
+producto volvió a tener stock, encola un NotificationJob para quienes lo
+tienen en favoritos. Al agregar productos recién creados a una categoría
+(NEW_PRODUCT_MAX_AGE_HOURS) se encola un job new_product para sus
+seguidores; mientras ese job siga pendiente los productos que lleguen
+después se suman a él, de modo que importar miles de productos produce una
+sola notificación por seguidor. Recategorizar un producto existente no lo
+anuncia.
+
+Guardar el producto solo cuesta la fila del job: el comando
+procesar_notificaciones recorre después los suscriptores por lotes de pk,
+crea las notificaciones con bulk_create y guarda su avance en el propio
+job, de modo que un envío interrumpido se reanuda sin duplicar
+notificaciones. Las bajadas de precio también disparan las alertas de
+precio objetivo (price_alerts.py).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import (
+    CategoriaFollow, Favorite, JobCheckpoint, NotificationJob, Producto, ProductoCategoria
+)
+from .notifications import build_notifications, bulk_notify
+from .price_alerts import evaluate_price_alerts
+
+# Suscriptores procesados por transacción
+FANOUT_CHUNK_SIZE = 1000
+
+# Punto de control con el último ProductoCategoria ya anunciado de cada categoría
+NEW_PRODUCT_CHECKPOINT = 'new_product:{categoria_id}'
+
+
+# Datos que un cambio posterior actualiza en el job pendiente del mismo tipo;
+# el resto (precio anterior, inicio del rango) se conserva del primer cambio
+PENDING_UPDATE_FIELDS = {'price_drop': ['precio_nuevo']}
+
+
+def enqueue_job(tipo, producto_id=None, categoria_id=None, **fields):
+    """
+    Encola un envío si el producto o la categoría no tiene ya uno pendiente
+    del mismo tipo; si lo tiene, le actualiza los PENDING_UPDATE_FIELDS (una
+    segunda bajada de precio anuncia el precio más reciente).
+    Retorna el NotificationJob creado o None.
+    """
+    pending = NotificationJob.objects.filter(
+        tipo=tipo, producto_id=producto_id, categoria_id=categoria_id, estado='pendiente'
+    )
+    updates = {name: fields[name] for name in PENDING_UPDATE_FIELDS.get(tipo, []) if name in fields}
+    if pending.update(**updates) if updates else pending.exists():
+        return None
+    return NotificationJob.objects.create(
+        tipo=tipo, producto_id=producto_id, categoria_id=categoria_id, **fields
+    )
+
+
+def enqueue_producto_changes(producto):
+    """
+    Encola los envíos que corresponden a los cambios del producto desde que se
+    leyó de la base de datos. Retorna la lista de NotificationJob creados.
+    """
+    loaded = getattr(producto, '_loaded_values', None)
+    if not loaded:
+        return []
+
+    jobs = []
+    precio_anterior = loaded.get('precio')
+    if precio_anterior is not None and producto.precio < precio_anterior:
+        jobs.append(enqueue_job(
+            'price_drop', producto.pk, precio_anterior=precio_anterior, precio_nuevo=producto.precio
+        ))
+
+    stock_anterior = loaded.get('stock')
+    if stock_anterior is not None and stock_anterior <= 0 < producto.stock:
+        jobs.append(enqueue_job('favorite_available', producto.pk))
+
+    # Guardar dos veces el mismo cambio no debe encolarlo de nuevo
+    loaded.update(precio=producto.precio, stock=producto.stock)
+    return [job for job in jobs if job is not None]
+
+
+def enqueue_back_in_stock(producto_ids):
+    """
+    Encola el aviso de disponibilidad de los productos indicados que tienen
+    stock. Para actualizaciones masivas (QuerySet.update), que no envían
+    señales: se llama con los productos que estaban agotados antes del UPDATE.
+    """
+    disponibles = Producto.objects.filter(pk__in=producto_ids, stock__gt=0).values_list('pk', flat=True)
+    return [job for job in (enqueue_job('favorite_available', pk) for pk in disponibles) if job]
+
+
+def new_products_since(now=None):
+    """Fecha de creación a partir de la cual un producto se anuncia como nuevo"""
+    hours = getattr(settings, 'NEW_PRODUCT_MAX_AGE_HOURS', 24)
+    return (now or timezone.now()) - timedelta(hours=hours)
+
+
+def enqueue_new_products(producto_categorias):
+    """
+    Encola el aviso de productos nuevos para las categorías con seguidores.
+    Recibe pares (categoria_id, id de ProductoCategoria); la señal post_save
+    lo llama con cada fila creada y las cargas masivas (bulk_create) deben
+    llamarlo con las filas insertadas. Las filas de productos que no son
+    nuevos (recategorizados) se ignoran.
+    """
+    nuevos = ProductoCategoria.objects.filter(
+        pk__in=[pk for _, pk in producto_categorias], producto__fecha_creacion__gte=new_products_since()
+    ).values_list('categoria_id', 'pk')
+    desde = {}
+    for categoria_id, pk in nuevos:
+        desde[categoria_id] = min(pk, desde.get(categoria_id, pk))
+    if not desde:
+        return []
+
+    followed = CategoriaFollow.objects.filter(categoria_id__in=desde).values_list('categoria_id', flat=True).distinct()
+    jobs = (enqueue_job('new_product', categoria_id=categoria_id, desde_id=desde[categoria_id]) for categoria_id in followed)
+    return [job for job in jobs if job]
+
+
+def _notification_content(job, producto):
+    if job.tipo == 'price_drop':
+        return (
+            f'¡{producto.nombre} bajó de precio!',
+            f'El precio de "{producto.nombre}" bajó de ${job.precio_anterior} a ${job.precio_nuevo}.',
+        )
+    return (
+        f'{producto.nombre} vuelve a estar disponible',
+        f'Tu favorito "{producto.nombre}" vuelve a tener stock.',
+    )
+
+
+def _new_product_content(job):
+    """
+    Resume los productos agregados a la categoría del job que aún no se
+    anunciaron. Retorna (título, mensaje, producto_id) o None si no hay ninguno.
+    """
+    if not job.hasta_id:
+        # Fijar el rango al empezar: si el envío se reanuda, anuncia los mismos productos
+        job.hasta_id = ProductoCategoria.objects.filter(
+            categoria_id=job.categoria_id
+        ).aggregate(hasta=Max('pk'))['hasta'] or 0
+        NotificationJob.objects.filter(pk=job.pk).update(hasta_id=job.hasta_id)
+
+    anunciado = JobCheckpoint.get_last_id(NEW_PRODUCT_CHECKPOINT.format(categoria_id=job.categoria_id))
+    # Un producto recategorizado mientras el job esperaba tampoco se anuncia
+    nuevos = ProductoCategoria.objects.filter(
+        categoria_id=job.categoria_id, pk__gte=max(job.desde_id, anunciado + 1), pk__lte=job.hasta_id,
+        producto__fecha_creacion__gte=new_products_since(job.created_at),
+    )
+    total = nuevos.count()
+    if not total:
+        return None
+
+    categoria = job.categoria.nombre
+    primeros = list(nuevos.order_by('pk').values_list('producto_id', 'producto__nombre')[:3])
+    if total == 1:
+        producto_id, nombre = primeros[0]
+        return (
+            f'Nuevo producto en {categoria}',
+            f'"{nombre}" ya está disponible en {categoria}.',
+            producto_id,
+        )
+    nombres = ', '.join(f'"{nombre}"' for _, nombre in primeros)
+    if total > len(primeros):
+        nombres += f' y {total - len(primeros)} más'
+    return (
+        f'{total} productos nuevos en {categoria}',
+        f'Llegaron {nombres} a {categoria}.',
+        None,
+    )
+
+
+def fan_out(job, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Crea la notificación del job para cada suscriptor (favoritos del producto
+    o seguidores de la categoría), continuando desde job.last_subscriber_id.
+    En las bajadas de precio evalúa antes las alertas de precio del producto.
+    Retorna el número de notificaciones creadas en esta ejecución.
+    """
+    created = 0
+    if job.tipo == 'new_product':
+        content = _new_product_content(job)
+        if content is None:
+            return 0
+        title, message, producto_id = content
+        subscribers = CategoriaFollow.objects.filter(categoria_id=job.categoria_id)
+    else:
+        producto = Producto.objects.only('nombre', 'precio', 'stock').get(pk=job.producto_id)
+        if job.tipo == 'favorite_available' and producto.stock <= 0:
+            # Se volvió a agotar antes de procesar el envío
+            return 0
+
+        if job.tipo == 'price_drop':
+            # Las alertas cumplidas se desactivan: reprocesar el job no las repite
+            created = evaluate_price_alerts(producto)
+            NotificationJob.objects.filter(pk=job.pk).update(enviadas=F('enviadas') + created)
+
+        title, message = _notification_content(job, producto)
+        producto_id = job.producto_id
+        subscribers = Favorite.objects.filter(producto_id=job.producto_id)
+
+    while True:
+        batch = list(
+            subscribers.filter(pk__gt=job.last_subscriber_id)
+            .order_by('pk')
+            .values_list('pk', 'user_id')[:chunk_size]
+        )
+        if not batch:
+            break
+
+        with transaction.atomic():
+            count = bulk_notify(build_notifications(
+                (user_id for _, user_id in batch), job.tipo, title, message, producto_id=producto_id
+            ))
+            job.last_subscriber_id = batch[-1][0]
+            NotificationJob.objects.filter(pk=job.pk).update(
+                last_subscriber_id=job.last_subscriber_id, enviadas=F('enviadas') + count
+            )
+
+        created += count
+
+    if job.tipo == 'new_product':
+        name = NEW_PRODUCT_CHECKPOINT.format(categoria_id=job.categoria_id)
+        if job.hasta_id > JobCheckpoint.get_last_id(name):
+            JobCheckpoint.advance(name, job.hasta_id)
+
+    job.enviadas += created
+    return created
+
+
+def requeue_stale_jobs(minutes):
+    """Devuelve a 'pendiente' los envíos que llevan demasiado tiempo procesándose (worker caído)"""
+    return NotificationJob.objects.filter(
+        estado='procesando', started_at__lt=timezone.now() - timedelta(minutes=minutes)
+    ).update(estado='pendiente', started_at=None)
+
+
+def claim_next_job():
+    """
+    Toma el siguiente envío pendiente marcándolo como 'procesando'.
+    La actualización condicional evita que dos workers tomen el mismo envío.
+    Retorna el NotificationJob o None si no hay pendientes.
+    """
+    while True:
+        job = NotificationJob.objects.filter(estado='pendiente').order_by('created_at').first()
+        if job is None:
+            return None
+        claimed = NotificationJob.objects.filter(pk=job.pk, estado='pendiente').update(
+            estado='procesando', started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def process_job(job, chunk_size=FANOUT_CHUNK_SIZE):
+    """Reparte las notificaciones del envío y registra el resultado; retorna True si terminó bien"""
+    try:
+        fan_out(job, chunk_size=chunk_size)
+    except Exception as e:
+        job.estado = 'error'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['estado', 'error', 'finished_at'])
+        return False
+
+    job.estado = 'completado'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['estado', 'finished_at'])
+    return True
@@ -0,0 +1,43 @@
+"""
+Creación masiva de notificaciones.
+bulk_create no envía señales, así que aquí se suman a mano los contadores
+de no leídas (que también invalidan el encabezado) de los usuarios notificados.
+"""
+from itertools import islice
+
+from django.db import transaction
+
+from .counters import count_new_notifications
+from .models import Notification
+
+NOTIFY_BATCH_SIZE = 500
+
+
+def build_notifications(user_ids, notification_type, title, message, producto_id=None):
+    """Genera una Notification sin guardar por cada usuario indicado"""
+    for user_id in user_ids:
+        yield Notification(
+            user_id=user_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            producto_id=producto_id,
+        )
+
+
+def bulk_notify(notifications, batch_size=NOTIFY_BATCH_SIZE):
+    """
+    Inserta las notificaciones (cualquier iterable, incluso un generador)
+    en lotes de batch_size. Retorna el número de notificaciones creadas.
+    """
+    notifications = iter(notifications)
+    created = 0
+    while True:
+        batch = list(islice(notifications, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            Notification.objects.bulk_create(batch)
+            count_new_notifications(batch)
+        created += len(batch)
+    return created
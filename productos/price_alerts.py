@@ -0,0 +1,79 @@
+"""
+Alertas de precio objetivo (modelo PriceAlert).
+
+Cuando el precio de un producto baja, las alertas que se cumplen son las
+activas con precio_objetivo >= nuevo precio: una consulta por rango sobre
+el índice (producto, is_active, precio_objetivo) que solo lee esas filas,
+sin recorrer el resto de alertas del producto ni las de otros productos.
+Las alertas cumplidas se notifican y se desactivan en la misma transacción,
+así nunca se avisa dos veces.
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import PriceAlert
+from .notifications import build_notifications, bulk_notify
+
+# Alertas procesadas por transacción
+ALERT_BATCH_SIZE = 1000
+
+
+def set_price_alert(user, producto, precio_objetivo):
+    """
+    Crea o actualiza la alerta activa del usuario para el producto.
+    Lanza ValidationError si el precio objetivo no es menor al precio actual.
+    """
+    if precio_objetivo >= producto.precio:
+        raise ValidationError(
+            f'El precio objetivo debe ser menor al precio actual (${producto.precio}).'
+        )
+
+    try:
+        with transaction.atomic():
+            alert, _ = PriceAlert.objects.update_or_create(
+                user=user, producto=producto, is_active=True,
+                defaults={'precio_objetivo': precio_objetivo},
+            )
+    except IntegrityError:
+        # Otra petición del mismo usuario creó la alerta al mismo tiempo
+        alert = PriceAlert.objects.get(user=user, producto=producto, is_active=True)
+        alert.precio_objetivo = precio_objetivo
+        alert.save(update_fields=['precio_objetivo'])
+    return alert
+
+
+def evaluate_price_alerts(producto, batch_size=ALERT_BATCH_SIZE):
+    """
+    Notifica y desactiva las alertas que se cumplen con el precio actual del producto.
+    Retorna el número de alertas cumplidas.
+    """
+    triggered = 0
+    while True:
+        with transaction.atomic():
+            alerts = list(
+                PriceAlert.objects.select_for_update()
+                .filter(producto_id=producto.pk, is_active=True, precio_objetivo__gte=producto.precio)
+                .values_list('pk', 'user_id', 'precio_objetivo')[:batch_size]
+            )
+            if not alerts:
+                break
+
+            PriceAlert.objects.filter(pk__in=[pk for pk, _, _ in alerts]).update(
+                is_active=False, triggered_at=timezone.now()
+            )
+            bulk_notify(
+                notification
+                for _, user_id, precio_objetivo in alerts
+                for notification in build_notifications(
+                    [user_id],
+                    'price_drop',
+                    f'¡{producto.nombre} llegó a tu precio!',
+                    f'"{producto.nombre}" cuesta ahora ${producto.precio} '
+                    f'(tu alerta era de ${precio_objetivo}).',
+                    producto_id=producto.pk,
+                )
+            )
+
+        triggered += len(alerts)
+    return triggered
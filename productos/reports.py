@@ -0,0 +1,214 @@
+"""
+Generación de reportes PDF y XLSX (modelo ReportJob).
+
+Los datos se leen con iterator() en bloques y se escriben fila a fila: el
+XLSX usa el modo constant_memory de XlsxWriter y el PDF se dibuja
+directamente en un canvas de reportlab, de modo que la memoria usada no
+crece con el tamaño del reporte. El archivo se genera en un temporal y se
+guarda en el almacenamiento privado (ver productos/storage.py) con un nombre
+no adivinable; solo se descarga desde productos:report_download.
+"""
+import os
+import secrets
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import xlsxwriter
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfgen import canvas
+
+from .models import DetallePedido, Producto, ReportJob
+
+# Filas leídas de la base de datos por bloque
+CHUNK_SIZE = 2000
+
+
+def _date_range_filter(field, job):
+    """Filtro por rango de fechas locales del reporte sobre un campo DateTimeField"""
+    filters = {}
+    tz = timezone.get_current_timezone()
+    if job.fecha_desde:
+        filters[f'{field}__gte'] = datetime.combine(job.fecha_desde, time.min, tzinfo=tz)
+    if job.fecha_hasta:
+        filters[f'{field}__lt'] = datetime.combine(job.fecha_hasta + timedelta(days=1), time.min, tzinfo=tz)
+    return filters
+
+
+def sales_rows(job):
+    detalles = (
+        DetallePedido.objects.filter(**_date_range_filter('pedido__fecha_pedido', job))
+        .annotate(subtotal_linea=ExpressionWrapper(
+            F('cantidad') * F('precio_unitario'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ))
+        .order_by('pedido_id', 'pk')
+        .values_list(
+            'pedido_id', 'pedido__fecha_pedido', 'pedido__usuario__email',
+            'producto__nombre', 'cantidad', 'precio_unitario', 'subtotal_linea'
+        )
+    )
+    for pedido_id, fecha, email, producto, cantidad, precio, subtotal in detalles.iterator(chunk_size=CHUNK_SIZE):
+        yield [pedido_id, timezone.localtime(fecha).strftime('%d/%m/%Y %H:%M'), email, producto, cantidad, precio, subtotal]
+
+
+def inventory_rows(job):
+    productos = Producto.objects.order_by('nombre').values_list('pk', 'nombre', 'precio', 'stock')
+    for row in productos.iterator(chunk_size=CHUNK_SIZE):
+        yield list(row)
+
+
+def user_rows(job):
+    users = (
+        get_user_model().objects.filter(**_date_range_filter('date_joined', job))
+        .order_by('date_joined')
+        .values_list('username', 'email', 'first_name', 'last_name', 'date_joined', 'last_login', 'is_active')
+    )
+    for username, email, first_name, last_name, date_joined, last_login, is_active in users.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            username, email, f'{first_name} {last_name}'.strip(),
+            timezone.localtime(date_joined).strftime('%d/%m/%Y'),
+            timezone.localtime(last_login).strftime('%d/%m/%Y %H:%M') if last_login else '',
+            'Sí' if is_active else 'No',
+        ]
+
+
+# Encabezados, generador de filas y anchos de columna (en caracteres) por tipo de reporte
+REPORTS = {
+    'ventas': (
+        ['Pedido', 'Fecha', 'Cliente', 'Producto', 'Cantidad', 'Precio unitario', 'Subtotal'],
+        sales_rows, [8, 16, 28, 30, 9, 14, 12],
+    ),
+    'inventario': (
+        ['ID', 'Producto', 'Precio', 'Stock'],
+        inventory_rows, [8, 50, 12, 10],
+    ),
+    'usuarios': (
+        ['Usuario', 'Email', 'Nombre', 'Registro', 'Último acceso', 'Activo'],
+        user_rows, [20, 32, 28, 12, 16, 8],
+    ),
+}
+
+
+def write_xlsx(path, title, headers, rows, widths):
+    """Escribe las filas en un XLSX en modo constant_memory; retorna el número de filas"""
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy'})
+    worksheet = workbook.add_worksheet(title[:31])
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#F8D7E3'})
+
+    for col, width in enumerate(widths):
+        worksheet.set_column(col, col, width)
+    worksheet.write_row(0, 0, headers, header_format)
+
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        # constant_memory exige escribir las filas en orden: cada fila se descarta al pasar a la siguiente
+        worksheet.write_row(count, 0, [float(value) if isinstance(value, Decimal) else value for value in row])
+
+    workbook.close()
+    return count
+
+
+def write_pdf(path, title, headers, rows, widths):
+    """Dibuja las filas en un PDF página a página; retorna el número de filas"""
+    page_width, page_height = landscape(letter)
+    margin = 36
+    line_height = 14
+    char_width = (page_width - 2 * margin) / sum(widths)
+    positions = [margin + char_width * sum(widths[:i]) for i in range(len(widths))]
+
+    pdf = canvas.Canvas(path, pagesize=(page_width, page_height))
+    pdf.setTitle(title)
+
+    def start_page():
+        pdf.setFont('Helvetica-Bold', 14)
+        pdf.drawString(margin, page_height - margin, title)
+        pdf.setFont('Helvetica-Bold', 9)
+        for x, header in zip(positions, headers):
+            pdf.drawString(x, page_height - margin - 2 * line_height, header)
+        pdf.setFont('Helvetica', 8)
+        return page_height - margin - 3 * line_height
+
+    y = start_page()
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        if y < margin:
+            pdf.showPage()
+            y = start_page()
+        for x, width, value in zip(positions, widths, row):
+            pdf.drawString(x, y, str(value)[:width])
+        y -= line_height
+
+    pdf.save()
+    return count
+
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'pdf': write_pdf,
+}
+
+
+def generate_report(job):
+    """Genera el archivo del reporte y lo guarda en job.archivo"""
+    headers, row_generator, widths = REPORTS[job.tipo]
+    title = f'Reporte de {job.get_tipo_display().lower()}'
+    if job.fecha_desde or job.fecha_hasta:
+        desde = job.fecha_desde.strftime('%d/%m/%Y') if job.fecha_desde else 'inicio'
+        hasta = job.fecha_hasta.strftime('%d/%m/%Y') if job.fecha_hasta else 'hoy'
+        title = f'{title} ({desde} - {hasta})'
+
+    fd, path = tempfile.mkstemp(suffix=f'.{job.formato}')
+    os.close(fd)
+    try:
+        job.filas = WRITERS[job.formato](path, title, headers, row_generator(job), widths)
+        with open(path, 'rb') as f:
+            job.archivo.save(f'reporte_{job.tipo}_{secrets.token_urlsafe(16)}.{job.formato}', File(f), save=False)
+    finally:
+        os.remove(path)
+
+
+def requeue_stale_jobs(minutes):
+    """Devuelve a 'pendiente' los reportes que llevan demasiado tiempo procesándose (worker caído)"""
+    return ReportJob.objects.filter(
+        estado='procesando', started_at__lt=timezone.now() - timedelta(minutes=minutes)
+    ).update(estado='pendiente', started_at=None)
+
+
+def claim_next_job():
+    """
+    Toma el siguiente reporte pendiente marcándolo como 'procesando'.
+    La actualización condicional evita que dos workers tomen el mismo reporte.
+    Retorna el ReportJob o None si no hay pendientes.
+    """
+    while True:
+        job = ReportJob.objects.filter(estado='pendiente').order_by('created_at').first()
+        if job is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=job.pk, estado='pendiente').update(
+            estado='procesando', started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def process_job(job):
+    """Genera el reporte y registra el resultado; retorna True si terminó bien"""
+    try:
+        generate_report(job)
+    except Exception as e:
+        job.estado = 'error'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['estado', 'error', 'finished_at'])
+        return False
+
+    job.estado = 'completado'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['estado', 'archivo', 'filas', 'finished_at'])
+    return True
@@ -0,0 +1,112 @@
+"""
+Votos "¿Te resultó útil?" de las reseñas.
+
+Cada voto se registra en ReviewVote (un voto por usuario y reseña) y se
+suma con F() en un fragmento aleatorio de ReviewHelpfulShard. Así los
+votos concurrentes sobre una misma reseña se reparten entre varias filas
+en lugar de bloquear siempre la fila de Review. El comando
+consolidar_votos_utiles traslada periódicamente los fragmentos a
+Review.helpful_count.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .detail_cache import bump_producto_version
+from .models import Review, ReviewVote, ReviewHelpfulShard
+
+
+def get_shard_count():
+    """Número de fragmentos por reseña (setting REVIEW_HELPFUL_SHARDS)"""
+    return max(1, getattr(settings, 'REVIEW_HELPFUL_SHARDS', 8))
+
+
+def _increment_shard(review_id):
+    """Suma un voto en un fragmento aleatorio de la reseña"""
+    shard = random.randrange(get_shard_count())
+    updated = ReviewHelpfulShard.objects.filter(
+        review_id=review_id, shard=shard
+    ).update(count=F('count') + 1)
+
+    if not updated:
+        # Primer voto en este fragmento: crearlo. Si otra petición lo creó
+        # al mismo tiempo, el savepoint permite reintentar la actualización.
+        try:
+            with transaction.atomic():
+                ReviewHelpfulShard.objects.create(review_id=review_id, shard=shard, count=1)
+        except IntegrityError:
+            ReviewHelpfulShard.objects.filter(
+                review_id=review_id, shard=shard
+            ).update(count=F('count') + 1)
+
+
+def vote_helpful(review, user):
+    """
+    Registra el voto útil de un usuario.
+    Retorna True si el voto es nuevo y False si el usuario ya había votado.
+    """
+    try:
+        with transaction.atomic():
+            ReviewVote.objects.create(review=review, user=user)
+            _increment_shard(review.pk)
+    except IntegrityError:
+        return False
+    return True
+
+
+def get_helpful_total(review):
+    """Total de votos útiles: valor consolidado más fragmentos pendientes"""
+    pending = review.helpful_shards.aggregate(total=Sum('count'))['total'] or 0
+    return review.helpful_count + pending
+
+
+def consolidate_helpful_counts(batch_size=500):
+    """
+    Traslada los votos pendientes de los fragmentos a Review.helpful_count.
+    Procesa las reseñas en lotes con transacciones cortas.
+    Retorna (reseñas actualizadas, votos consolidados).
+    """
+    reviews_updated = 0
+    votes_moved = 0
+    last_id = 0
+
+    while True:
+        review_ids = list(
+            ReviewHelpfulShard.objects.filter(review_id__gt=last_id, count__gt=0)
+            .order_by('review_id')
+            .values_list('review_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not review_ids:
+            break
+        last_id = review_ids[-1]
+
+        with transaction.atomic():
+            shards = list(
+                ReviewHelpfulShard.objects.select_for_update()
+                .filter(review_id__in=review_ids, count__gt=0)
+                .values_list('pk', 'review_id', 'count')
+            )
+            totals = {}
+            for _, review_id, count in shards:
+                totals[review_id] = totals.get(review_id, 0) + count
+
+            for review_id, total in totals.items():
+                Review.objects.filter(pk=review_id).update(helpful_count=F('helpful_count') + total)
+
+            # Restar lo leído (en lugar de poner 0) no pierde votos en los
+            # motores que ignoran select_for_update, como SQLite
+            for pk, _, count in shards:
+                ReviewHelpfulShard.objects.filter(pk=pk).update(count=F('count') - count)
+
+        # update() no envía señales: invalidar a mano el detalle cacheado
+        bump_producto_version(
+            *Review.objects.filter(pk__in=totals).values_list('producto_id', flat=True)
+        )
+
+        reviews_updated += len(totals)
+        votes_moved += sum(totals.values())
+
+    return reviews_updated, votes_moved
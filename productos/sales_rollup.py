@@ -0,0 +1,159 @@
+"""
+Resúmenes de ventas por día y por semana (ResumenVentasProducto y
+ResumenVentasCategoria).
+
+Los pedidos se agregan de forma incremental: un punto de control
+(JobCheckpoint) guarda el último Pedido sumado, y cada ejecución solo
+agrega los pedidos nuevos, por ventanas de ids, sumando sus totales a las
+filas existentes. Los pedidos más recientes que ROLLUP_LAG_MINUTES se
+dejan para la siguiente ejecución, para no saltarse pedidos con un id menor
+cuya transacción aún no había terminado.
+
+Los cambios posteriores a un pedido ya sumado (o a las categorías de un
+producto) no se reflejan: para eso está reconstruir_resumen_ventas.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Pedido, DetallePedido, JobCheckpoint, ResumenVentasProducto, ResumenVentasCategoria
+)
+
+CHECKPOINT_NAME = 'resumen_ventas'
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _aggregate(detalles, group_field):
+    """
+    Totales por (día, group_field) de los detalles indicados.
+    Un pedido cae en un solo día, así que los pedidos distintos por día se
+    pueden sumar para obtener los de la semana.
+    """
+    rows = (
+        detalles
+        .annotate(dia=TruncDate('pedido__fecha_pedido', tzinfo=timezone.get_current_timezone()))
+        .values('dia', group_field)
+        .annotate(
+            total_unidades=Sum('cantidad'),
+            total_ingresos=Sum(ExpressionWrapper(
+                F('cantidad') * F('precio_unitario'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            )),
+            total_pedidos=Count('pedido_id', distinct=True),
+        )
+        .order_by()
+    )
+
+    totals = defaultdict(lambda: [0, Decimal('0.00'), 0])
+    for row in rows:
+        key_id = row[group_field]
+        if key_id is None:
+            continue
+        for periodo, fecha in (('dia', row['dia']), ('semana', _week_start(row['dia']))):
+            total = totals[(periodo, fecha, key_id)]
+            total[0] += row['total_unidades']
+            total[1] += row['total_ingresos']
+            total[2] += row['total_pedidos']
+    return totals
+
+
+def _add_totals(model, key_field, totals):
+    """Suma los totales a las filas del resumen, creando las que no existen"""
+    if not totals:
+        return
+
+    existing = {
+        (row.periodo, row.fecha_inicio, getattr(row, f'{key_field}_id')): row
+        for row in model.objects.select_for_update().filter(
+            fecha_inicio__in={fecha for _, fecha, _ in totals},
+            **{f'{key_field}_id__in': {key_id for _, _, key_id in totals}},
+        )
+    }
+
+    to_create = []
+    to_update = []
+    for (periodo, fecha, key_id), (unidades, ingresos, pedidos) in totals.items():
+        row = existing.get((periodo, fecha, key_id))
+        if row is None:
+            to_create.append(model(
+                periodo=periodo, fecha_inicio=fecha, unidades=unidades,
+                ingresos=ingresos, pedidos=pedidos, **{f'{key_field}_id': key_id}
+            ))
+        else:
+            row.unidades += unidades
+            row.ingresos += ingresos
+            row.pedidos += pedidos
+            to_update.append(row)
+
+    model.objects.bulk_create(to_create)
+    model.objects.bulk_update(to_update, ['unidades', 'ingresos', 'pedidos'])
+
+
+def update_sales_rollups(batch_size=1000, lag_minutes=None):
+    """
+    Agrega a los resúmenes los pedidos nuevos desde el último punto de control.
+    Retorna el número de pedidos agregados.
+    """
+    if lag_minutes is None:
+        lag_minutes = getattr(settings, 'ROLLUP_LAG_MINUTES', 5)
+    cutoff = timezone.now() - timedelta(minutes=lag_minutes)
+
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            # El punto de control se relee bloqueado en la misma transacción que
+            # lo avanza: otra ejecución simultánea espera y sigue desde el nuevo valor
+            checkpoint = JobCheckpoint.lock(CHECKPOINT_NAME)
+            pedidos = list(
+                Pedido.objects.filter(pk__gt=checkpoint.last_id)
+                .order_by('pk')
+                .values_list('pk', 'fecha_pedido')[:batch_size]
+            )
+            # El punto de control no puede pasar del primer pedido demasiado reciente
+            pedido_ids = []
+            for pk, fecha_pedido in pedidos:
+                if fecha_pedido >= cutoff:
+                    break
+                pedido_ids.append(pk)
+            if not pedido_ids:
+                break
+
+            detalles = DetallePedido.objects.filter(pedido_id__in=pedido_ids)
+            _add_totals(ResumenVentasProducto, 'producto', _aggregate(detalles, 'producto_id'))
+            _add_totals(
+                ResumenVentasCategoria, 'categoria',
+                _aggregate(detalles, 'producto__categorias__categoria_id')
+            )
+            checkpoint.last_id = pedido_ids[-1]
+            checkpoint.save(update_fields=['last_id', 'updated_at'])
+
+        processed += len(pedido_ids)
+        if len(pedido_ids) < len(pedidos):
+            break
+
+    return processed
+
+
+def rebuild_sales_rollups(batch_size=1000):
+    """
+    Borra los resúmenes y los recalcula desde el primer pedido.
+    Retorna el número de pedidos agregados.
+    """
+    with transaction.atomic():
+        JobCheckpoint.lock(CHECKPOINT_NAME)
+        ResumenVentasProducto.objects.all().delete()
+        ResumenVentasCategoria.objects.all().delete()
+        JobCheckpoint.advance(CHECKPOINT_NAME, 0)
+
+    return update_sales_rollups(batch_size=batch_size)
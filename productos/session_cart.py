@@ -0,0 +1,118 @@
+"""
+Carrito de invitados guardado en la sesión.
+
+Los usuarios anónimos arman su carrito sin crear filas en Cart/CartItem:
+la sesión guarda {producto_id: cantidad} y solo se valida contra el stock
+disponible (sin reservarlo). Al iniciar sesión, merge_session_cart lo
+fusiona con el carrito persistente usando apply_cart_operations, que
+reserva el stock y escribe los items por lotes en una transacción.
+"""
+from .cart_operations import apply_cart_operations
+from .models import Producto, Cart
+
+SESSION_KEY = 'carrito'
+
+
+class SessionCartItem:
+    """Item del carrito de invitado con la misma interfaz que CartItem en cart.html"""
+
+    def __init__(self, producto, quantity):
+        self.producto = producto
+        self.producto_id = producto.pk
+        # Los formularios de cart.html usan el id del producto como id del item
+        self.pk = producto.pk
+        self.quantity = quantity
+
+    @property
+    def subtotal(self):
+        return self.producto.precio * self.quantity
+
+    @property
+    def max_quantity(self):
+        return self.producto.stock
+
+
+class SessionCart:
+    """Carrito de invitado con la misma interfaz que Cart en cart.html"""
+
+    def __init__(self, session):
+        self.session = session
+        self.data = session.get(SESSION_KEY, {})
+
+    def __len__(self):
+        return len(self.data)
+
+    def save(self):
+        self.session[SESSION_KEY] = self.data
+        self.session.modified = True
+
+    def set(self, producto, quantity, add=False):
+        """
+        Fija (o suma, con add=True) la cantidad de un producto.
+        Retorna False si supera el stock disponible.
+        """
+        key = str(producto.pk)
+        if add:
+            quantity += self.data.get(key, 0)
+        if quantity > producto.stock:
+            return False
+        self.data[key] = quantity
+        self.save()
+        return True
+
+    def remove(self, producto_id):
+        if self.data.pop(str(producto_id), None) is not None:
+            self.save()
+
+    def clear(self):
+        self.data = {}
+        self.session.pop(SESSION_KEY, None)
+
+    @property
+    def items(self):
+        """Items con sus productos (una consulta; los productos eliminados se descartan)"""
+        if not hasattr(self, '_items'):
+            productos = Producto.objects.in_bulk([int(pk) for pk in self.data])
+            self._items = [
+                SessionCartItem(productos[int(pk)], quantity)
+                for pk, quantity in self.data.items()
+                if int(pk) in productos
+            ]
+        return self._items
+
+    @property
+    def total_items(self):
+        return sum(item.quantity for item in self.items)
+
+    @property
+    def total_price(self):
+        return sum((item.subtotal for item in self.items), 0)
+
+
+def merge_session_cart(request, user):
+    """
+    Fusiona el carrito de invitado de la sesión con el carrito del usuario.
+    Las cantidades se suman; si no alcanza el stock se agrega lo disponible.
+    Retorna el número de productos que no se pudieron agregar completos.
+    """
+    session_cart = SessionCart(request.session)
+    if not len(session_cart):
+        return 0
+
+    cart, created = Cart.objects.get_or_create(user=user)
+    operations = [
+        {'op': 'add', 'producto_id': int(pk), 'quantity': quantity}
+        for pk, quantity in session_cart.data.items()
+    ]
+    errors = apply_cart_operations(cart, operations)
+
+    # Segundo intento con lo disponible para los productos sin stock suficiente
+    capped = [
+        {'op': 'update', 'producto_id': error['producto_id'], 'quantity': error['available']}
+        for error in errors if error.get('available')
+    ]
+    if capped:
+        apply_cart_operations(cart, capped)
+
+    session_cart.clear()
+    return len(errors)
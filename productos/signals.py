@@ -0,0 +1,143 @@
+"""
+Señales de la app productos.
+- Invalidan el detalle de producto cacheado (detail_cache.py) cuando cambian sus datos de catálogo.
+- Invalidan los contadores del encabezado (counters.py) cuando cambia el carrito.
+- Mantienen el contador de notificaciones sin leer de cada usuario.
+- Devuelven al stock la reserva de los items del carrito eliminados.
+- Encolan los avisos a favoritos cuando un producto baja de precio o vuelve a tener stock.
+- Encolan el aviso a los seguidores de una categoría cuando recibe productos nuevos.
+- Fusionan el carrito de invitado de la sesión al iniciar sesión.
+"""
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.signals import user_logged_in
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .counters import (
+    invalidate_header_counts, adjust_unread_counts, count_new_notifications, rebuild_unread_count,
+)
+from .detail_cache import bump_producto_version
+from .models import (
+    Producto, Categoria, ProductoCategoria, Review, CartItem, Notification, NotificationCounter,
+)
+from .notification_jobs import enqueue_producto_changes, enqueue_new_products
+from .session_cart import merge_session_cart
+from .stock import release_stock, is_deleting_released_items
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidate_producto_detail(sender, instance, **kwargs):
+    """Invalida el detalle del producto y el de los productos que lo muestran como relacionado"""
+    categoria_ids = ProductoCategoria.objects.filter(producto_id=instance.pk).values('categoria_id')
+    related_ids = ProductoCategoria.objects.filter(
+        categoria_id__in=categoria_ids
+    ).values_list('producto_id', flat=True)
+    bump_producto_version(instance.pk, *related_ids)
+
+
+@receiver(post_save, sender=Producto)
+def enqueue_favorite_notifications(sender, instance, created, **kwargs):
+    """Encola el aviso a favoritos si el precio bajó o el producto volvió a tener stock"""
+    if not created:
+        enqueue_producto_changes(instance)
+
+
+@receiver(post_save, sender=ProductoCategoria)
+@receiver(post_delete, sender=ProductoCategoria)
+def invalidate_producto_categoria(sender, instance, **kwargs):
+    """Invalida los productos de la categoría (cambian sus relacionados)"""
+    related_ids = ProductoCategoria.objects.filter(
+        categoria_id=instance.categoria_id
+    ).values_list('producto_id', flat=True)
+    bump_producto_version(instance.producto_id, *related_ids)
+
+
+@receiver(post_save, sender=ProductoCategoria)
+def enqueue_category_notifications(sender, instance, created, **kwargs):
+    """Encola el aviso de producto nuevo para los seguidores de la categoría (no al recategorizar)"""
+    if created:
+        enqueue_new_products([(instance.categoria_id, instance.pk)])
+
+
+@receiver(post_save, sender=Categoria)
+def invalidate_categoria(sender, instance, created, **kwargs):
+    """Invalida los productos que muestran el nombre de la categoría"""
+    if created:
+        return
+    bump_producto_version(
+        *ProductoCategoria.objects.filter(categoria=instance).values_list('producto_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review(sender, instance, **kwargs):
+    """Invalida el detalle del producto reseñado"""
+    bump_producto_version(instance.producto_id)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_counts(sender, instance, **kwargs):
+    """
+    Invalida el contador del carrito del dueño. Quien guarda o borra items
+    carga el carrito con el item (select_related o el propio cart) para que
+    leer el dueño no cueste otra consulta; delete_released_items lo omite
+    y el llamador invalida el contador una vez.
+    """
+    if is_deleting_released_items():
+        return
+    invalidate_header_counts(instance.cart.user_id)
+
+
+@receiver(post_delete, sender=CartItem)
+def release_cart_item_reservation(sender, instance, **kwargs):
+    """Devuelve al stock las unidades que el item tenía reservadas"""
+    if is_deleting_released_items():
+        return
+    release_stock(instance.producto_id, instance.reserved_quantity)
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_count(sender, instance, created, **kwargs):
+    """Mantiene el contador de notificaciones sin leer del destinatario"""
+    if created:
+        count_new_notifications([instance])
+    else:
+        # Edición individual (p. ej. desde el admin): is_read pudo cambiar
+        rebuild_unread_count(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def discount_deleted_notification(sender, instance, **kwargs):
+    """Descuenta del contador las notificaciones sin leer eliminadas"""
+    if not instance.is_read:
+        adjust_unread_counts({instance.user_id: -1})
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_notification_counter(sender, instance, created, raw=False, **kwargs):
+    """Crea el contador de no leídas de las cuentas nuevas"""
+    if created and not raw:
+        NotificationCounter.objects.create(user=instance)
+
+
+@receiver(user_logged_in)
+def merge_guest_cart(sender, request, user, **kwargs):
+    """Pasa el carrito de invitado de la sesión al carrito del usuario"""
+    if request is None or not hasattr(request, 'session'):
+        return
+    try:
+        incompletos = merge_session_cart(request, user)
+    except ValidationError:
+        messages.warning(request, 'No se pudo recuperar tu carrito de invitado. Revisa tu carrito.', fail_silently=True)
+        return
+    if incompletos:
+        messages.warning(
+            request,
+            f'{incompletos} producto(s) de tu carrito no tenían stock suficiente y se ajustaron.',
+            fail_silently=True
+        )
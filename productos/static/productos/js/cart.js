@@ -0,0 +1,116 @@
+/**
+ * ========================================
+ * JAVASCRIPT DEL CARRITO DE COMPRAS
+ * Archivo: cart.js
+ * ========================================
+ *
+ * Envía todos los cambios de cantidad del carrito en una sola petición al
+ * endpoint por lotes (cart_batch_update) y actualiza subtotales y totales
+ * sin recargar la página. Sin JavaScript, cada formulario sigue enviándose
+ * por separado a update_cart_item.
+ */
+
+(function() {
+    'use strict';
+
+    function getChangedOperations() {
+        const operations = [];
+        document.querySelectorAll('.cart-quantity-input').forEach(input => {
+            if (input.value !== input.getAttribute('data-initial')) {
+                operations.push({
+                    op: 'update',
+                    producto_id: parseInt(input.getAttribute('data-producto-id'), 10),
+                    quantity: parseInt(input.value, 10) || 0
+                });
+            }
+        });
+        return operations;
+    }
+
+    function renderCart(data) {
+        const itemsByProducto = {};
+        data.items.forEach(item => {
+            itemsByProducto[item.producto_id] = item;
+        });
+
+        document.querySelectorAll('.cart-item-card').forEach(card => {
+            const productoId = card.getAttribute('data-producto-id');
+            const item = itemsByProducto[productoId];
+            if (!item) {
+                card.remove();
+                return;
+            }
+
+            const input = card.querySelector('.cart-quantity-input');
+            input.value = item.quantity;
+            input.max = item.max_quantity;
+            input.setAttribute('data-initial', item.quantity);
+            document.getElementById(`available-${productoId}`).textContent = item.max_quantity;
+            document.getElementById(`subtotal-${productoId}`).textContent = `$${item.subtotal}`;
+            document.getElementById(`error-${productoId}`).textContent = '';
+        });
+
+        data.errors.forEach(error => {
+            const errorElement = document.getElementById(`error-${error.producto_id}`);
+            if (errorElement) {
+                errorElement.textContent = error.error;
+            }
+        });
+
+        document.getElementById('cart-total-items').textContent = data.total_items;
+        document.querySelectorAll('.cart-total-price').forEach(element => {
+            element.textContent = `$${data.total_price}`;
+        });
+
+        // Carrito vacío: recargar para mostrar el estado vacío
+        if (data.items.length === 0) {
+            window.location.reload();
+        }
+    }
+
+    async function updateCart(event) {
+        const container = document.getElementById('cart-items');
+        const operations = getChangedOperations();
+        // El carrito de invitado no usa el endpoint por lotes: los formularios se envían normalmente
+        if (!container || !container.hasAttribute('data-batch-url') || operations.length === 0) {
+            return;
+        }
+        if (event) {
+            event.preventDefault();
+        }
+
+        const csrfInput = document.querySelector('[name=csrfmiddlewaretoken]');
+        try {
+            const response = await fetch(container.getAttribute('data-batch-url'), {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrfInput.value,
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: JSON.stringify({ operations: operations })
+            });
+            const data = await response.json();
+
+            if (!response.ok) {
+                alert(data.message || 'No se pudo actualizar el carrito.');
+                return;
+            }
+            renderCart(data);
+        } catch (error) {
+            console.error('Error al actualizar el carrito:', error);
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const updateButton = document.getElementById('btn-update-cart');
+        if (updateButton) {
+            updateButton.addEventListener('click', () => updateCart());
+        }
+
+        // Los botones de cada item también envían todos los cambios pendientes juntos
+        document.querySelectorAll('.cart-quantity-input').forEach(input => {
+            input.form.addEventListener('submit', updateCart);
+        });
+    });
+})();
@@ -0,0 +1,80 @@
+/**
+ * ========================================
+ * JAVASCRIPT DE NOTIFICACIONES EN VIVO
+ * Archivo: notifications_live.js
+ * ========================================
+ *
+ * Mantiene actualizada la insignia de notificaciones sin recargar la página.
+ * La plantilla solo incluye este script cuando el servidor corre bajo ASGI.
+ * Usa el stream SSE (EventSource); si el navegador no soporta EventSource,
+ * consulta el endpoint JSON de contadores cada data-poll-seconds segundos.
+ * Si el stream no está disponible (responde 204) no se consulta nada: la
+ * insignia se actualiza al cargar la siguiente página.
+ */
+
+(function() {
+    'use strict';
+
+    const script = document.currentScript;
+    const badge = document.getElementById('unread-notifications-badge');
+    if (!script || !badge) {
+        return;
+    }
+
+    const streamUrl = script.getAttribute('data-stream-url');
+    const countsUrl = script.getAttribute('data-counts-url');
+    const pollInterval = (parseInt(script.getAttribute('data-poll-seconds'), 10) || 15) * 1000;
+
+    function updateBadge(unread) {
+        badge.textContent = unread;
+        badge.classList.toggle('d-none', unread <= 0);
+    }
+
+    function startPolling() {
+        setInterval(async function() {
+            if (document.hidden) {
+                return;
+            }
+            try {
+                const response = await fetch(countsUrl, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' }
+                });
+                if (response.ok) {
+                    const data = await response.json();
+                    updateBadge(data.unread);
+                }
+            } catch (error) {
+                console.error('Error al consultar las notificaciones:', error);
+            }
+        }, pollInterval);
+    }
+
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    const source = new EventSource(streamUrl);
+    let connected = false;
+
+    source.addEventListener('open', function() {
+        connected = true;
+    });
+
+    source.addEventListener('unread', function(event) {
+        updateBadge(JSON.parse(event.data).unread);
+    });
+
+    source.addEventListener('notification', function(event) {
+        const notification = JSON.parse(event.data);
+        document.dispatchEvent(new CustomEvent('kitty:notification', { detail: notification }));
+    });
+
+    source.addEventListener('error', function() {
+        // Sin conexión establecida (p. ej. 204) el stream no está disponible:
+        // cerrarlo sin pasar a consultas periódicas
+        if (!connected) {
+            source.close();
+        }
+    });
+})();
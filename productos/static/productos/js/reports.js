@@ -0,0 +1,59 @@
+/**
+ * ========================================
+ * JAVASCRIPT DE REPORTES
+ * Archivo: reports.js
+ * ========================================
+ *
+ * Consulta periódicamente el estado de los reportes pendientes o en proceso
+ * y muestra el botón de descarga cuando el worker termina de generarlos.
+ */
+
+(function() {
+    'use strict';
+
+    const POLL_INTERVAL = 5000;
+    const ACTIVE_STATES = ['pendiente', 'procesando'];
+
+    async function pollRow(row) {
+        try {
+            const response = await fetch(row.getAttribute('data-status-url'), {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            });
+            const data = await response.json();
+
+            row.setAttribute('data-estado', data.estado);
+            const estadoCell = row.querySelector('.report-estado');
+            estadoCell.textContent = data.estado_display;
+            if (data.estado === 'error' && data.error) {
+                const errorElement = document.createElement('small');
+                errorElement.className = 'text-danger d-block';
+                errorElement.textContent = data.error;
+                estadoCell.appendChild(errorElement);
+            }
+
+            if (data.download_url) {
+                row.querySelector('.report-download').innerHTML =
+                    `<a href="${data.download_url}" class="btn btn-sm btn-success">` +
+                    '<i class="fas fa-download"></i> Descargar</a>';
+            }
+        } catch (error) {
+            console.error('Error al consultar el reporte:', error);
+        }
+    }
+
+    function pollActiveReports() {
+        const activeRows = Array.from(document.querySelectorAll('.report-row'))
+            .filter(row => ACTIVE_STATES.includes(row.getAttribute('data-estado')));
+
+        if (activeRows.length === 0) {
+            return;
+        }
+        Promise.all(activeRows.map(pollRow)).then(() => {
+            setTimeout(pollActiveReports, POLL_INTERVAL);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        setTimeout(pollActiveReports, POLL_INTERVAL);
+    });
+})();
@@ -0,0 +1,72 @@
+/**
+ * ========================================
+ * JAVASCRIPT DE VOTOS ÚTILES EN RESEÑAS
+ * Archivo: review_votes.js
+ * ========================================
+ *
+ * Envía el voto "¿Te resultó útil?" por AJAX. El token CSRF se toma de
+ * cualquier formulario de la página y el estado de sesión del atributo
+ * data-authenticated, de modo que el listado de reseñas no necesita incluir
+ * datos propios del usuario.
+ */
+
+(function() {
+    'use strict';
+
+    const currentScript = document.currentScript;
+    const loginUrl = currentScript ? currentScript.getAttribute('data-login-url') : null;
+    const isAuthenticated = currentScript ? currentScript.getAttribute('data-authenticated') === 'true' : false;
+
+    function formatHelpfulText(count) {
+        if (count <= 0) {
+            return '';
+        }
+        const personas = count === 1 ? 'persona encontró' : 'personas encontraron';
+        return `<i class="fas fa-thumbs-up"></i> ${count} ${personas} esto útil`;
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('.btn-vote-helpful').forEach(button => {
+            button.addEventListener('click', async function() {
+                const csrfInput = document.querySelector('[name=csrfmiddlewaretoken]');
+
+                if (!isAuthenticated || !csrfInput) {
+                    if (loginUrl) {
+                        window.location.href = `${loginUrl}?next=${encodeURIComponent(window.location.pathname)}`;
+                    }
+                    return;
+                }
+
+                this.disabled = true;
+
+                try {
+                    const response = await fetch(this.getAttribute('data-vote-url'), {
+                        method: 'POST',
+                        headers: {
+                            'X-CSRFToken': csrfInput.value,
+                            'X-Requested-With': 'XMLHttpRequest'
+                        }
+                    });
+                    const data = await response.json();
+
+                    if (data.message) {
+                        this.textContent = data.message;
+                        return;
+                    }
+
+                    if (typeof data.helpful_count !== 'undefined') {
+                        const countElement = document.getElementById(`helpful-count-${this.getAttribute('data-review-id')}`);
+                        if (countElement) {
+                            countElement.innerHTML = formatHelpfulText(data.helpful_count);
+                        }
+                    }
+
+                    this.innerHTML = '<i class="fas fa-thumbs-up"></i> ¡Gracias!';
+                } catch (error) {
+                    console.error('Error al registrar el voto:', error);
+                    this.disabled = false;
+                }
+            });
+        });
+    });
+})();
@@ -0,0 +1,200 @@
+"""
+Reserva de stock para el carrito.
+
+Producto.stock es el stock disponible: al agregar un producto al carrito
+las unidades se descuentan con un UPDATE condicional (WHERE stock >= n),
+que la base de datos aplica de forma atómica aunque lleguen muchas
+peticiones a la vez, y quedan apartadas en CartItem.reserved_quantity
+hasta CartItem.reserved_until. El comando liberar_reservas_vencidas
+devuelve al stock las reservas vencidas; el checkout descuenta solo las
+unidades que ya no estén reservadas.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .models import Producto, CartItem
+from .notification_jobs import enqueue_back_in_stock
+
+# Productos por sentencia UPDATE en apply_stock_deltas
+STOCK_BATCH_SIZE = 100
+
+
+def get_reservation_expiry():
+    """Vencimiento de una reserva hecha ahora (setting CART_RESERVATION_MINUTES)"""
+    return timezone.now() + timedelta(minutes=getattr(settings, 'CART_RESERVATION_MINUTES', 15))
+
+
+def reserve_stock(producto_id, quantity):
+    """
+    Descuenta quantity unidades del stock si hay suficientes.
+    Retorna True si se reservaron y False si no alcanzó el stock.
+    """
+    return Producto.objects.filter(pk=producto_id, stock__gte=quantity).update(
+        stock=F('stock') - quantity
+    ) == 1
+
+
+def release_stock(producto_id, quantity):
+    """
+    Devuelve quantity unidades al stock del producto.
+    update() no envía señales: si el producto estaba agotado se encola aquí
+    el aviso de disponibilidad a quienes lo tienen en favoritos.
+    """
+    if quantity <= 0:
+        return
+    if Producto.objects.filter(pk=producto_id, stock__lte=0).update(stock=F('stock') + quantity):
+        enqueue_back_in_stock([producto_id])
+    else:
+        Producto.objects.filter(pk=producto_id).update(stock=F('stock') + quantity)
+
+
+def apply_stock_deltas(deltas):
+    """
+    Descuenta (delta positivo) o devuelve (delta negativo) stock de varios
+    productos con una sola sentencia UPDATE por lote.
+    Cada fila solo se actualiza si tiene stock suficiente; si alguna no se
+    actualiza se lanza ValidationError para revertir la transacción.
+    """
+    producto_ids = sorted(pk for pk, delta in deltas.items() if delta)
+    # Los productos agotados que recuperan stock avisan a sus favoritos
+    agotados = []
+    if any(deltas[pk] < 0 for pk in producto_ids):
+        agotados = list(
+            Producto.objects.filter(pk__in=[pk for pk in producto_ids if deltas[pk] < 0], stock__lte=0)
+            .values_list('pk', flat=True)
+        )
+    for start in range(0, len(producto_ids), STOCK_BATCH_SIZE):
+        batch = producto_ids[start:start + STOCK_BATCH_SIZE]
+        enough_stock = Q()
+        for pk in batch:
+            enough_stock |= Q(pk=pk, stock__gte=deltas[pk])
+
+        updated = Producto.objects.filter(enough_stock).update(
+            stock=Case(
+                *[When(pk=pk, then=F('stock') - deltas[pk]) for pk in batch],
+                default=F('stock'),
+            )
+        )
+        if updated != len(batch):
+            raise ValidationError('El stock de algunos productos cambió. Revisa tu carrito.')
+
+    if agotados:
+        enqueue_back_in_stock(agotados)
+
+
+def set_item_quantity(cart, producto_id, quantity, add=False):
+    """
+    Fija (o suma, con add=True) la cantidad de un producto en el carrito
+    reservando solo la diferencia con lo que el item ya tenía reservado.
+    Una cantidad final de 0 (o menos) quita el item del carrito.
+    Retorna el CartItem actualizado, o None si no hay stock suficiente.
+    """
+    with transaction.atomic():
+        # La fila del item se bloquea para que dos peticiones del mismo
+        # usuario (o el comando de limpieza) no reserven dos veces
+        cart_item, created = CartItem.objects.select_for_update().get_or_create(
+            cart=cart, producto_id=producto_id, defaults={'quantity': 0}
+        )
+        # El item leído no trae el carrito: reusar el recibido evita una consulta en la señal
+        cart_item.cart = cart
+        if add:
+            quantity += cart_item.quantity
+        if quantity <= 0:
+            # Un item no puede quedar con cantidad 0: post_delete devuelve su reserva
+            cart_item.delete()
+            return cart_item
+
+        delta = quantity - cart_item.reserved_quantity
+        if delta > 0 and not reserve_stock(producto_id, delta):
+            if created:
+                cart_item.delete()
+            return None
+        release_stock(producto_id, -delta)
+
+        cart_item.quantity = quantity
+        cart_item.reserved_quantity = quantity
+        cart_item.reserved_until = get_reservation_expiry()
+        cart_item.save(update_fields=['quantity', 'reserved_quantity', 'reserved_until'])
+
+    return cart_item
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Devuelve al stock las reservas vencidas, en lotes con transacciones cortas.
+    Los items siguen en el carrito; se vuelven a reservar al modificarlos
+    o se descuentan del stock en el checkout.
+    Retorna el número de items liberados.
+    """
+    now = timezone.now()
+    released = 0
+
+    while True:
+        with transaction.atomic():
+            items = list(
+                CartItem.objects.select_for_update()
+                .filter(reserved_quantity__gt=0, reserved_until__lt=now)
+                .order_by('pk')
+                .values_list('pk', 'producto_id', 'reserved_quantity')[:batch_size]
+            )
+            if not items:
+                break
+
+            totals = {}
+            for _, producto_id, reserved in items:
+                totals[producto_id] = totals.get(producto_id, 0) + reserved
+            for producto_id in sorted(totals):
+                release_stock(producto_id, totals[producto_id])
+
+            CartItem.objects.filter(pk__in=[pk for pk, _, _ in items]).update(
+                reserved_quantity=0, reserved_until=None
+            )
+
+        released += len(items)
+
+    return released
+
+
+def remove_cart_items(queryset):
+    """
+    Elimina items del carrito. Las filas se bloquean y se releen antes de borrar
+    para que la señal post_delete devuelva al stock la reserva vigente.
+    Retorna el número de items eliminados.
+    """
+    with transaction.atomic():
+        # El carrito se carga con el item para la señal que invalida los contadores
+        items = list(queryset.select_related('cart').select_for_update(of=('self',)).order_by('pk'))
+        for item in items:
+            item.delete()
+    return len(items)
+
+
+# Activa mientras delete_released_items borra: las señales de CartItem no
+# deben devolver otra vez la reserva ni releer el carrito de cada item
+_released_delete = threading.local()
+
+
+def is_deleting_released_items():
+    """True si el borrado en curso es de items cuya reserva ya se resolvió"""
+    return getattr(_released_delete, 'active', False)
+
+
+def delete_released_items(queryset):
+    """
+    Borra con QuerySet.delete() items cuya reserva ya volvió al stock o pasó
+    a un pedido. Las señales de CartItem se omiten durante el borrado, así
+    que el llamador invalida los contadores del carrito.
+    Retorna el número de items eliminados.
+    """
+    _released_delete.active = True
+    try:
+        _, deleted = queryset.delete()
+    finally:
+        _released_delete.active = False
+    return deleted.get(CartItem._meta.label, 0)
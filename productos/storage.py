@@ -0,0 +1,50 @@
+"""
+Almacenamiento privado para archivos con datos personales (reportes).
+
+A diferencia de MEDIA, estos archivos no tienen URL pública:
+- En producción se guardan en S3 bajo PRIVATE_MEDIA con ACL privada y solo
+  se entregan mediante URLs firmadas de corta duración.
+- En desarrollo se guardan en disco en PRIVATE_MEDIA_ROOT, fuera de
+  MEDIA_ROOT, así que el servidor de MEDIA no los expone.
+En ambos casos se descargan únicamente a través de productos:report_download.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+# Segundos de validez de las URLs firmadas de S3
+SIGNED_URL_EXPIRE = 300
+
+
+class PrivateFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage con raíz en PRIVATE_MEDIA_ROOT y sin URL pública"""
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+    def url(self, name):
+        raise ValueError('Los archivos privados no tienen URL pública.')
+
+
+def private_storage():
+    """Almacenamiento de los archivos privados según el entorno"""
+    if settings.IS_DEPLOYED:
+        from storages.backends.s3boto3 import S3Boto3Storage
+
+        # custom_domain=None: el dominio personalizado genera URLs sin firmar
+        return S3Boto3Storage(
+            location=settings.PRIVATE_MEDIA,
+            default_acl='private',
+            querystring_auth=True,
+            querystring_expire=SIGNED_URL_EXPIRE,
+            custom_domain=None,
+            file_overwrite=False,
+        )
+    return PrivateFileSystemStorage()
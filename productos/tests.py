@@ -1,3 +1,1031 @@
-from django.test import TestCase
+"""
+Tests para la aplicación de productos
+"""
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.db import connection, OperationalError
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    Producto, Review, ReviewVote, Usuario, Reseña, JobCheckpoint, Cart, CartItem, Notification,
+    Pedido, DetallePedido, Categoria, ProductoCategoria, ResumenVentasProducto, ResumenVentasCategoria,
+    ReportJob, AlertaStockBajo, Favorite, NotificationJob, PriceAlert, CategoriaFollow, NotificationCounter
+)
+from .review_votes import vote_helpful, get_helpful_total, consolidate_helpful_counts
+from .detail_cache import get_producto_version, get_producto_fragments
+from .context_processors import cart_and_notifications
+from .stock import reserve_stock, set_item_quantity, remove_cart_items
+from .checkout import checkout_cart
+from .forms import ProductoForm
+from .counters import get_unread_count
+from .notifications import build_notifications, bulk_notify
+from .live_notifications import broker
+from .management.commands.limpiar_carritos_abandonados import Command as LimpiarCarritosCommand
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ReviewHelpfulVoteTest(TestCase):
+    """Tests para los votos útiles de reseñas"""
+
+    def setUp(self):
+        self.autor = User.objects.create_user(username='autor', password='testpass123')
+        self.votante = User.objects.create_user(username='votante', password='testpass123')
+        self.producto = Producto.objects.create(
+            nombre='Producto de prueba',
+            descripcion='Descripción del producto de prueba',
+            precio=10,
+            stock=5
+        )
+        self.review = Review.objects.create(
+            producto=self.producto,
+            user=self.autor,
+            rating=5,
+            title='Excelente producto',
+            comment='Muy buen producto, lo recomiendo.'
+        )
+
+    def test_one_vote_per_user(self):
+        """Test de que cada usuario solo puede votar una vez"""
+        self.assertTrue(vote_helpful(self.review, self.votante))
+        self.assertFalse(vote_helpful(self.review, self.votante))
+        self.assertEqual(ReviewVote.objects.count(), 1)
+        self.assertEqual(get_helpful_total(self.review), 1)
+
+    def test_consolidate_moves_shards_to_review(self):
+        """Test de consolidación de los fragmentos en helpful_count"""
+        for i in range(3):
+            voter = User.objects.create_user(username=f'voter{i}', password='testpass123')
+            vote_helpful(self.review, voter)
+
+        reviews_updated, votes_moved = consolidate_helpful_counts()
+        self.review.refresh_from_db()
+
+        self.assertEqual((reviews_updated, votes_moved), (1, 3))
+        self.assertEqual(self.review.helpful_count, 3)
+        self.assertEqual(get_helpful_total(self.review), 3)
+
+    def test_vote_endpoint_rejects_own_review(self):
+        """Test de que el autor no puede votar su propia reseña"""
+        self.client.login(username='autor', password='testpass123')
+        response = self.client.post(
+            reverse('productos:vote_review_helpful', args=[self.review.pk]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ReviewVote.objects.exists())
+
+
+class MigrarResenasCommandTest(TestCase):
+    """Tests para el comando migrar_resenas"""
+
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            nombre='Producto de prueba',
+            descripcion='Descripción del producto de prueba',
+            precio=10,
+            stock=5
+        )
+        self.con_cuenta = Usuario.objects.create(nombre='Ana', email='Ana@Example.com')
+        self.sin_cuenta = Usuario.objects.create(nombre='Luis', email='luis@example.com')
+        self.user = User.objects.create_user(username='ana', email='ana@example.com', password='testpass123')
+        self.reseña = Reseña.objects.create(
+            producto=self.producto, usuario=self.con_cuenta,
+            calificacion=4, comentario='Buen producto, llegó a tiempo.'
+        )
+        Reseña.objects.create(
+            producto=self.producto, usuario=self.sin_cuenta,
+            calificacion=2, comentario='No me gustó el acabado final.'
+        )
+
+    def test_migrates_matching_users_and_is_resumable(self):
+        """Test de migración por email y reanudación desde el punto de control"""
+        call_command('migrar_resenas', lote=1, stdout=StringIO())
+
+        review = Review.objects.get()
+        self.assertEqual(review.user, self.user)
+        self.assertEqual(review.legacy_reseña, self.reseña)
+        self.assertEqual(review.created_at, self.reseña.fecha_reseña)
+        self.assertEqual(JobCheckpoint.get_last_id('migrar_resenas'), Reseña.objects.order_by('pk').last().pk)
+
+        # Una segunda ejecución no duplica reviews
+        call_command('migrar_resenas', stdout=StringIO())
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_reports_existing_review_conflicts(self):
+        """Test de que la reseña de un usuario que ya tiene review del producto se omite y se informa"""
+        Review.objects.create(producto=self.producto, user=self.user, rating=5, title='Propia', comment='Ya la tenía.')
+        out = StringIO()
+        call_command('migrar_resenas', stdout=out)
+
+        self.assertFalse(Review.objects.filter(legacy_reseña__isnull=False).exists())
+        self.assertIn(f'Reseña #{self.reseña.pk} omitida', out.getvalue())
+        self.assertIn('Usuario con review del producto: 1', out.getvalue())
+        self.assertIn('Reviews creadas: 0', out.getvalue())
+
+    def test_create_users_option(self):
+        """Test de creación de cuentas inactivas para usuarios antiguos"""
+        call_command('migrar_resenas', crear_usuarios=True, stdout=StringIO())
+
+        self.assertEqual(Review.objects.count(), 2)
+        nuevo = User.objects.get(email='luis@example.com')
+        self.assertFalse(nuevo.is_active)
+        self.assertFalse(nuevo.has_usable_password())
+
+
+class ProductoDetailCacheTest(TestCase):
+    """Tests para la caché de fragmentos del detalle de producto"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.producto = Producto.objects.create(
+            nombre='Producto de prueba',
+            descripcion='Descripción del producto de prueba',
+            precio=10,
+            stock=5
+        )
+        self.url = reverse('productos:producto_detail', args=[self.producto.pk])
+
+    def test_fragments_are_served_from_cache(self):
+        """Test de que un acierto de caché no vuelve a consultar el catálogo"""
+        fragments = get_producto_fragments(self.producto)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_producto_fragments(self.producto), fragments)
+
+        self.client.login(username='cliente', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Escribir reseña')
+
+    def test_review_invalidates_fragments(self):
+        """Test de que una reseña nueva invalida los fragmentos cacheados"""
+        self.client.get(self.url)
+        version = get_producto_version(self.producto.pk)
+
+        Review.objects.create(
+            producto=self.producto, user=self.user, rating=4,
+            title='Muy bueno', comment='Cumple con lo esperado.'
+        )
+        self.assertNotEqual(get_producto_version(self.producto.pk), version)
+
+        self.client.login(username='cliente', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Muy bueno')
+        self.assertContains(response, 'Editar mi reseña')
+
+
+class CartTotalsTest(TestCase):
+    """Tests para los totales del carrito"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.cart = Cart.objects.create(user=self.user)
+        for nombre, precio, cantidad in (('Labial', '12.50', 2), ('Rubor', '8.00', 3)):
+            producto = Producto.objects.create(
+                nombre=nombre, descripcion=f'Descripción de {nombre}', precio=precio, stock=10
+            )
+            CartItem.objects.create(cart=self.cart, producto=producto, quantity=cantidad)
+
+    def test_summary_uses_one_query(self):
+        """Test de que los totales se calculan en una sola consulta memorizada"""
+        cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.total_items, 5)
+            self.assertEqual(cart.total_price, Decimal('49.00'))
+            self.assertEqual(cart.total_price, Decimal('49.00'))
+
+    def test_with_totals_annotation(self):
+        """Test de los totales anotados para el listado del admin"""
+        Cart.objects.create(user=User.objects.create_user(username='vacio', password='testpass123'))
+        with self.assertNumQueries(1):
+            totals = {
+                cart.user.username: (cart.total_items, cart.total_price)
+                for cart in Cart.objects.with_totals().select_related('user')
+            }
+        self.assertEqual(totals, {'cliente': (5, Decimal('49.00')), 'vacio': (0, Decimal('0.00'))})
+
+
+class HeaderCountsTest(TestCase):
+    """Tests para los contadores cacheados del encabezado"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.cart = Cart.objects.create(user=self.user)
+        self.producto = Producto.objects.create(
+            nombre='Producto de prueba', descripcion='Descripción', precio=10, stock=5
+        )
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_counts_are_lazy_and_cached(self):
+        """Test de que los contadores no consultan hasta usarse y luego salen de la caché"""
+        with self.assertNumQueries(0):
+            context = cart_and_notifications(self.request)
+        with self.assertNumQueries(2):
+            self.assertEqual(context['cart_items_count'], 0)
+            self.assertEqual(context['unread_notifications_count'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(cart_and_notifications(self.request)['cart_items_count'], 0)
+
+    def test_signals_invalidate_counts(self):
+        """Test de invalidación al agregar items o notificaciones"""
+        str(cart_and_notifications(self.request)['cart_items_count'])
+
+        CartItem.objects.create(cart=self.cart, producto=self.producto, quantity=2)
+        Notification.objects.create(
+            user=self.user, notification_type='system', title='Hola', message='Bienvenido'
+        )
+        context = cart_and_notifications(self.request)
+        self.assertEqual(context['cart_items_count'], 1)
+        self.assertEqual(context['unread_notifications_count'], 1)
+
+    def test_cart_item_signals_do_not_query_the_cart(self):
+        """Test de que guardar o quitar items no vuelve a leer el carrito para invalidar"""
+        item = set_item_quantity(self.cart, self.producto.pk, 2)
+        with CaptureQueriesContext(connection) as queries:
+            set_item_quantity(self.cart, self.producto.pk, 3)
+            remove_cart_items(CartItem.objects.filter(pk=item.pk))
+        self.assertFalse([q for q in queries if 'FROM "productos_cart"' in q['sql']])
+        self.assertEqual(cart_and_notifications(self.request)['cart_items_count'], 0)
+
+    def test_unread_counter_follows_bulk_creation_and_reads(self):
+        """Test del contador de no leídas con creación masiva y marcado como leídas"""
+        bulk_notify(build_notifications([self.user.pk] * 3, 'system', 'Aviso', 'Mensaje'))
+        Notification.objects.create(user=self.user, notification_type='system', title='Otro', message='Mensaje')
+        self.assertEqual(get_unread_count(self.user), 4)
+
+        notification = Notification.objects.filter(user=self.user).first()
+        self.client.login(username='cliente', password='testpass123')
+        self.client.post(reverse('productos:mark_notification_read', args=[notification.pk]))
+        self.client.post(reverse('productos:mark_notification_read', args=[notification.pk]))
+        self.assertEqual(get_unread_count(self.user), 3)
+
+        self.client.get(reverse('productos:my_notifications'))
+        self.assertEqual(get_unread_count(self.user), 0)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+        # Sin no leídas, volver a la página no actualiza filas
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('productos:my_notifications'))
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "productos_notification"')])
+
+
+    def test_accounts_without_counter_use_the_real_count(self):
+        """Test de las cuentas anteriores al contador: se cuentan sus no leídas en lugar de partir de 0"""
+        bulk_notify(build_notifications([self.user.pk] * 2, 'system', 'Aviso', 'Mensaje'))
+        NotificationCounter.objects.all().delete()
+        Notification.objects.create(user=self.user, notification_type='system', title='Otro', message='Mensaje')
+        self.assertEqual(get_unread_count(self.user), 3)
+
+        NotificationCounter.objects.all().delete()
+        self.assertEqual(get_unread_count(self.user), 3)
+
+        NotificationCounter.objects.all().delete()
+        call_command('reconstruir_contadores_notificaciones', stdout=StringIO())
+        self.assertEqual(NotificationCounter.objects.get(user=self.user).unread, 3)
+
+
+class StockReservationTest(TestCase):
+    """Tests para la reserva de stock del carrito"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.cart = Cart.objects.create(user=self.user)
+        self.producto = Producto.objects.create(
+            nombre='Producto de prueba', descripcion='Descripción', precio=10, stock=5
+        )
+
+    def stock(self):
+        self.producto.refresh_from_db(fields=['stock'])
+        return self.producto.stock
+
+    def test_reservation_moves_units_out_of_stock(self):
+        """Test de reserva, ajuste y liberación al eliminar el item"""
+        item = set_item_quantity(self.cart, self.producto.pk, 3)
+        self.assertEqual((item.reserved_quantity, self.stock()), (3, 2))
+
+        set_item_quantity(self.cart, self.producto.pk, 1)
+        self.assertEqual(self.stock(), 4)
+
+        self.assertIsNone(set_item_quantity(self.cart, self.producto.pk, 5, add=True))
+        self.assertEqual(self.stock(), 4)
+
+        remove_cart_items(self.cart.items.all())
+        self.assertEqual(self.stock(), 5)
+
+    def test_zero_quantity_removes_the_item(self):
+        """Test de que fijar la cantidad en 0 quita el item en lugar de guardarlo vacío"""
+        set_item_quantity(self.cart, self.producto.pk, 0)
+        self.assertFalse(self.cart.items.exists())
+
+        set_item_quantity(self.cart, self.producto.pk, 2)
+        set_item_quantity(self.cart, self.producto.pk, 0)
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(self.stock(), 5)
+
+    def test_expired_reservations_are_released(self):
+        """Test del comando liberar_reservas_vencidas"""
+        item = set_item_quantity(self.cart, self.producto.pk, 2)
+        CartItem.objects.filter(pk=item.pk).update(reserved_until=item.reserved_until - timedelta(days=1))
+
+        call_command('liberar_reservas_vencidas', stdout=StringIO())
+        item.refresh_from_db()
+        self.assertEqual((item.quantity, item.reserved_quantity, self.stock()), (2, 0, 5))
+
+        # Al eliminar un item ya liberado no se devuelve stock dos veces
+        remove_cart_items(self.cart.items.all())
+        self.assertEqual(self.stock(), 5)
+
+
+    def test_staff_edit_does_not_overwrite_reservations(self):
+        """Test de que editar un producto leído antes de una reserva no pisa el stock"""
+        form = ProductoForm(instance=Producto.objects.get(pk=self.producto.pk))
+        data = {'nombre': 'Producto editado', 'descripcion': 'Descripción editada', 'precio': '10.00',
+                'stock': 8, 'stock_inicial': form['stock_inicial'].value()}
+        set_item_quantity(self.cart, self.producto.pk, 2)
+
+        form = ProductoForm(data=data, instance=Producto.objects.get(pk=self.producto.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        # Se sumaron las 3 unidades agregadas sobre las 3 que quedaban tras la reserva
+        self.assertEqual(self.stock(), 6)
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).nombre, 'Producto editado')
+
+
+class StockConcurrencyTest(TransactionTestCase):
+    """Prueba de carga: muchos hilos reservando el mismo producto"""
+
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 5
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Requiere una base de datos compartida entre hilos (PostgreSQL o SQLite en archivo)')
+        self.producto = Producto.objects.create(
+            nombre='Oferta relámpago', descripcion='Descripción', precio=10, stock=10
+        )
+
+    def hammer(self, barrier, results):
+        try:
+            barrier.wait()
+            for _ in range(self.ATTEMPTS_PER_THREAD):
+                while True:
+                    try:
+                        results.append(reserve_stock(self.producto.pk, 1))
+                        break
+                    except OperationalError:
+                        # SQLite bloquea la base completa durante una escritura: reintentar
+                        continue
+        finally:
+            connection.close()
+
+    def test_no_oversell(self):
+        """Test de que las reservas simultáneas nunca venden más que el stock"""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        threads = [
+            threading.Thread(target=self.hammer, args=(barrier, results))
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.producto.refresh_from_db()
+        self.assertEqual(len(results), self.THREADS * self.ATTEMPTS_PER_THREAD)
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(self.producto.stock, 0)
+
+
+class CheckoutTest(TestCase):
+    """Tests para el checkout del carrito"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cliente', email='cliente@example.com', password='testpass123'
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.labial = Producto.objects.create(nombre='Labial', descripcion='Descripción', precio='12.50', stock=5)
+        self.rubor = Producto.objects.create(nombre='Rubor', descripcion='Descripción', precio='8.00', stock=5)
+        set_item_quantity(self.cart, self.labial.pk, 2)
+        # Item sin reserva (vencida y liberada): se descuenta en el checkout
+        CartItem.objects.create(cart=self.cart, producto=self.rubor, quantity=3)
+
+    def test_checkout_creates_pedido(self):
+        """Test de creación del pedido, descuento de stock y carrito vacío"""
+        pedido, created = checkout_cart(self.user, 'clave-1')
+
+        self.assertTrue(created)
+        self.assertEqual(pedido.total, Decimal('49.00'))
+        self.assertEqual(pedido.usuario.email, 'cliente@example.com')
+        self.assertEqual(
+            sorted(pedido.detalles.values_list('producto__nombre', 'cantidad', 'precio_unitario')),
+            [('Labial', 2, Decimal('12.50')), ('Rubor', 3, Decimal('8.00'))]
+        )
+        self.labial.refresh_from_db()
+        self.rubor.refresh_from_db()
+        self.assertEqual((self.labial.stock, self.rubor.stock), (3, 2))
+        self.assertFalse(self.cart.items.exists())
+
+    def test_idempotency_key_returns_same_pedido(self):
+        """Test de que un reintento con la misma clave no duplica el pedido"""
+        pedido, _ = checkout_cart(self.user, 'clave-1')
+        self.client.login(username='cliente', password='testpass123')
+        response = self.client.post(reverse('productos:checkout'), {'checkout_key': 'clave-1'})
+
+        self.assertRedirects(response, reverse('productos:pedido_detail', args=[pedido.pk]))
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_idempotency_key_is_per_user(self):
+        """Test de que la misma clave en otra cuenta crea su propio pedido"""
+        checkout_cart(self.user, 'clave-1')
+        otro = User.objects.create_user(username='otro', email='otro@example.com', password='testpass123')
+        CartItem.objects.create(cart=Cart.objects.create(user=otro), producto=self.labial, quantity=1)
+
+        pedido, created = checkout_cart(otro, 'clave-1')
+        self.assertTrue(created)
+        self.assertEqual(pedido.user, otro)
+        self.assertEqual(Pedido.objects.count(), 2)
+
+    def test_insufficient_stock_rolls_back(self):
+        """Test de que sin stock suficiente no se crea nada"""
+        Producto.objects.filter(pk=self.rubor.pk).update(stock=1)
+
+        with self.assertRaises(ValidationError):
+            checkout_cart(self.user, 'clave-1')
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(self.cart.items.count(), 2)
+        self.labial.refresh_from_db()
+        self.assertEqual(self.labial.stock, 3)
+
+
+class CartBatchUpdateTest(TestCase):
+    """Tests para el endpoint de modificación del carrito por lotes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.cart = Cart.objects.create(user=self.user)
+        self.labial = Producto.objects.create(nombre='Labial', descripcion='Descripción', precio='12.50', stock=5)
+        self.rubor = Producto.objects.create(nombre='Rubor', descripcion='Descripción', precio='8.00', stock=2)
+        self.sombra = Producto.objects.create(nombre='Sombra', descripcion='Descripción', precio='5.00', stock=4)
+        set_item_quantity(self.cart, self.sombra.pk, 1)
+        self.client.login(username='cliente', password='testpass123')
+
+    def post(self, operations):
+        return self.client.post(
+            reverse('productos:cart_batch_update'),
+            data=json.dumps({'operations': operations}),
+            content_type='application/json'
+        )
+
+    def test_applies_operations_and_reports_errors(self):
+        """Test de operaciones mezcladas con un error de stock"""
+        response = self.post([
+            {'op': 'add', 'producto_id': self.labial.pk, 'quantity': 3},
+            {'op': 'add', 'producto_id': self.rubor.pk, 'quantity': 5},
+            {'op': 'remove', 'producto_id': self.sombra.pk},
+        ])
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(data['success'])
+        self.assertEqual(data['errors'][0]['producto_id'], self.rubor.pk)
+        self.assertEqual(
+            [(item['producto_id'], item['quantity']) for item in data['items']],
+            [(self.labial.pk, 3)]
+        )
+        self.assertEqual((data['total_items'], data['total_price']), (3, '37.50'))
+
+        stocks = dict(Producto.objects.values_list('nombre', 'stock'))
+        self.assertEqual(stocks, {'Labial': 2, 'Rubor': 2, 'Sombra': 4})
+
+    def test_invalid_payload(self):
+        """Test de petición mal formada"""
+        response = self.client.post(
+            reverse('productos:cart_batch_update'), data='no-json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SessionCartTest(TestCase):
+    """Tests para el carrito de invitado en la sesión"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.labial = Producto.objects.create(nombre='Labial', descripcion='Descripción', precio='12.50', stock=5)
+        self.rubor = Producto.objects.create(nombre='Rubor', descripcion='Descripción', precio='8.00', stock=3)
+
+    def test_guest_cart_does_not_touch_cart_tables(self):
+        """Test de que los invitados agregan al carrito sin crear filas"""
+        self.client.post(reverse('productos:add_to_cart', args=[self.labial.pk]), {'quantity': 2})
+        response = self.client.get(reverse('productos:view_cart'))
+
+        self.assertContains(response, 'Labial')
+        self.assertEqual(response.context['cart'].total_items, 2)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_merge_on_login(self):
+        """Test de fusión del carrito de invitado al iniciar sesión"""
+        self.client.post(reverse('productos:add_to_cart', args=[self.labial.pk]), {'quantity': 2})
+        self.client.post(reverse('productos:add_to_cart', args=[self.rubor.pk]), {'quantity': 3})
+        # Mientras tanto el usuario reservó rubor desde otro dispositivo
+        cart = Cart.objects.create(user=self.user)
+        set_item_quantity(cart, self.rubor.pk, 2)
+
+        self.client.post(reverse('accounts:login'), {'username': 'cliente', 'password': 'testpass123'})
+
+        # El rubor se ajusta a lo disponible (2 reservados + 1 en stock)
+        self.assertEqual(
+            dict(cart.items.values_list('producto__nombre', 'quantity')),
+            {'Labial': 2, 'Rubor': 3}
+        )
+        self.labial.refresh_from_db()
+        self.assertEqual(self.labial.stock, 3)
+        self.assertNotIn('carrito', self.client.session)
+
+
+class LimpiarCarritosAbandonadosTest(TestCase):
+    """Tests para el comando limpiar_carritos_abandonados"""
+
+    def test_deletes_only_idle_carts_and_releases_stock(self):
+        """Test de que solo se eliminan los carritos inactivos y se devuelve su reserva"""
+        producto = Producto.objects.create(nombre='Labial', descripcion='Descripción', precio=10, stock=5)
+        viejo = Cart.objects.create(user=User.objects.create_user(username='viejo', password='testpass123'))
+        activo = Cart.objects.create(user=User.objects.create_user(username='activo', password='testpass123'))
+        set_item_quantity(viejo, producto.pk, 2)
+        set_item_quantity(activo, producto.pk, 1)
+
+        hace_dos_meses = timezone.now() - timedelta(days=60)
+        Cart.objects.filter(pk=viejo.pk).update(updated_at=hace_dos_meses)
+        CartItem.objects.filter(cart=viejo).update(added_at=hace_dos_meses, reserved_until=hace_dos_meses)
+
+        call_command('limpiar_carritos_abandonados', pausa=0, stdout=StringIO())
+
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [activo.pk])
+        self.assertEqual(CartItem.objects.count(), 1)
+        producto.refresh_from_db()
+        self.assertEqual(producto.stock, 4)
+
+    def test_carts_used_after_selection_are_not_counted(self):
+        """Test de que un carrito que vuelve a usarse tras elegir el lote no se elimina ni se cuenta"""
+        cart = Cart.objects.create(user=User.objects.create_user(username='cliente', password='testpass123'))
+        cutoff = timezone.now() - timedelta(days=30)
+
+        self.assertEqual(LimpiarCarritosCommand().delete_batch([cart.pk], cutoff), (0, 0))
+        self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+
+
+class ResumenVentasTest(TestCase):
+    """Tests para los resúmenes de ventas incrementales"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(nombre='Ana', email='ana@example.com')
+        self.categoria = Categoria.objects.create(nombre='Labios', descripcion='Productos para labios')
+        self.labial = Producto.objects.create(nombre='Labial', descripcion='Descripción', precio='10.00', stock=50)
+        self.brillo = Producto.objects.create(nombre='Brillo', descripcion='Descripción', precio='5.00', stock=50)
+        for producto in (self.labial, self.brillo):
+            ProductoCategoria.objects.create(producto=producto, categoria=self.categoria)
+
+    def crear_pedido(self, dias_atras, *lineas):
+        pedido = Pedido.objects.create(usuario=self.usuario, total=0)
+        for producto, cantidad in lineas:
+            DetallePedido.objects.create(
+                pedido=pedido, producto=producto, cantidad=cantidad, precio_unitario=producto.precio
+            )
+        Pedido.objects.filter(pk=pedido.pk).update(fecha_pedido=timezone.now() - timedelta(days=dias_atras))
+        return pedido
+
+    def test_incremental_update_and_rebuild(self):
+        """Test de actualización incremental y reconstrucción"""
+        self.crear_pedido(1, (self.labial, 2), (self.brillo, 1))
+        call_command('actualizar_resumen_ventas', stdout=StringIO())
+        self.crear_pedido(1, (self.labial, 1))
+        # Pedido demasiado reciente: queda para la siguiente ejecución
+        Pedido.objects.create(usuario=self.usuario, total=0)
+        call_command('actualizar_resumen_ventas', stdout=StringIO())
+
+        def snapshot():
+            return (
+                sorted(ResumenVentasProducto.objects.filter(periodo='dia').values_list(
+                    'producto__nombre', 'unidades', 'ingresos', 'pedidos'
+                )),
+                list(ResumenVentasCategoria.objects.filter(periodo='semana').values_list(
+                    'unidades', 'ingresos', 'pedidos'
+                )),
+            )
+
+        expected = (
+            [('Brillo', 1, Decimal('5.00'), 1), ('Labial', 3, Decimal('30.00'), 2)],
+            [(4, Decimal('35.00'), 2)],
+        )
+        self.assertEqual(snapshot(), expected)
+
+        call_command('reconstruir_resumen_ventas', stdout=StringIO())
+        self.assertEqual(snapshot(), expected)
+
+
+class ReportJobTest(TestCase):
+    """Tests para los reportes generados en segundo plano"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        for i in range(3):
+            Producto.objects.create(nombre=f'Producto {i}', descripcion='Descripción', precio='9.90', stock=i)
+        self.client.login(username='staff', password='testpass123')
+
+    def test_enqueue_process_and_download(self):
+        """Test de solicitud, generación por el worker y descarga"""
+        with override_settings(PRIVATE_MEDIA_ROOT=self.media_root):
+            for formato in ('xlsx', 'pdf'):
+                response = self.client.post(reverse('productos:report_list'), {'tipo': 'inventario', 'formato': formato})
+                self.assertRedirects(response, reverse('productos:report_list'))
+            self.assertEqual(ReportJob.objects.filter(estado='pendiente').count(), 2)
+
+            call_command('procesar_reportes', stdout=StringIO())
+
+            for job in ReportJob.objects.all():
+                self.assertEqual((job.estado, job.filas), ('completado', 3), job.error)
+                # Fuera de MEDIA_ROOT, sin URL pública y con un nombre que no se deduce del pk
+                self.assertTrue(job.archivo.path.startswith(self.media_root))
+                self.assertNotIn(f'_{job.pk}.', job.archivo.name)
+                with self.assertRaises(ValueError):
+                    job.archivo.url
+                status = self.client.get(reverse('productos:report_status', args=[job.pk])).json()
+                response = self.client.get(status['download_url'])
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(b''.join(response.streaming_content))
+
+    def test_requires_staff(self):
+        """Test de que los clientes no pueden solicitar reportes"""
+        User.objects.create_user(username='cliente', password='testpass123')
+        self.client.login(username='cliente', password='testpass123')
+        response = self.client.get(reverse('productos:report_list'))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(LOW_STOCK_THRESHOLD=5)
+class RevisarStockBajoTest(TestCase):
+    """Tests para el comando revisar_stock_bajo"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='testpass123', is_staff=True
+        )
+        User.objects.create_user(username='cliente', email='cliente@example.com', password='testpass123')
+        self.bajo = Producto.objects.create(nombre='Bajo', descripcion='Descripción', precio='5.00', stock=3)
+        self.propio = Producto.objects.create(
+            nombre='Con mínimo', descripcion='Descripción', precio='5.00', stock=15, stock_minimo=20
+        )
+        self.normal = Producto.objects.create(nombre='Normal', descripcion='Descripción', precio='5.00', stock=50)
+
+    def run_command(self):
+        call_command('revisar_stock_bajo', stdout=StringIO())
+
+    def test_alerts_only_changes(self):
+        """Test de alertas por umbral global y propio, sin repetir entre ejecuciones"""
+        self.run_command()
+        self.assertEqual(
+            set(AlertaStockBajo.objects.values_list('producto_id', flat=True)), {self.bajo.pk, self.propio.pk}
+        )
+        self.assertEqual(Notification.objects.filter(user=self.staff, notification_type='low_stock').count(), 2)
+        self.assertFalse(Notification.objects.exclude(user=self.staff).exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['staff@example.com'])
+
+        # Sin cambios no hay notificaciones ni email nuevos
+        self.run_command()
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Agotarse vuelve a alertar; reponer elimina la alerta
+        Producto.objects.filter(pk=self.bajo.pk).update(stock=0)
+        Producto.objects.filter(pk=self.propio.pk).update(stock=40)
+        self.run_command()
+        self.assertEqual(list(AlertaStockBajo.objects.values_list('producto_id', 'stock')), [(self.bajo.pk, 0)])
+        self.assertTrue(Notification.objects.filter(title='Producto agotado: Bajo').exists())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_email_does_not_record_alerts(self):
+        """Test de que si el email falla las alertas no quedan registradas y se repiten después"""
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1', EMAIL_PORT=1
+        ):
+            with self.assertRaises(CommandError):
+                self.run_command()
+        self.assertFalse(AlertaStockBajo.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+        self.run_command()
+        self.assertEqual(AlertaStockBajo.objects.count(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class NotificationJobTest(TestCase):
+    """Tests para el envío de notificaciones a favoritos"""
+
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            nombre='Favorito', descripcion='Descripción', precio='20.00', stock=0
+        )
+        self.users = [
+            User.objects.create_user(username=f'fan{i}', password='testpass123') for i in range(5)
+        ]
+        for user in self.users:
+            Favorite.objects.create(user=user, producto=self.producto)
+
+    def test_save_enqueues_and_worker_fans_out(self):
+        """Test de que guardar solo encola y el worker notifica por lotes"""
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.precio = Decimal('15.00')
+        producto.stock = 3
+        # UPDATE, caché del detalle y 2 x (¿pendiente? + INSERT del job): no depende de los favoritos
+        with self.assertNumQueries(6):
+            producto.save(update_fields=['precio', 'stock'])
+        producto.save()  # Guardar de nuevo el mismo cambio no vuelve a encolar
+        self.assertEqual(
+            set(NotificationJob.objects.values_list('tipo', flat=True)), {'price_drop', 'favorite_available'}
+        )
+        self.assertFalse(Notification.objects.exists())
+
+        call_command('procesar_notificaciones', '--lote', '2', stdout=StringIO())
+
+        for job in NotificationJob.objects.all():
+            self.assertEqual((job.estado, job.enviadas), ('completado', 5))
+        self.assertEqual(Notification.objects.filter(notification_type='price_drop').count(), 5)
+        self.assertEqual(Notification.objects.filter(notification_type='favorite_available').count(), 5)
+
+    def test_released_reservation_announces_restock(self):
+        """Test de que devolver al stock la reserva de un producto agotado avisa a favoritos"""
+        Producto.objects.filter(pk=self.producto.pk).update(stock=1)
+        cart = Cart.objects.create(user=self.users[0])
+        set_item_quantity(cart, self.producto.pk, 1)
+        self.assertFalse(NotificationJob.objects.exists())
+
+        remove_cart_items(cart.items.all())
+        self.assertEqual(list(NotificationJob.objects.values_list('tipo', flat=True)), ['favorite_available'])
+
+    def test_second_price_drop_updates_the_pending_job(self):
+        """Test de que una segunda bajada antes del envío anuncia el precio más reciente"""
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.precio = Decimal('15.00')
+        producto.save()
+        producto.precio = Decimal('12.00')
+        producto.save()
+
+        job = NotificationJob.objects.get(tipo='price_drop')
+        self.assertEqual((job.precio_anterior, job.precio_nuevo), (Decimal('20.00'), Decimal('12.00')))
+
+    def test_price_increase_does_not_notify(self):
+        """Test de que subir el precio no encola avisos"""
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.precio = Decimal('25.00')
+        producto.save()
+        self.assertFalse(NotificationJob.objects.exists())
+
+
+class PriceAlertTest(TestCase):
+    """Tests para las alertas de precio objetivo"""
+
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            nombre='Producto caro', descripcion='Descripción', precio='100.00', stock=10
+        )
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.client.login(username='cliente', password='testpass123')
+
+    def create_alert(self, precio):
+        return self.client.post(
+            reverse('productos:create_price_alert', args=[self.producto.pk]), {'precio_objetivo': precio}
+        )
+
+    def test_create_and_update_alert(self):
+        """Test de que cada usuario tiene una sola alerta activa por producto"""
+        self.create_alert('80.00')
+        self.create_alert('70.00')
+        self.assertEqual(
+            list(PriceAlert.objects.values_list('precio_objetivo', 'is_active')), [(Decimal('70.00'), True)]
+        )
+        self.create_alert('150.00')  # Mayor al precio actual: se rechaza
+        self.assertEqual(PriceAlert.objects.count(), 1)
+
+    def test_price_drop_triggers_matching_alerts_once(self):
+        """Test de que solo se avisan las alertas cumplidas y una sola vez"""
+        otro = User.objects.create_user(username='otro', password='testpass123')
+        PriceAlert.objects.create(user=self.user, producto=self.producto, precio_objetivo='90.00')
+        PriceAlert.objects.create(user=otro, producto=self.producto, precio_objetivo='50.00')
+
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.precio = Decimal('85.00')
+        producto.save()
+        call_command('procesar_notificaciones', stdout=StringIO())
+
+        self.assertEqual(
+            list(PriceAlert.objects.filter(is_active=True).values_list('user__username', flat=True)), ['otro']
+        )
+        self.assertEqual(
+            list(Notification.objects.values_list('user__username', 'notification_type')),
+            [('cliente', 'price_drop')]
+        )
+
+        # Reprocesar (bajada menor que no alcanza los $50) no repite el aviso
+        producto.precio = Decimal('80.00')
+        producto.save()
+        call_command('procesar_notificaciones', stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class CategoriaFollowTest(TestCase):
+    """Tests para los avisos de productos nuevos a los seguidores de una categoría"""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Juguetes', descripcion='Juguetes para gatos')
+        self.otra = Categoria.objects.create(nombre='Camas', descripcion='Camas para gatos')
+        self.followers = [
+            User.objects.create_user(username=f'seguidor{i}', password='testpass123') for i in range(3)
+        ]
+        for user in self.followers:
+            CategoriaFollow.objects.create(user=user, categoria=self.categoria)
+
+    def add_products(self, count, categoria):
+        for i in range(count):
+            producto = Producto.objects.create(
+                nombre=f'Producto {categoria.pk}-{i}', descripcion='Descripción', precio='5.00', stock=5
+            )
+            ProductoCategoria.objects.create(producto=producto, categoria=categoria)
+        return producto
+
+    def test_new_products_are_coalesced_per_follower(self):
+        """Test de una sola notificación por seguidor para varios productos nuevos"""
+        self.add_products(5, self.categoria)
+        self.add_products(2, self.otra)  # Sin seguidores: no encola nada
+        self.assertEqual(NotificationJob.objects.filter(tipo='new_product').count(), 1)
+
+        call_command('procesar_notificaciones', '--lote', '2', stdout=StringIO())
+
+        notifications = Notification.objects.filter(notification_type='new_product')
+        self.assertEqual(notifications.count(), 3)
+        self.assertEqual(notifications.first().title, '5 productos nuevos en Juguetes')
+
+        # Un producto posterior se anuncia solo, sin repetir los anteriores
+        producto = self.add_products(1, self.categoria)
+        call_command('procesar_notificaciones', stdout=StringIO())
+        self.assertEqual(notifications.count(), 6)
+        self.assertEqual(notifications.filter(producto=producto).count(), 3)
+
+    def test_editing_product_does_not_reannounce(self):
+        """Test de que editar un producto sin cambiar sus categorías no encola avisos"""
+        producto = self.add_products(1, self.categoria)
+        NotificationJob.objects.all().delete()
+        form = ProductoForm(
+            data={'nombre': producto.nombre, 'descripcion': producto.descripcion, 'precio': '5.00',
+                  'stock': 5, 'categorias': [self.categoria.pk]},
+            instance=producto
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertFalse(NotificationJob.objects.exists())
+        self.assertEqual(ProductoCategoria.objects.filter(producto=producto).count(), 1)
+
+    def test_recategorizing_an_existing_product_does_not_announce_it(self):
+        """Test de que mover un producto antiguo a otra categoría no lo anuncia como nuevo"""
+        producto = self.add_products(1, self.otra)
+        Producto.objects.filter(pk=producto.pk).update(fecha_creacion=timezone.now() - timedelta(days=30))
+
+        ProductoCategoria.objects.create(producto=producto, categoria=self.categoria)
+        self.assertFalse(NotificationJob.objects.exists())
+
+
+@override_settings(LIVE_NOTIFICATIONS_POLL_SECONDS=1)
+class NotificationStreamTest(TestCase):
+    """Tests para el stream SSE de notificaciones"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+
+    def test_wsgi_does_not_load_the_stream(self):
+        """Test de que bajo WSGI no se incluye el script, el stream responde 204 y el JSON funciona"""
+        self.client.login(username='cliente', password='testpass123')
+        self.assertNotContains(self.client.get(reverse('productos:my_notifications')), 'notifications_live.js')
+        self.assertEqual(self.client.get(reverse('productos:notification_stream')).status_code, 204)
+        Notification.objects.create(user=self.user, notification_type='system', title='Hola', message='Mensaje')
+        response = self.client.get(reverse('productos:notification_counts'))
+        self.assertEqual(response.json(), {'unread': 1, 'cart_items': 0})
+
+    async def test_asgi_stream_pushes_new_notifications(self):
+        """Test de que bajo ASGI el stream envía el contador y las notificaciones nuevas"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('productos:notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = aiter(response.streaming_content)
+        self.assertTrue((await anext(events)).startswith(b'retry:'))
+        self.assertIn(b'"unread": 0', await anext(events))
+
+        await Notification.objects.acreate(
+            user=self.user, notification_type='system', title='Nueva', message='Mensaje'
+        )
+        broker.publish(self.user.pk)  # En TestCase los on_commit no se ejecutan
+        notification = await anext(events)
+        self.assertTrue(notification.startswith(b'event: notification'))
+        self.assertIn(b'"title": "Nueva"', notification)
+        self.assertIn(b'"unread": 1', await anext(events))
+        await events.aclose()
+
+    async def test_asgi_pages_pass_the_poll_interval(self):
+        """Test de que bajo ASGI las páginas incluyen el script con el intervalo configurado"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('productos:my_notifications'))
+        self.assertContains(response, 'notifications_live.js')
+        self.assertContains(response, 'data-poll-seconds="1"')
+
+
+class DepurarNotificacionesTest(TestCase):
+    """Tests para el comando depurar_notificaciones"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='testpass123')
+        self.other = User.objects.create_user(username='otro', password='testpass123')
+
+    def notify(self, user, count, is_read=False):
+        return bulk_notify(
+            Notification(user=user, notification_type='system', title='Aviso', message='Mensaje', is_read=is_read)
+            for _ in range(count)
+        )
+
+    def test_deletes_old_read_and_trims_history(self):
+        """Test de que se eliminan las leídas antiguas y el exceso por usuario, ajustando el contador"""
+        self.notify(self.user, 2, is_read=True)
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=120))
+        self.notify(self.user, 3)
+        self.notify(self.user, 1, is_read=True)
+        self.notify(self.other, 2)
+
+        call_command('depurar_notificaciones', dias=90, maximo=2, lote=1, pausa=0, stdout=StringIO())
+
+        # Las 2 leídas antiguas se eliminan y de las 4 restantes quedan las 2 más nuevas
+        remaining = Notification.objects.filter(user=self.user).order_by('pk')
+        self.assertEqual(list(remaining.values_list('is_read', flat=True)), [False, True])
+        self.assertEqual(get_unread_count(self.user), 1)
+        self.assertEqual(Notification.objects.filter(user=self.other).count(), 2)
+        self.assertEqual(get_unread_count(self.other), 2)
+
+
+class ResumenNotificacionesTest(TestCase):
+    """Tests para el comando enviar_resumen_notificaciones"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'cliente{i}', email=f'cliente{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+
+    def test_one_email_per_user_in_batches(self):
+        """Test de que cada usuario recibe un solo resumen por lotes y sin las leídas"""
+        bulk_notify(build_notifications([u.pk for u in self.users], 'system', 'Oferta', 'Mensaje'))
+        bulk_notify(build_notifications([self.users[0].pk], 'system', 'Otra oferta', 'Mensaje'))
+        Notification.objects.filter(user=self.users[1]).update(is_read=True)
+
+        out = StringIO()
+        call_command('enviar_resumen_notificaciones', lote=1, stdout=out)
+
+        self.assertIn('2 resumen(es) enviado(s) en 2 lote(s)', out.getvalue())
+        self.assertEqual([m.to for m in mail.outbox], [[self.users[0].email], [self.users[2].email]])
+        self.assertIn('tienes 2 notificación(es)', mail.outbox[0].subject)
+        self.assertIn('Otra oferta', mail.outbox[0].body)
+        self.assertIn('Otra oferta', mail.outbox[0].alternatives[0][0])
+
+        # El punto de control evita repetir el resumen
+        call_command('enviar_resumen_notificaciones', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_interrupted_run_resumes_after_the_last_batch_sent(self):
+        """Test de que una ejecución interrumpida no reenvía los lotes ya enviados"""
+        bulk_notify(build_notifications([u.pk for u in self.users], 'system', 'Oferta "2x1" & más', 'Mensaje'))
+        # La ejecución anterior fijó el rango y envió el lote del primer usuario
+        JobCheckpoint.advance('notification_digest:hasta', Notification.objects.latest('pk').pk)
+        JobCheckpoint.advance('notification_digest:usuario', self.users[0].pk)
+
+        call_command('enviar_resumen_notificaciones', lote=1, stdout=StringIO())
+
+        self.assertEqual([m.to for m in mail.outbox], [[self.users[1].email], [self.users[2].email]])
+        # El texto plano no se escapa como HTML
+        self.assertIn('Oferta "2x1" & más', mail.outbox[0].body)
+        self.assertEqual(JobCheckpoint.get_last_id('notification_digest:hasta'), 0)
@@ -10,12 +10,14 @@ Define las rutas para:
 - Reseñas
 - Favoritos
 - Carrito de compras
+- Checkout y pedidos
 - Notificaciones
 - Búsqueda avanzada
+- Reportes
 """
 
 from django.urls import path
-from . import views, views_features, views_crud
+from . import views, views_features, views_crud, views_reports
 
 app_name = 'productos'
 
@@ -44,11 +46,18 @@ urlpatterns = [
     path('productos/<int:producto_id>/review/crear/', views_features.create_review, name='create_review'),
     path('review/<int:review_id>/editar/', views_features.edit_review, name='edit_review'),
     path('review/<int:review_id>/eliminar/', views_features.delete_review, name='delete_review'),
+    path('review/<int:review_id>/util/', views_features.vote_review_helpful, name='vote_review_helpful'),
     path('mis-reviews/', views_features.my_reviews, name='my_reviews'),
     
     # Favoritos
     path('productos/<int:producto_id>/favorito/', views_features.toggle_favorite, name='toggle_favorite'),
     path('mis-favoritos/', views_features.my_favorites, name='my_favorites'),
+    path('categorias/<int:categoria_id>/seguir/', views_features.toggle_category_follow, name='toggle_category_follow'),
+    
+    # Alertas de precio
+    path('productos/<int:producto_id>/alerta-precio/', views_features.create_price_alert, name='create_price_alert'),
+    path('alertas-precio/<int:alert_id>/eliminar/', views_features.delete_price_alert, name='delete_price_alert'),
+    path('mis-alertas-precio/', views_features.my_price_alerts, name='my_price_alerts'),
     
     # Carrito
     path('carrito/', views_features.view_cart, name='view_cart'),
@@ -56,12 +65,24 @@ urlpatterns = [
     path('carrito/actualizar/<int:item_id>/', views_features.update_cart_item, name='update_cart_item'),
     path('carrito/remover/<int:item_id>/', views_features.remove_from_cart, name='remove_from_cart'),
     path('carrito/vaciar/', views_features.clear_cart, name='clear_cart'),
+    path('carrito/lote/', views_features.cart_batch_update, name='cart_batch_update'),
+    path('carrito/checkout/', views_features.checkout, name='checkout'),
+    
+    # Pedidos
+    path('pedidos/<int:pk>/', views_features.pedido_detail, name='pedido_detail'),
     
     # Notificaciones
     path('notificaciones/', views_features.my_notifications, name='my_notifications'),
     path('notificaciones/<int:notification_id>/leer/', views_features.mark_notification_read, name='mark_notification_read'),
+    path('notificaciones/stream/', views_features.notification_stream, name='notification_stream'),
+    path('notificaciones/contadores/', views_features.notification_counts, name='notification_counts'),
     
     # Actividad
     path('mi-actividad/', views_features.my_activity, name='my_activity'),
+    
+    # Reportes (Admin)
+    path('reportes/', views_reports.report_list, name='report_list'),
+    path('reportes/<int:pk>/estado/', views_reports.report_status, name='report_status'),
+    path('reportes/<int:pk>/descargar/', views_reports.report_download, name='report_download'),
 ]
 
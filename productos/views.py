@@ -1,6 +1,6 @@
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Avg, Count
-from .models import Producto, Categoria, ProductoCategoria, Reseña, Review, Favorite
+from django.db.models import Count
+from .models import Producto, Categoria, ProductoCategoria
 
 
 def inicio(request):
@@ -45,7 +45,8 @@ def lista_productos(request):
 def detalle_producto(request, pk):
     """
     Vista que muestra los detalles de un producto específico.
-    Incluye categorías, reseñas y calificación promedio.
+    Registra la visualización y delega el renderizado en views_crud.producto_detail,
+    que sirve las categorías, reseñas y calificación desde caché.
     """
     producto = get_object_or_404(Producto, pk=pk)
     
@@ -59,45 +60,8 @@ def detalle_producto(request, pk):
             description=f'Visualizó {producto.nombre}'
         )
     
-    # Obtener categorías del producto
-    categorias_producto = ProductoCategoria.objects.filter(
-        producto=producto
-    ).select_related('categoria')
-    
-    # Obtener reseñas antiguas del producto
-    reseñas = Reseña.objects.filter(
-        producto=producto
-    ).select_related('usuario').order_by('-fecha_reseña')
-    
-    # Obtener nuevas reviews
-    reviews = Review.objects.filter(
-        producto=producto
-    ).select_related('user').order_by('-created_at')
-    
-    # Calcular calificación promedio de reviews
-    review_stats = reviews.aggregate(
-        promedio=Avg('rating'),
-        total=Count('id')
-    )
-    
-    # Verificar si el usuario ha hecho review
-    user_review = None
-    is_favorited = False
-    if request.user.is_authenticated:
-        user_review = reviews.filter(user=request.user).first()
-        is_favorited = Favorite.objects.filter(user=request.user, producto=producto).exists()
-    
-    context = {
-        'producto': producto,
-        'categorias': categorias_producto,
-        'reseñas': reseñas,
-        'reviews': reviews,
-        'calificacion_promedio': review_stats['promedio'],
-        'total_reviews': review_stats['total'],
-        'user_review': user_review,
-        'is_favorited': is_favorited,
-    }
-    return render(request, 'productos/producto_detail.html', context)
+    from .views_crud import producto_detail
+    return producto_detail(request, pk)
 
 
 def lista_categorias(request):
@@ -4,9 +4,10 @@ Vistas CRUD para Productos y Categorías
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Q, Count
-from .models import Producto, Categoria, ProductoCategoria
+from django.db.models import Q, Count, Exists, OuterRef, Subquery
+from .models import Producto, Categoria, ProductoCategoria, Review, Favorite, PriceAlert, CategoriaFollow
 from .forms import ProductoForm, CategoriaForm
+from .detail_cache import get_producto_fragments
 
 
 def is_admin(user):
@@ -61,23 +62,34 @@ def producto_create(request):
 
 
 def producto_detail(request, pk):
-    """Detalle de un producto"""
-    producto = get_object_or_404(Producto, pk=pk)
-    categorias = producto.categorias.all()
-    
-    # Obtener productos relacionados (de las mismas categorías)
-    if categorias:
-        categoria_ids = categorias.values_list('categoria_id', flat=True)
-        productos_relacionados = Producto.objects.filter(
-            categorias__categoria_id__in=categoria_ids
-        ).exclude(pk=producto.pk).distinct()[:4]
-    else:
-        productos_relacionados = []
+    """
+    Detalle de un producto.
+    Los fragmentos de catálogo se sirven desde caché (detail_cache.py); solo
+    el producto y los datos del usuario se consultan en cada petición.
+    """
+    productos = Producto.objects.all()
+    if request.user.is_authenticated:
+        productos = productos.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=request.user, producto=OuterRef('pk'))
+            ),
+            user_review_id=Subquery(
+                Review.objects.filter(user=request.user, producto=OuterRef('pk')).values('pk')[:1]
+            ),
+            price_alert_target=Subquery(
+                PriceAlert.objects.filter(
+                    user=request.user, producto=OuterRef('pk'), is_active=True
+                ).values('precio_objetivo')[:1]
+            ),
+        )
+    producto = get_object_or_404(productos, pk=pk)
     
     context = {
         'producto': producto,
-        'categorias': categorias,
-        'productos_relacionados': productos_relacionados,
+        'fragmentos': get_producto_fragments(producto),
+        'is_favorited': getattr(producto, 'is_favorited', False),
+        'user_review_id': getattr(producto, 'user_review_id', None),
+        'price_alert_target': getattr(producto, 'price_alert_target', None),
     }
     return render(request, 'productos/producto_detail.html', context)
 
@@ -175,6 +187,10 @@ def categoria_detail(request, pk):
     context = {
         'categoria': categoria,
         'productos': productos,
+        'is_following': (
+            request.user.is_authenticated
+            and CategoriaFollow.objects.filter(user=request.user, categoria=categoria).exists()
+        ),
     }
     return render(request, 'productos/categoria_detail.html', context)
 
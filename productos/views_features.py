@@ -1,14 +1,27 @@
+import json
+import uuid
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.db.models import Q, Avg, Count
 from django.views.decorators.http import require_POST
 from .models import (
     Producto, Review, Favorite, ActivityLog, 
-    Notification, Cart, CartItem, Categoria
+    Notification, Cart, CartItem, Categoria, Pedido, PriceAlert, CategoriaFollow
 )
-from .forms import ReviewForm, CartItemForm, ProductSearchForm
+from .forms import ReviewForm, CartItemForm, ProductSearchForm, PriceAlertForm
+from .review_votes import vote_helpful, get_helpful_total
+from .counters import get_header_counts, get_unread_count, mark_notifications_read
+from .live_notifications import notification_events
+from .stock import set_item_quantity, remove_cart_items
+from .checkout import checkout_cart
+from .cart_operations import apply_cart_operations, MAX_OPERATIONS
+from .session_cart import SessionCart
+from .price_alerts import set_price_alert
 
 
 # ============================================
@@ -87,6 +100,37 @@ def delete_review(request, review_id):
     return redirect('productos:producto_detail', pk=producto_id)
 
 
+@login_required
+@require_POST
+def vote_review_helpful(request, review_id):
+    """Vista para votar una reseña como útil (un voto por usuario)"""
+    review = get_object_or_404(Review, pk=review_id)
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    
+    if review.user_id == request.user.pk:
+        message = 'No puedes votar tu propia reseña.'
+        if is_ajax:
+            return JsonResponse({'success': False, 'message': message}, status=400)
+        messages.warning(request, message)
+        return redirect('productos:producto_detail', pk=review.producto_id)
+    
+    voted = vote_helpful(review, request.user)
+    
+    # Si es una petición AJAX, devolver JSON
+    if is_ajax:
+        return JsonResponse({
+            'success': voted,
+            'already_voted': not voted,
+            'helpful_count': get_helpful_total(review),
+        })
+    
+    if voted:
+        messages.success(request, '¡Gracias por tu voto!')
+    else:
+        messages.info(request, 'Ya habías marcado esta reseña como útil.')
+    return redirect('productos:producto_detail', pk=review.producto_id)
+
+
 @login_required
 def my_reviews(request):
     """Vista para mostrar las reseñas del usuario"""
@@ -153,51 +197,122 @@ def my_favorites(request):
     return render(request, 'productos/my_favorites.html', context)
 
 
+@login_required
+@require_POST
+def toggle_category_follow(request, categoria_id):
+    """Vista para seguir/dejar de seguir una categoría (avisos de productos nuevos)"""
+    categoria = get_object_or_404(Categoria, pk=categoria_id)
+
+    deleted, _ = CategoriaFollow.objects.filter(user=request.user, categoria=categoria).delete()
+    if deleted:
+        messages.info(request, f'Dejaste de seguir {categoria.nombre}.')
+    else:
+        CategoriaFollow.objects.get_or_create(user=request.user, categoria=categoria)
+        messages.success(request, f'Te avisaremos cuando lleguen productos nuevos a {categoria.nombre}.')
+
+    return redirect('productos:categoria_detail', pk=categoria_id)
+
+
 # ============================================
-# VISTAS DE CARRITO
+# VISTAS DE ALERTAS DE PRECIO
 # ============================================
 
 @login_required
+@require_POST
+def create_price_alert(request, producto_id):
+    """Vista para crear o actualizar la alerta de precio del usuario"""
+    producto = get_object_or_404(Producto, pk=producto_id)
+    form = PriceAlertForm(request.POST)
+
+    if form.is_valid():
+        try:
+            alert = set_price_alert(request.user, producto, form.cleaned_data['precio_objetivo'])
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+        else:
+            messages.success(
+                request, f'Te avisaremos cuando {producto.nombre} baje de ${alert.precio_objetivo}.'
+            )
+    else:
+        messages.error(request, 'Ingresa un precio válido.')
+
+    return redirect('productos:producto_detail', pk=producto_id)
+
+
+@login_required
+@require_POST
+def delete_price_alert(request, alert_id):
+    """Vista para eliminar una alerta de precio"""
+    alert = get_object_or_404(PriceAlert, pk=alert_id, user=request.user)
+    alert.delete()
+    messages.info(request, 'Alerta de precio eliminada.')
+    return redirect('productos:my_price_alerts')
+
+
+@login_required
+def my_price_alerts(request):
+    """Vista para mostrar las alertas de precio del usuario"""
+    alerts = PriceAlert.objects.filter(user=request.user).select_related('producto')
+
+    context = {
+        'active_alerts': alerts.filter(is_active=True),
+        'triggered_alerts': alerts.filter(is_active=False).order_by('-triggered_at')[:20],
+    }
+    return render(request, 'productos/my_price_alerts.html', context)
+
+
+# ============================================
+# VISTAS DE CARRITO
+# ============================================
+
 def view_cart(request):
-    """Vista para mostrar el carrito de compras"""
+    """Vista para mostrar el carrito de compras (de la sesión para invitados)"""
+    if not request.user.is_authenticated:
+        cart = SessionCart(request.session)
+        return render(request, 'productos/cart.html', {'cart': cart, 'cart_items': cart.items})
+    
     cart, created = Cart.objects.get_or_create(user=request.user)
     cart_items = cart.items.select_related('producto').all()
     
     context = {
         'cart': cart,
         'cart_items': cart_items,
+        # Clave de idempotencia del checkout: un doble envío no duplica el pedido
+        'checkout_key': uuid.uuid4().hex,
     }
     return render(request, 'productos/cart.html', context)
 
 
-@login_required
 @require_POST
 def add_to_cart(request, producto_id):
     """Vista para agregar producto al carrito"""
     producto = get_object_or_404(Producto, pk=producto_id)
     quantity = int(request.POST.get('quantity', 1))
     
-    # Validar stock
-    if quantity > producto.stock:
-        messages.error(request, f'Solo hay {producto.stock} unidades disponibles.')
+    if quantity <= 0:
+        messages.error(request, 'La cantidad debe ser al menos 1.')
         return redirect('productos:producto_detail', pk=producto_id)
     
+    # Invitados: el carrito vive en la sesión, sin tocar las tablas del carrito
+    if not request.user.is_authenticated:
+        session_cart = SessionCart(request.session)
+        if not session_cart.set(producto, quantity, add=True):
+            messages.error(request, f'Solo hay {producto.stock} unidades disponibles.')
+            return redirect('productos:producto_detail', pk=producto_id)
+        messages.success(request, f'{producto.nombre} agregado al carrito.')
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': True, 'cart_total': session_cart.total_items})
+        return redirect('productos:view_cart')
+    
     # Obtener o crear carrito
     cart, created = Cart.objects.get_or_create(user=request.user)
     
-    # Agregar o actualizar item
-    cart_item, item_created = CartItem.objects.get_or_create(
-        cart=cart,
-        producto=producto,
-        defaults={'quantity': quantity}
-    )
-    
-    if not item_created:
-        cart_item.quantity += quantity
-        if cart_item.quantity > producto.stock:
-            messages.error(request, f'Solo hay {producto.stock} unidades disponibles.')
-            return redirect('productos:view_cart')
-        cart_item.save()
+    # Agregar o actualizar item reservando el stock
+    cart_item = set_item_quantity(cart, producto.pk, quantity, add=True)
+    if cart_item is None:
+        producto.refresh_from_db(fields=['stock'])
+        messages.error(request, f'Solo hay {producto.stock} unidades disponibles.')
+        return redirect('productos:producto_detail', pk=producto_id)
     
     # Registrar actividad
     ActivityLog.objects.create(
@@ -219,47 +334,149 @@ def add_to_cart(request, producto_id):
     return redirect('productos:view_cart')
 
 
-@login_required
 @require_POST
 def update_cart_item(request, item_id):
-    """Vista para actualizar cantidad de un item del carrito"""
-    cart_item = get_object_or_404(CartItem, pk=item_id, cart__user=request.user)
+    """
+    Vista para actualizar cantidad de un item del carrito.
+    En el carrito de invitado item_id es el id del producto.
+    """
+    if not request.user.is_authenticated:
+        producto = get_object_or_404(Producto, pk=item_id)
+        quantity = int(request.POST.get('quantity', 1))
+        session_cart = SessionCart(request.session)
+        if quantity <= 0:
+            session_cart.remove(producto.pk)
+            messages.info(request, 'Producto removido del carrito.')
+        elif not session_cart.set(producto, quantity):
+            messages.error(request, f'Solo hay {producto.stock} unidades disponibles.')
+        else:
+            messages.success(request, 'Carrito actualizado.')
+        return redirect('productos:view_cart')
+    
+    cart_item = get_object_or_404(
+        CartItem.objects.select_related('cart', 'producto'), pk=item_id, cart__user=request.user
+    )
     quantity = int(request.POST.get('quantity', 1))
     
     if quantity <= 0:
-        cart_item.delete()
+        remove_cart_items(CartItem.objects.filter(pk=cart_item.pk))
         messages.info(request, 'Producto removido del carrito.')
-    elif quantity > cart_item.producto.stock:
-        messages.error(request, f'Solo hay {cart_item.producto.stock} unidades disponibles.')
+    elif set_item_quantity(cart_item.cart, cart_item.producto_id, quantity) is None:
+        cart_item.refresh_from_db()
+        cart_item.producto.refresh_from_db(fields=['stock'])
+        messages.error(request, f'Solo hay {cart_item.max_quantity} unidades disponibles.')
     else:
-        cart_item.quantity = quantity
-        cart_item.save()
         messages.success(request, 'Carrito actualizado.')
     
     return redirect('productos:view_cart')
 
 
-@login_required
 @require_POST
 def remove_from_cart(request, item_id):
-    """Vista para remover item del carrito"""
+    """
+    Vista para remover item del carrito.
+    En el carrito de invitado item_id es el id del producto.
+    """
+    if not request.user.is_authenticated:
+        SessionCart(request.session).remove(item_id)
+        messages.info(request, 'Producto removido del carrito.')
+        return redirect('productos:view_cart')
+    
     cart_item = get_object_or_404(CartItem, pk=item_id, cart__user=request.user)
     producto_nombre = cart_item.producto.nombre
-    cart_item.delete()
+    remove_cart_items(CartItem.objects.filter(pk=cart_item.pk))
     messages.info(request, f'{producto_nombre} removido del carrito.')
     return redirect('productos:view_cart')
 
 
-@login_required
 @require_POST
 def clear_cart(request):
     """Vista para vaciar el carrito"""
+    if not request.user.is_authenticated:
+        SessionCart(request.session).clear()
+        messages.info(request, 'Carrito vaciado.')
+        return redirect('productos:view_cart')
+    
     cart = get_object_or_404(Cart, user=request.user)
-    cart.items.all().delete()
+    remove_cart_items(cart.items.all())
     messages.info(request, 'Carrito vaciado.')
     return redirect('productos:view_cart')
 
 
+@login_required
+@require_POST
+def cart_batch_update(request):
+    """
+    Endpoint JSON para modificar varios items del carrito en una petición.
+    Recibe {"operations": [{"op": "add"|"update"|"remove", "producto_id": 1, "quantity": 2}, ...]}
+    y responde con los items, los totales y los errores por operación.
+    """
+    try:
+        operations = json.loads(request.body)['operations']
+        if not isinstance(operations, list):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Formato de petición inválido.'}, status=400)
+    
+    if len(operations) > MAX_OPERATIONS:
+        return JsonResponse({
+            'success': False,
+            'message': f'Máximo {MAX_OPERATIONS} operaciones por petición.'
+        }, status=400)
+    
+    cart, created = Cart.objects.get_or_create(user=request.user)
+    try:
+        errors = apply_cart_operations(cart, operations)
+    except ValidationError as e:
+        return JsonResponse({'success': False, 'message': ' '.join(e.messages)}, status=409)
+    
+    items = cart.items.select_related('producto').order_by('added_at')
+    return JsonResponse({
+        'success': not errors,
+        'errors': errors,
+        'items': [
+            {
+                'id': item.pk,
+                'producto_id': item.producto_id,
+                'quantity': item.quantity,
+                'max_quantity': item.max_quantity,
+                'subtotal': f'{item.subtotal:.2f}',
+            }
+            for item in items
+        ],
+        'total_items': cart.total_items,
+        'total_price': f'{cart.total_price:.2f}',
+    })
+
+
+@login_required
+@require_POST
+def checkout(request):
+    """Vista para convertir el carrito en un pedido"""
+    try:
+        pedido, created = checkout_cart(request.user, request.POST.get('checkout_key', '')[:64])
+    except ValidationError as e:
+        messages.error(request, ' '.join(e.messages))
+        return redirect('productos:view_cart')
+    
+    if created:
+        messages.success(request, f'¡Pedido #{pedido.pk} realizado con éxito!')
+    return redirect('productos:pedido_detail', pk=pedido.pk)
+
+
+@login_required
+def pedido_detail(request, pk):
+    """Vista para mostrar un pedido del usuario"""
+    pedido = get_object_or_404(Pedido, pk=pk, user=request.user)
+    detalles = pedido.detalles.select_related('producto')
+    
+    context = {
+        'pedido': pedido,
+        'detalles': detalles,
+    }
+    return render(request, 'productos/pedido_detail.html', context)
+
+
 # ============================================
 # VISTAS DE NOTIFICACIONES
 # ============================================
@@ -267,8 +484,9 @@ def clear_cart(request):
 @login_required
 def my_notifications(request):
     """Vista para mostrar las notificaciones del usuario"""
-    # Primero marcamos como leídas las no leídas
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    # Primero marcamos como leídas las no leídas (solo si el contador indica que hay)
+    if get_unread_count(request.user):
+        mark_notifications_read(Notification.objects.filter(user=request.user))
     
     # Luego obtenemos las notificaciones (ya están marcadas como leídas)
     notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:50]
@@ -284,8 +502,7 @@ def my_notifications(request):
 def mark_notification_read(request, notification_id):
     """Vista para marcar una notificación como leída"""
     notification = get_object_or_404(Notification, pk=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
+    mark_notifications_read(Notification.objects.filter(pk=notification.pk))
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'success': True})
@@ -293,6 +510,32 @@ def mark_notification_read(request, notification_id):
     return redirect('productos:my_notifications')
 
 
+async def notification_stream(request):
+    """
+    Stream SSE con el contador de no leídas y las notificaciones nuevas.
+    Solo funciona bajo ASGI (base.html solo incluye el script en ese caso);
+    bajo WSGI responde 204, que le indica al navegador que no reconecte.
+    """
+    user = await request.auser()
+    if not user.is_authenticated or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(notification_events(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Nginx: enviar cada evento sin esperar
+    return response
+
+
+@login_required
+def notification_counts(request):
+    """Contadores del encabezado en JSON (para navegadores sin EventSource)"""
+    counts = get_header_counts(request.user)
+    return JsonResponse({
+        'unread': counts['unread_notifications_count'],
+        'cart_items': counts['cart_items_count'],
+    })
+
+
 # ============================================
 # VISTAS DE BÚSQUEDA AVANZADA
 # ============================================
@@ -0,0 +1,71 @@
+"""
+Vistas de reportes (solo administradores)
+Los reportes se generan en segundo plano con el comando procesar_reportes;
+estas vistas los encolan, informan su estado y permiten descargarlos.
+"""
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib import messages
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import reverse
+from .models import ReportJob
+from .forms import ReportJobForm
+from .views_crud import is_admin
+
+
+@login_required
+@user_passes_test(is_admin)
+def report_list(request):
+    """Lista los reportes solicitados y permite solicitar uno nuevo"""
+    if request.method == 'POST':
+        form = ReportJobForm(request.POST)
+        if form.is_valid():
+            job = form.save(commit=False)
+            job.requested_by = request.user
+            job.save()
+            messages.success(request, 'Reporte solicitado. Estará disponible en unos momentos.')
+            return redirect('productos:report_list')
+        else:
+            messages.error(request, 'Por favor, corrige los errores del formulario.')
+    else:
+        form = ReportJobForm()
+    
+    reports = ReportJob.objects.select_related('requested_by')[:50]
+    
+    context = {
+        'form': form,
+        'reports': reports,
+    }
+    return render(request, 'productos/report_list.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def report_status(request, pk):
+    """Estado de un reporte en JSON (consultado periódicamente desde la lista)"""
+    job = get_object_or_404(ReportJob, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'estado': job.estado,
+        'estado_display': job.get_estado_display(),
+        'filas': job.filas,
+        'error': job.error,
+        'download_url': (
+            reverse('productos:report_download', args=[job.pk])
+            if job.estado == 'completado' and job.archivo else None
+        ),
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+def report_download(request, pk):
+    """Descarga el archivo de un reporte completado"""
+    job = get_object_or_404(ReportJob, pk=pk, estado='completado')
+    if not job.archivo:
+        raise Http404('El reporte no tiene archivo.')
+    if settings.IS_DEPLOYED:
+        # En S3 el archivo es privado: se redirige a una URL firmada de corta duración
+        return redirect(job.archivo.url)
+    return FileResponse(job.archivo.open('rb'), as_attachment=True, filename=job.archivo.name.rsplit('/', 1)[-1])